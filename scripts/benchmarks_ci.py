@@ -20,19 +20,24 @@ For more information refer to: benchmarking-workflow.md
 https://github.com/dotnet/performance/blob/main/docs/benchmarking-workflow.md
 '''
 
-from argparse import ArgumentParser, ArgumentTypeError
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
 import json
 from logging import getLogger
 
 import os
 import shutil
 import sys
-from typing import Any, Optional
+from collections.abc import Iterator
+from fnmatch import fnmatch
+from typing import Optional
 
+from performance.artifact_archive import ARCHIVE_FORMATS, write_artifacts_archive
 from performance.common import get_repo_root_path, validate_supported_runtime, get_artifacts_directory, helixuploadroot
 from performance.logger import setup_loggers
 from performance.tracer import setup_tracing, enable_trace_console_exporter, get_tracer
+from performance.resource_usage import enable_resource_accounting, is_resource_accounting_enabled, write_resource_usage_summary
 from performance.constants import UPLOAD_CONTAINER, UPLOAD_STORAGE_URI, UPLOAD_QUEUE
+from performance import partitioning
 from channel_map import ChannelMap
 from subprocess import CalledProcessError
 from glob import glob
@@ -74,6 +79,61 @@ def init_tools(
         internal_build_key=internal_build_key
     )
 
+def find_reports(root: str, pattern: str = '*perf-lab-report.json') -> Iterator[str]:
+    '''Walks the directory tree once, yielding the files matching pattern in a deterministic order.'''
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if fnmatch(filename, pattern):
+                yield os.path.join(dirpath, filename)
+
+def write_combined_report(artifacts_dir: str, combined_report_path: str, copy_to: Optional[str] = None) -> int:
+    '''
+    Streams every perf-lab report under artifacts_dir into a single JSON array at combined_report_path.
+    Only one report is held in memory at a time. When copy_to is set, each report is also copied into
+    that directory during the same walk. Returns the number of reports combined.
+    '''
+    count = 0
+    with open(combined_report_path, "w", encoding="utf8") as all_reports_file:
+        all_reports_file.write("[")
+        for file in find_reports(artifacts_dir):
+            if os.path.realpath(file) == os.path.realpath(combined_report_path):
+                continue
+            if copy_to is not None:
+                shutil.copy(file, os.path.join(copy_to, os.path.basename(file)))
+            with open(file, 'r', encoding="utf8") as report_file:
+                try:
+                    report = json.load(report_file)
+                except Exception as e:
+                    getLogger().warning(f"Failed to load report file '{file}': {e}")
+                    continue
+            if count > 0:
+                all_reports_file.write(", ")
+            json.dump(report, all_reports_file)
+            count += 1
+        all_reports_file.write("]")
+    return count
+
+def get_partition_run_args(args: Namespace) -> list[Namespace]:
+    '''
+    Gets the arguments of each benchmark run of this partition. Without a partition plan this is a single
+    run relying on the hash partitioning of the harness; with one, the partition's planned filters are used.
+    '''
+    if args.partition_plan is None or args.partition is None:
+        return [args]
+    if args.filter or (args.bdn_arguments and '--filter' in args.bdn_arguments):
+        getLogger().warning("Ignoring partition plan as the benchmarks are already filtered.")
+        return [args]
+
+    plan = partitioning.read_plan(args.partition_plan)
+    run_args: list[Namespace] = []
+    for bdn_arguments in partitioning.get_partition_bdn_arguments(plan, args.partition, args.bdn_arguments or []):
+        partition_args = Namespace(**vars(args))
+        partition_args.bdn_arguments = bdn_arguments
+        run_args.append(partition_args)
+    getLogger().info(f"Running partition {args.partition} from plan '{args.partition_plan}' in {len(run_args)} benchmark run(s).")
+    return run_args
+
 def add_arguments(parser: ArgumentParser) -> ArgumentParser:
     '''Adds new arguments to the specified ArgumentParser object.'''
 
@@ -174,6 +234,32 @@ def add_arguments(parser: ArgumentParser) -> ArgumentParser:
         help='Partition Index of the run',
     )
 
+    parser.add_argument(
+        '--partition-plan',
+        dest='partition_plan',
+        required=False,
+        default=None,
+        help='Duration-aware partition plan (see performance/partitioning.py) used instead of hash partitioning when --partition is set',
+    )
+
+    parser.add_argument(
+        '--bdn-artifacts-format',
+        dest='bdn_artifacts_format',
+        required=False,
+        default='zip',
+        choices=ARCHIVE_FORMATS,
+        help='Format of the BenchmarkDotNet artifacts archive uploaded to Helix. tar.zst compresses on all cores and requires the zstandard package',
+    )
+
+    parser.add_argument(
+        '--resource-accounting',
+        dest='resource_accounting',
+        required=False,
+        default=False,
+        action='store_true',
+        help='Records wall time, CPU time, peak memory and I/O of every child process and writes a resource-usage.json summary',
+    )
+
     parser.add_argument(
         '--enable-open-telemetry-logger',
         dest='enable_open_telemetry_logger',
@@ -209,6 +295,19 @@ def __process_arguments(args: list[str]):
 def main(argv: list[str]):
     validate_supported_runtime()
     args = __process_arguments(argv)
+    if args.resource_accounting:
+        enable_resource_accounting()
+
+    try:
+        __run(args)
+    finally:
+        if is_resource_accounting_enabled():
+            summary_prefix = "" if args.partition is None else f"Partition{args.partition}-"
+            summary_dir = helixuploadroot() or get_artifacts_directory()
+            os.makedirs(summary_dir, exist_ok=True)
+            write_resource_usage_summary(os.path.join(summary_dir, f"{summary_prefix}resource-usage.json"))
+
+def __run(args: Namespace):
     verbose = not args.quiet
 
     if not args.skip_logger_setup:
@@ -222,6 +321,7 @@ def main(argv: list[str]):
     target_framework_monikers = dotnet.get_target_framework_monikers(args.frameworks)
     # Acquire necessary tools (dotnet)
     if not args.dotnet_path:
+        dotnet.configure_sdk_cache(args)
         init_tools(
             architecture=args.architecture,
             dotnet_versions=args.dotnet_versions,
@@ -261,7 +361,10 @@ def main(argv: list[str]):
             args.incremental,
             args.run_isolated,
             args.wasm,
-            verbose
+            verbose,
+            args.build_cache_dir,
+            args.parallel_build,
+            args.build_max_cpu_count
         )
 
     # Run micro-benchmarks
@@ -270,23 +373,22 @@ def main(argv: list[str]):
         upload_container = UPLOAD_CONTAINER
         try:
             for framework in args.frameworks:
-                is_success = micro_benchmarks.run(
-                    BENCHMARKS_CSPROJ,
-                    args.configuration,
-                    framework,
-                    args.run_isolated,
-                    verbose,
-                    args
-                )
-
-                if not is_success:
-                    getLogger().warning(f"Benchmark run for framework '{framework}' contains errors")
-                    run_contains_errors = True
+                for run_args in get_partition_run_args(args):
+                    is_success = micro_benchmarks.run(
+                        BENCHMARKS_CSPROJ,
+                        args.configuration,
+                        framework,
+                        args.run_isolated,
+                        verbose,
+                        run_args
+                    )
+
+                    if not is_success:
+                        getLogger().warning(f"Benchmark run for framework '{framework}' contains errors")
+                        run_contains_errors = True
 
             artifacts_dir = get_artifacts_directory() if not args.bdn_artifacts else args.bdn_artifacts
 
-            reports_globpath = os.path.join(artifacts_dir, '**', '*perf-lab-report.json')
-
             # binlogs will always be in the performance/artifacts directory even if bdn_artifacts is set differently
             binlogs_globpath = os.path.join(get_repo_root_path(), 'artifacts', '**', '*.binlog')
             helix_upload_root = helixuploadroot()
@@ -298,21 +400,11 @@ def main(argv: list[str]):
                 
                 if reports_in_upload:
                     getLogger().info(f"Skipping copy of reports - artifacts directory '{artifacts_real}' already in Helix upload root '{helix_upload_real}'")
-                else:
-                    for file in glob(reports_globpath, recursive=True):
-                        shutil.copy(file, os.path.join(helix_upload_root, file.split(os.sep)[-1]))
 
-                # Create a combined JSON file that contains all the reports
+                # Create a combined JSON file that contains all the reports, copying the reports to the upload root in the same pass
                 combined_file_prefix = "" if args.partition is None else f"Partition{args.partition}-"
-                with open(os.path.join(helix_upload_root, f"{combined_file_prefix}combined-perf-lab-report.json"), "w", encoding="utf8") as all_reports_file:
-                    all_reports: list[Any] = []
-                    for file in glob(reports_globpath, recursive=True):
-                        with open(file, 'r', encoding="utf8") as report_file:
-                            try:
-                                all_reports.append(json.load(report_file))
-                            except Exception as e:
-                                getLogger().warning(f"Failed to load report file '{file}': {e}")
-                    json.dump(all_reports, all_reports_file)
+                combined_report_path = os.path.join(helix_upload_root, f"{combined_file_prefix}combined-perf-lab-report.json")
+                write_combined_report(artifacts_dir, combined_report_path, None if reports_in_upload else helix_upload_root)
 
                 # Check if binlogs directory is already within helix_upload_root to avoid duplicate copies
                 binlogs_dir = os.path.join(get_repo_root_path(), 'artifacts')
@@ -325,8 +417,8 @@ def main(argv: list[str]):
                     for file in glob(binlogs_globpath, recursive=True):
                         shutil.copy(file, os.path.join(helix_upload_root, file.split(os.sep)[-1]))
 
-                shutil.make_archive(os.path.join(helix_upload_root, "bdn-artifacts"), 'zip', artifacts_dir)
-                getLogger().info("Created \"bdn-artifacts\".zip")
+                # Reports and binlogs copied to the upload root above are left out of the archive
+                write_artifacts_archive(artifacts_dir, os.path.join(helix_upload_root, "bdn-artifacts"), helix_upload_root, args.bdn_artifacts_format)
             else:
                 getLogger().info("Skipping upload of artifacts to Helix as HELIX_WORKITEM_UPLOAD_ROOT environment variable is not set.")
 
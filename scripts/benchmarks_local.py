@@ -3,6 +3,7 @@ import os
 import platform
 import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 import xml.etree.ElementTree as xmlTree
 from argparse import ArgumentParser, ArgumentTypeError, Namespace
@@ -16,7 +17,10 @@ from git import GitCommandError
 from git.repo import Repo
 import benchmarks_ci
 import dotnet
-from performance.common import RunCommand, get_machine_architecture
+from performance.artifact_store import LINK_MODES, ArtifactStore
+from performance.bisect import find_first_regression
+from performance.common import RunCommand, get_machine_architecture, get_physical_memory_bytes, remove_directory
+from performance.comparison import SLOWER, Threshold, compare, format_markdown, get_files_to_parse, read_samples_by_job
 from performance.logger import setup_loggers
 
 # Assumptions: We are only testing this Performance repo, should allow single run or multiple runs
@@ -92,6 +96,24 @@ def copy_directory_contents(src_dir: str, dest_dir: str):
                 continue
             shutil.copy2(os.path.join(src_dirpath, src_filename), dest_dirpath)
 
+# The run artifacts are materialized from a content-addressed store, so the files shared by run types and commits are only stored once
+def get_artifact_store(parsed_args: Namespace) -> ArtifactStore:
+    return ArtifactStore(os.path.join(parsed_args.artifact_storage_path, "store"), parsed_args.artifact_link_mode)
+
+# Rehashes the artifact store and the artifacts materialized from it, and removes the corrupted artifacts so they get regenerated
+def verify_artifact_storage(parsed_args: Namespace) -> None:
+    store = get_artifact_store(parsed_args)
+    corrupted_blobs = store.verify()
+    for marker_path in glob.glob(os.path.join(parsed_args.artifact_storage_path, "*", "*.artifact-tree")):
+        artifact_path = marker_path[:-len(".artifact-tree")]
+        with open(marker_path, 'r', encoding='utf8') as marker_file:
+            tree_id = marker_file.read().strip()
+        if not store.is_intact(tree_id, corrupted_blobs) or not store.verify_directory(tree_id, artifact_path):
+            getLogger().warning("Artifact %s is corrupted and will be regenerated.", artifact_path)
+            remove_directory(artifact_path)
+            os.remove(marker_path)
+    getLogger().info("Verified the artifact store in %s, %d corrupted blobs removed.", store.root, len(corrupted_blobs))
+
 # Builds libs and corerun by default
 def build_runtime_dependency(parsed_args: Namespace, repo_path: str, subset: str = "clr+libs", configuration: str = "Release", os_override: str = "", arch_override: str = "", additional_args: Optional[list[str]] = None):
     if additional_args is None:
@@ -140,8 +162,43 @@ def generate_layout(parsed_args: Namespace, repo_path: str, additional_args: Opt
             ] + additional_args
     RunCommand(generate_layout_command, verbose=True).run(os.path.join(repo_path, "src", "tests"))
 
+# Artifacts are stored under the content key of the commit (its full sha) when it is known, so a branch name
+# or an abbreviated sha maps to the artifacts of the commit it currently points at, whatever run built them
 def get_run_artifact_path(parsed_args: Namespace, run_type: RunType, commit: str) -> str:
-    return os.path.join(parsed_args.artifact_storage_path, f"{run_type.name}-{commit}-{parsed_args.os}-{parsed_args.architecture}")
+    content_key = parsed_args.commit_content_keys.get(commit, commit)
+    return os.path.join(parsed_args.artifact_storage_path, f"{run_type.name}-{content_key}-{parsed_args.os}-{parsed_args.architecture}")
+
+# The artifact directories generate_all_runtype_dependencies produces for the requested run types
+def get_required_artifact_paths(parsed_args: Namespace, commit: str) -> list[str]:
+    required_artifacts = {
+        RunType.CoreRun: "Core_Root",
+        RunType.MonoInterpreter: "dotnet_mono",
+        RunType.MonoJIT: "dotnet_mono",
+        RunType.MonoAOTLLVM: "monoaot",
+        RunType.WasmInterpreter: "wasm_bundle",
+        RunType.WasmAOT: "wasm_bundle"
+    }
+    run_types = [RunType(run_type_meta) for run_type_meta in enum_name_list_to_enum_list(RunType, parsed_args.run_type_names)]
+    return [os.path.join(get_run_artifact_path(parsed_args, run_type, commit), required_artifacts[run_type]) for run_type in run_types]
+
+def artifacts_exist_for_commit(parsed_args: Namespace, commit: str) -> bool:
+    return all(os.path.exists(artifact_path) for artifact_path in get_required_artifact_paths(parsed_args, commit))
+
+# Resolves the commits (shas, abbreviated shas or branch names) to full commit shas in the given clone
+def resolve_commit_content_keys(repo_path: str, commits: list[str]) -> dict[str, str]:
+    repo = Repo(repo_path)
+    content_keys: dict[str, str] = {}
+    for commit in commits:
+        for reference in [commit, f"origin/{commit}"]:
+            try:
+                content_keys[commit] = repo.git.rev_parse('--verify', '--quiet', f'{reference}^{{commit}}').strip()
+                break
+            except GitCommandError:
+                continue
+        else:
+            raise ValueError(f"Could not resolve {commit} to a commit in {repo_path}.")
+        getLogger().info("Commit %s resolves to %s.", commit, content_keys[commit])
+    return content_keys
 
 def get_mono_corerun(parsed_args: Namespace, run_type: RunType, commit: str) -> str:
     corerun_capture = glob.glob(os.path.join(get_run_artifact_path(parsed_args, run_type, commit), "dotnet_mono", "shared", "Microsoft.NETCore.App", "*", f'corerun{".exe" if is_windows(parsed_args) else ""}'))
@@ -163,8 +220,7 @@ def generate_all_runtype_dependencies(parsed_args: Namespace, repo_path: str, co
             generate_layout(parsed_args, repo_path)
             # Store the corerun in the artifact storage path
             generated_core_root = os.path.join(repo_path, "artifacts", "tests", "coreclr", f"{parsed_args.os}.{parsed_args.architecture}.Release", "Tests", "Core_Root")
-            shutil.rmtree(artifact_core_root, ignore_errors=True)
-            copy_directory_contents(generated_core_root, artifact_core_root)
+            get_artifact_store(parsed_args).store_and_materialize(generated_core_root, [artifact_core_root])
         else:
             getLogger().info("CoreRun already exists in %s. Skipping generation.", artifact_core_root)
 
@@ -203,10 +259,7 @@ def generate_all_runtype_dependencies(parsed_args: Namespace, repo_path: str, co
 
             # Store the dotnet_mono in the artifact storage path
             src_dir_dotnet_mono = os.path.join(repo_path, "artifacts", "dotnet_mono")
-            shutil.rmtree(artifact_mono_interpreter, ignore_errors=True)
-            copy_directory_contents(src_dir_dotnet_mono, artifact_mono_interpreter)
-            shutil.rmtree(artifact_mono_jit, ignore_errors=True)
-            copy_directory_contents(src_dir_dotnet_mono, artifact_mono_jit)
+            get_artifact_store(parsed_args).store_and_materialize(src_dir_dotnet_mono, [artifact_mono_interpreter, artifact_mono_jit])
         else:
             getLogger().info("dotnet_mono already exists in %s and %s. Skipping generation.", artifact_mono_interpreter, artifact_mono_jit)
 
@@ -227,8 +280,7 @@ def generate_all_runtype_dependencies(parsed_args: Namespace, repo_path: str, co
             copy_directory_contents(src_dir_aot_pack, dest_dir_aot_pack)
 
             src_dir_aot_final = os.path.join(repo_path, "artifacts", "bin", "aot")
-            shutil.rmtree(artifact_mono_aot_llvm, ignore_errors=True)
-            copy_directory_contents(src_dir_aot_final, artifact_mono_aot_llvm)
+            get_artifact_store(parsed_args).store_and_materialize(src_dir_aot_final, [artifact_mono_aot_llvm])
         else:
             getLogger().info("dotnet_mono already exists in %s. Skipping generation.", artifact_mono_aot_llvm)
 
@@ -246,17 +298,14 @@ def generate_all_runtype_dependencies(parsed_args: Namespace, repo_path: str, co
             src_dir_built_nugets = os.path.join(repo_path, "artifacts", "packages", "Release", "Shipping") # Goal is to copy Microsoft.NET.Sdk.WebAssembly.Pack*, Microsoft.NETCore.App.Ref*, either need to do the shipping folder or glob
             copy_directory_contents(src_dir_built_nugets, dir_bin_wasm)
             # Store the artifact in the artifact storage path
-            shutil.rmtree(artifact_wasm_wasm, ignore_errors=True)
-            copy_directory_contents(dir_bin_wasm, artifact_wasm_wasm)
-            shutil.rmtree(artifact_wasm_aot, ignore_errors=True)
-            copy_directory_contents(dir_bin_wasm, artifact_wasm_aot)
+            get_artifact_store(parsed_args).store_and_materialize(dir_bin_wasm, [artifact_wasm_wasm, artifact_wasm_aot])
 
         else:
             getLogger().info("wasm_bundle already exists in %s and %s. Skipping generation.", artifact_wasm_wasm, artifact_wasm_aot)
 
         getLogger().info("Finished generating dependencies for %s run types in %s and stored in %s.", ' '.join(map(str, parsed_args.run_type_names)), repo_path, parsed_args.artifact_storage_path)
 
-def generate_combined_benchmark_ci_args(parsed_args: Namespace, specific_run_type: RunType, all_commits: list[str]) -> list[str]:
+def generate_combined_benchmark_ci_args(parsed_args: Namespace, specific_run_type: RunType, all_commits: list[str], bdn_artifacts_path: Optional[str] = None) -> list[str]:
     getLogger().info("Generating benchmark_ci.py arguments for %s run type using artifacts in %s.", specific_run_type.name, parsed_args.artifact_storage_path)
     bdn_args_unescaped: list[str] = []
     benchmark_ci_args: list[str] = [
@@ -265,7 +314,7 @@ def generate_combined_benchmark_ci_args(parsed_args: Namespace, specific_run_typ
         '--dotnet-path', parsed_args.dotnet_dir_path,
         '--csproj', parsed_args.csproj,
         '--incremental', "no",
-        '--bdn-artifacts', os.path.join(parsed_args.artifact_storage_path, f"BenchmarkDotNet.Artifacts.{specific_run_type.name}.{start_time.strftime('%y%m%d_%H%M%S')}") # We don't include the commit hash in the artifact path because we are combining multiple runs into on
+        '--bdn-artifacts', bdn_artifacts_path or os.path.join(parsed_args.artifact_storage_path, f"BenchmarkDotNet.Artifacts.{specific_run_type.name}.{start_time.strftime('%y%m%d_%H%M%S')}") # We don't include the commit hash in the artifact path because we are combining multiple runs into on
     ]
 
     if parsed_args.filter:
@@ -428,6 +477,10 @@ def generate_artifacts_for_commit(parsed_args: Namespace, repo_url: str, repo_di
         repo_path = os.path.join(parsed_args.repo_storage_path, repo_dir)
         getLogger().info("Running for %s at %s.", repo_path, commit)
 
+        if not parsed_args.rebuild_artifacts and artifacts_exist_for_commit(parsed_args, commit):
+            getLogger().info("Artifacts for %s already exist in %s. Skipping checkout and generation.", commit, parsed_args.artifact_storage_path)
+            return
+
         if not os.path.exists(repo_path):
             repo = Repo.clone_from(repo_url, repo_path)
             repo.git.checkout(commit, '-f')
@@ -441,6 +494,46 @@ def generate_artifacts_for_commit(parsed_args: Namespace, repo_url: str, repo_di
     # Determine what we need to generate for the local benchmarks
     generate_all_runtype_dependencies(parsed_args, repo_path, commit, (is_local and not parsed_args.skip_local_rebuild) or parsed_args.rebuild_artifacts)
 
+# The number of runtime builds to run at once: bounded by the CPU and memory budgets of a single build
+def get_max_parallel_builds(parsed_args: Namespace, build_count: int) -> int:
+    max_parallel_builds = min(build_count, max(1, (os.cpu_count() or 1) // parsed_args.build_cpu_budget))
+    physical_memory = get_physical_memory_bytes()
+    if physical_memory is not None:
+        max_parallel_builds = min(max_parallel_builds, max(1, int(physical_memory // (parsed_args.build_memory_budget_gb * 1024 ** 3))))
+    if parsed_args.max_parallel_builds:
+        max_parallel_builds = min(max_parallel_builds, parsed_args.max_parallel_builds)
+    return max(1, max_parallel_builds)
+
+# Checks out each commit into its own git worktree of the shared clone and generates their artifacts concurrently
+def generate_artifacts_for_commits_in_worktrees(parsed_args: Namespace, repo_dir: str, commits: list[str]) -> None:
+    repo_path = os.path.join(parsed_args.repo_storage_path, repo_dir)
+    repo = Repo(repo_path)
+    repo.git.worktree('prune')
+
+    commits_to_build = [commit for commit in commits if parsed_args.rebuild_artifacts or not artifacts_exist_for_commit(parsed_args, commit)]
+    for commit in commits:
+        if commit not in commits_to_build:
+            getLogger().info("Artifacts for %s already exist in %s. Skipping checkout and generation.", commit, parsed_args.artifact_storage_path)
+    if not commits_to_build:
+        return
+
+    worktree_paths: dict[str, str] = {}
+    for commit in commits_to_build:
+        content_key = parsed_args.commit_content_keys.get(commit, commit)
+        worktree_path = os.path.join(parsed_args.repo_storage_path, f"{repo_dir}-worktrees", content_key)
+        if os.path.exists(worktree_path):
+            Repo(worktree_path).git.checkout('-f', '--detach', content_key)
+        else:
+            repo.git.worktree('add', '--force', '--detach', worktree_path, content_key)
+        worktree_paths[commit] = worktree_path
+
+    max_parallel_builds = get_max_parallel_builds(parsed_args, len(commits_to_build))
+    getLogger().info("Generating artifacts for %s with up to %d concurrent builds.", commits_to_build, max_parallel_builds)
+    with ThreadPoolExecutor(max_workers=max_parallel_builds) as executor:
+        futures = [executor.submit(generate_all_runtype_dependencies, parsed_args, worktree_paths[commit], commit, parsed_args.rebuild_artifacts) for commit in commits_to_build]
+        for future in futures:
+            future.result()
+
 # Run tests on the local machine
 def run_benchmarks(parsed_args: Namespace, commits: list[str]) -> None:
     # Generate the correct benchmarks_ci.py arguments for the run type
@@ -467,6 +560,59 @@ def run_benchmarks(parsed_args: Namespace, commits: list[str]) -> None:
 
         getLogger().info("Finished running benchmark for %s at %s.", run_type, commits)
 
+# Runs the filtered benchmarks once with the Core_Root of the good commit and of each of the given commits,
+# and judges each commit against the good commit with the statistical comparison of results_comparer
+def judge_commits_against_good(parsed_args: Namespace, good_commit: str, commits: list[str], step: int) -> list[bool]:
+    if parsed_args.use_worktrees:
+        generate_artifacts_for_commits_in_worktrees(parsed_args, "runtime", commits)
+    else:
+        for commit in commits:
+            generate_artifacts_for_commit(parsed_args, parsed_args.repo_url, "runtime", commit)
+
+    bdn_artifacts_path = os.path.join(parsed_args.artifact_storage_path, f"BenchmarkDotNet.Artifacts.Bisect.{start_time.strftime('%y%m%d_%H%M%S')}.{step}")
+    benchmark_ci_args = generate_combined_benchmark_ci_args(parsed_args, RunType.CoreRun, [good_commit] + commits, bdn_artifacts_path)
+    getLogger().info("Running bisect step %d for %s with arguments \"%s\".", step, commits, ' '.join(benchmark_ci_args))
+    kill_dotnet_processes(parsed_args)
+    benchmarks_ci.main(benchmark_ci_args)
+
+    samples = read_samples_by_job(get_files_to_parse(bdn_artifacts_path), [good_commit] + commits)
+    if not samples[good_commit]:
+        raise RuntimeError(f"No benchmark results of the good commit {good_commit} were found in {bdn_artifacts_path}.")
+
+    regressed: list[bool] = []
+    for commit in commits:
+        results = compare(samples[good_commit], samples[commit], parsed_args.threshold, parsed_args.noise)
+        regressed.append(any(result.conclusion == SLOWER for result in results))
+        getLogger().info("Bisect step %d: %s is %s.\n%s", step, commit, "regressed" if regressed[-1] else "not regressed", format_markdown(results, parsed_args.threshold, parsed_args.noise))
+    return regressed
+
+# Searches the good..bad range for the first commit whose filtered benchmarks regressed against the good commit
+def bisect_commits(parsed_args: Namespace) -> Optional[str]:
+    good_reference, _, bad_reference = parsed_args.bisect.partition('..')
+    if not good_reference or not bad_reference:
+        raise ValueError(f"Invalid bisect range {parsed_args.bisect}. The range must be passed like --bisect good..bad.")
+    parsed_args.run_type_names = [RunType.CoreRun.name]
+
+    check_references_exist_and_add_branch_commits(parsed_args.repo_url, [good_reference, bad_reference], parsed_args.repo_storage_path, "runtime")
+    repo_path = os.path.join(parsed_args.repo_storage_path, "runtime")
+    content_keys = resolve_commit_content_keys(repo_path, [good_reference, bad_reference])
+    good_commit, bad_commit = content_keys[good_reference], content_keys[bad_reference]
+    commits: list[str] = Repo(repo_path).git.rev_list('--first-parent', '--reverse', f'{good_commit}..{bad_commit}').split()
+    getLogger().info("Bisecting %d commits between %s and %s with %d probes per step.", len(commits), good_commit, bad_commit, parsed_args.bisect_probes)
+
+    generate_artifacts_for_commit(parsed_args, parsed_args.repo_url, "runtime", good_commit)
+    steps: list[int] = []
+    def is_regressed(probes: list[str]) -> list[bool]:
+        steps.append(len(steps) + 1)
+        return judge_commits_against_good(parsed_args, good_commit, probes, steps[-1])
+
+    first_regression = find_first_regression(commits, is_regressed, parsed_args.bisect_probes)
+    if first_regression is None:
+        getLogger().info("%s is not regressed against %s with threshold %s.", bad_commit, good_commit, parsed_args.threshold)
+    else:
+        getLogger().info("First regressing commit: %s (found in %d bisect steps).", first_regression, len(steps))
+    return first_regression
+
 def install_dotnet(parsed_args: Namespace) -> None:
     if not os.path.exists(parsed_args.dotnet_dir_path) or parsed_args.reinstall_dotnet:
         dotnet.install(parsed_args.architecture, ["main"], parsed_args.dotnet_versions, parsed_args.verbose, parsed_args.dotnet_dir_path)
@@ -519,6 +665,16 @@ def add_arguments(parser: ArgumentParser):
     parser.add_argument('--allow-non-admin-execution', action='store_true', help='Whether to allow non-admin execution of the script. Admin execution is highly recommended as it minimizes the chance of encountering errors, but may not be possible in all cases.')
     parser.add_argument('--dont-kill-dotnet-processes', action='store_true', help='This is now the default and is no longer needed. It is kept for backwards compatibility.')
     parser.add_argument('--kill-dotnet-processes', action='store_true', help='Whether to kill any dotnet processes throughout the script. This is useful for solving certain issues during builds due to mbsuild node reuse but kills all machine dotnet processes. (Note: This indirectly conflicts with --enable-msbuild-node-reuse as this should kill the nodes.)')
+    parser.add_argument('--bisect', type=str, help='A good..bad commit range to search for the first commit whose CoreRun results of the --filter benchmarks regressed against the good commit.')
+    parser.add_argument('--threshold', type=Threshold.parse, default=Threshold.parse('5%'), help='The regression threshold of --bisect, like results_comparer.py. Examples: 5%%, 10ms, 100ns. Default is 5%%.')
+    parser.add_argument('--noise', type=Threshold.parse, default=Threshold.parse('0.3ns'), help='The noise threshold of --bisect, like results_comparer.py. Default is 0.3ns.')
+    parser.add_argument('--bisect-probes', type=int, default=3, help='The number of commits measured in each --bisect step, in a single BenchmarkDotNet run with the good commit. Default is 3.')
+    parser.add_argument('--artifact-link-mode', choices=LINK_MODES, default='auto', help='How artifacts are materialized from the content-addressed artifact store: reflink (copy-on-write clones), copy, auto to use reflinks where the file system supports them and copies otherwise, or hardlink, which saves the most disk space but gives read-only files that tools copying the artifacts cannot overwrite. Default is auto.')
+    parser.add_argument('--verify-artifact-store', action='store_true', help='Whether to check the integrity of the artifact store and of the cached artifacts before building, regenerating the corrupted ones.')
+    parser.add_argument('--use-worktrees', action='store_true', help='Whether to check out each commit into its own git worktree of the shared repo and build the commits concurrently. Ignored with --separate-repos.')
+    parser.add_argument('--max-parallel-builds', type=int, help='The maximum number of commits built at once with --use-worktrees. By default this is only bounded by the CPU and memory budgets.')
+    parser.add_argument('--build-cpu-budget', type=int, default=4, help='The number of logical CPUs reserved for each concurrent build with --use-worktrees. Default is 4.')
+    parser.add_argument('--build-memory-budget-gb', type=float, default=16, help='The memory in GB reserved for each concurrent build with --use-worktrees. Default is 16.')
     parser.add_argument('--enable-msbuild-node-reuse', action='store_true', help='Whether to enable MSBuild node reuse. This is useful for speeding up builds, but may cause issues with some builds, especially between different commits. (Note: This indirectly conflicts with --kill-dotnet-processes as killing the processes should kill the nodes.)')
     def __is_valid_run_type(value: str):
         try:
@@ -555,6 +711,7 @@ def __main(args: list[str]):
     parsed_args = parser.parse_args(args)
     assert isinstance(parsed_args.artifact_storage_path, str)
     parsed_args.dotnet_dir_path = os.path.join(parsed_args.artifact_storage_path, "dotnet")
+    parsed_args.commit_content_keys = {}
 
     setup_loggers(verbose=parsed_args.verbose)
 
@@ -562,6 +719,7 @@ def __main(args: list[str]):
         getLogger().warning("--dont-kill-dotnet-processes is no longer needed and is now the default. It is kept for backwards compatibility.")
 
     os.environ['MSBUILDDISABLENODEREUSE'] = '1' if not parsed_args.enable_msbuild_node_reuse else '0'
+    dotnet.configure_sdk_cache(parsed_args)
 
     # Ensure we are running as admin
     if not is_running_as_admin(parsed_args):
@@ -577,6 +735,20 @@ def __main(args: list[str]):
                 getLogger().info(folder)
         return
 
+    if parsed_args.verify_artifact_store:
+        verify_artifact_storage(parsed_args)
+
+    if parsed_args.bisect:
+        if not parsed_args.filter:
+            raise ValueError("--bisect requires a --filter for the benchmarks to measure.")
+        try:
+            kill_dotnet_processes(parsed_args)
+            install_dotnet(parsed_args)
+            bisect_commits(parsed_args)
+        finally:
+            kill_dotnet_processes(parsed_args)
+        return
+
     # Check to make sure we have something specified to test
     if parsed_args.commits or parsed_args.local_test_repo:
         if parsed_args.commits:
@@ -595,6 +767,8 @@ def __main(args: list[str]):
         check_references_exist_and_add_branch_commits(repo_url, parsed_args.commits, parsed_args.repo_storage_path, repo_dirs[0] if parsed_args.separate_repos else "runtime")
         for commit in parsed_args.commits:
             repo_dirs.append(f"runtime-{commit.replace('/', '-')}")
+        if not parsed_args.separate_repos:
+            parsed_args.commit_content_keys = resolve_commit_content_keys(os.path.join(parsed_args.repo_storage_path, "runtime"), parsed_args.commits)
 
     try:
         kill_dotnet_processes(parsed_args)
@@ -605,11 +779,14 @@ def __main(args: list[str]):
         # Generate the artifacts for each of the remote versions
         if parsed_args.commits:
             getLogger().info("References %s exist in %s.", parsed_args.commits, repo_url)
-            for repo_dir, commit in zip(repo_dirs, parsed_args.commits):
-                if parsed_args.separate_repos:
-                    generate_artifacts_for_commit(parsed_args, repo_url, repo_dir, commit)
-                else:
-                    generate_artifacts_for_commit(parsed_args, repo_url, "runtime", commit)
+            if parsed_args.use_worktrees and not parsed_args.separate_repos:
+                generate_artifacts_for_commits_in_worktrees(parsed_args, "runtime", parsed_args.commits)
+            else:
+                for repo_dir, commit in zip(repo_dirs, parsed_args.commits):
+                    if parsed_args.separate_repos:
+                        generate_artifacts_for_commit(parsed_args, repo_url, repo_dir, commit)
+                    else:
+                        generate_artifacts_for_commit(parsed_args, repo_url, "runtime", commit)
 
         # Generate the artifacts for the local version
         if parsed_args.local_test_repo:
@@ -80,6 +80,11 @@ def add_arguments(parser: ArgumentParser) -> ArgumentParser:
         action='store_true',
         help='Do not clean the SDK installations before execution')
 
+    parser.add_argument(
+        '--sdk-cache-dir',
+        dest='sdk_cache_dir',
+        help='Directory of a persistent SDK cache, so that the SDK of each version is only downloaded once')
+
     parser.add_argument(
         '--resume',
         dest='resume',
@@ -163,6 +168,9 @@ def __main(argv: list[str]):
         if 'build' in version:
             benchmarkArgs += ['--dotnet-versions', version['build']]
 
+        if args.sdk_cache_dir:
+            benchmarkArgs += ['--sdk-cache-dir', args.sdk_cache_dir]
+
         if args.resume:
             benchmarkArgs += ['--resume']
         else:
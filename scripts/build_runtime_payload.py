@@ -2,16 +2,21 @@
 This file contains helper methods for turning build artifacts from the build step of our CI pipeline
 and the Build Caching Service into a payload that can be used locally or in Helix jobs.
 """
-from collections.abc import Iterable
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import inspect
 from logging import getLogger
 import os
 from pathlib import Path
 import shutil
 import tarfile
-from typing import Optional
+import threading
+from typing import IO, Any, Optional
 import zipfile
 
 from performance.common import RunCommand, iswin
+from performance.payload_cache import PayloadCache
 
 __all__ = [
     "extract_archive_or_copy",
@@ -25,18 +30,117 @@ __all__ = [
 ]
 
 
-def _set_permissions_recursive(dirs: Iterable[str], mode: int) -> None:
-    for directory in dirs:
-        for root, _, files in os.walk(directory):
-            for item in files:
-                path = os.path.join(root, item)
-                try:
-                    os.chmod(path, mode)
-                except OSError as exc:  # Permission or unsupported FS operation
-                    getLogger().debug("Failed to set permissions for %s: %s", path, exc)
-
-
-def extract_archive_or_copy(archive_path_or_dir: str, dest_dir: str, prefix: Optional[str] = None) -> None:
+# Archive members are streamed to disk in chunks of this size instead of being read into memory
+EXTRACT_CHUNK_SIZE = 1024 * 1024
+
+# Permissions of every file of the wasm payloads
+WASM_PAYLOAD_FILE_MODE = 0o664 # rw-rw-r--
+
+# Zip members are compressed independently, so they are inflated on several threads (zlib releases the GIL)
+MAX_EXTRACT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def _set_permissions(path: str, mode: Optional[int]) -> None:
+    if mode is None:
+        return
+    try:
+        os.chmod(path, mode)
+    except OSError as exc:  # Permission or unsupported FS operation
+        getLogger().debug("Failed to set permissions for %s: %s", path, exc)
+
+
+def _get_output_path(dest_dir: str, relative_path: str) -> str:
+    """The destination of an archive member, refusing members that would be written outside of dest_dir."""
+    output_path = os.path.normpath(os.path.join(dest_dir, relative_path))
+    if os.path.isabs(relative_path) or os.path.commonpath([os.path.abspath(dest_dir), os.path.abspath(output_path)]) != os.path.abspath(dest_dir):
+        raise ValueError(f"Archive member {relative_path} would be extracted outside of {dest_dir}")
+    return output_path
+
+
+def _write_member(source: IO[bytes], output_path: str, file_mode: Optional[int]) -> None:
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "wb") as target:
+        shutil.copyfileobj(source, target, EXTRACT_CHUNK_SIZE)
+    _set_permissions(output_path, file_mode)
+
+
+def _extract_zip(archive_path: str, dest_dir: str, prefix: Optional[str], prefix_folder: str, file_mode: Optional[int]) -> None:
+    with zipfile.ZipFile(archive_path, "r") as zip_ref:
+        members: list[tuple[str, str]] = []
+        for member in zip_ref.namelist():
+            if prefix is not None and not member.startswith(prefix):
+                continue
+            relative_path = member[len(prefix_folder):] if prefix is not None else member
+            if not relative_path:
+                continue
+            if relative_path.endswith("/"):
+                if prefix is None:  # extractall semantics: keep empty directories
+                    os.makedirs(_get_output_path(dest_dir, relative_path), exist_ok=True)
+                continue  # Skip directory entries
+            members.append((member, _get_output_path(dest_dir, relative_path)))
+
+    # Every worker thread reads through its own handle, so members are inflated concurrently
+    handles = threading.local()
+    opened: list[zipfile.ZipFile] = []
+    opened_lock = threading.Lock()
+
+    def extract_member(member: str, output_path: str) -> None:
+        if not hasattr(handles, "zip_ref"):
+            handles.zip_ref = zipfile.ZipFile(archive_path, "r")
+            with opened_lock:
+                opened.append(handles.zip_ref)
+        with handles.zip_ref.open(member) as source:
+            _write_member(source, output_path, file_mode)
+
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_EXTRACT_WORKERS) as executor:
+            for future in [executor.submit(extract_member, member, output_path) for member, output_path in members]:
+                future.result()
+    finally:
+        for zip_ref in opened:
+            zip_ref.close()
+
+
+def _extract_tar(archive_path: str, dest_dir: str, prefix: Optional[str], prefix_folder: str, file_mode: Optional[int]) -> None:
+    # Stream mode ("r|gz") decompresses the archive in a single pass, without the member scan of getmembers()
+    with tarfile.open(archive_path, "r|gz") as tar_ref:
+        extracted: dict[str, str] = {}
+        for member in tar_ref:
+            if prefix is not None and not member.name.startswith(prefix):
+                continue
+            relative_path = member.name[len(prefix_folder):] if prefix is not None else member.name
+            if not relative_path or relative_path in (".", "./"):
+                continue
+            output_path = _get_output_path(dest_dir, relative_path)
+            if member.isdir():
+                if prefix is None:  # extractall semantics: keep empty directories
+                    os.makedirs(output_path, exist_ok=True)
+                continue
+            if member.issym():
+                if not iswin():
+                    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                    if os.path.lexists(output_path):
+                        os.remove(output_path)
+                    os.symlink(member.linkname, output_path)
+                continue
+            if member.islnk():
+                link_target = extracted.get(member.linkname)
+                if link_target is None:
+                    getLogger().debug("Skipping hardlink %s to %s which was not extracted", member.name, member.linkname)
+                    continue
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                shutil.copy2(link_target, output_path)
+                continue
+            source = tar_ref.extractfile(member)
+            if source is None:
+                continue  # Devices and other special files
+            with source:
+                _write_member(source, output_path, file_mode if file_mode is not None else member.mode & 0o777)
+            os.utime(output_path, (member.mtime, member.mtime))
+            extracted[member.name] = output_path
+
+
+def extract_archive_or_copy(archive_path_or_dir: str, dest_dir: str, prefix: Optional[str] = None, file_mode: Optional[int] = None) -> None:
     """Extract an archive (.zip / .tar.gz) or copy from a directory into destination.
 
     When a `prefix` is provided only entries whose path starts with that prefix
@@ -44,6 +148,9 @@ def extract_archive_or_copy(archive_path_or_dir: str, dest_dir: str, prefix: Opt
     directories we treat the path *up to the last slash* as a subdirectory to
     descend into (``prefix_folder``) and the remainder as a file prefix filter.
 
+    Archive members are streamed to disk: zip members are extracted on several
+    threads, and tar.gz archives are read in a single pass.
+
     Examples:
         prefix = "artifacts/bin/mono/linux.x64.Release/" -> copy everything under that folder.
         prefix = "coreclr/windows.x64.Release/corerun"   -> copy only files beginning with "corerun".
@@ -52,6 +159,7 @@ def extract_archive_or_copy(archive_path_or_dir: str, dest_dir: str, prefix: Opt
         archive_path_or_dir: Path to a directory OR a .zip / .tar.gz archive.
         dest_dir: Destination directory (created if missing).
         prefix: Optional path (and optional filename prefix) scoping extracted content.
+        file_mode: Optional permissions set on every extracted or copied file.
     """
     if not os.path.exists(archive_path_or_dir):
         raise FileNotFoundError(f"Archive or directory not found: {archive_path_or_dir}")
@@ -76,6 +184,10 @@ def extract_archive_or_copy(archive_path_or_dir: str, dest_dir: str, prefix: Opt
         prefix_folder,
     )
 
+    def copy_file(source: str, destination: str) -> None:
+        shutil.copy2(source, destination)
+        _set_permissions(destination, file_mode)
+
     if os.path.isdir(archive_path_or_dir):
         src_dir = archive_path_or_dir
         if prefix is not None:
@@ -86,47 +198,61 @@ def extract_archive_or_copy(archive_path_or_dir: str, dest_dir: str, prefix: Opt
 
         if not os.path.samefile(src_dir, dest_dir):
             if not prefix:  # Simple copy of entire subtree
-                shutil.copytree(src_dir, dest_dir, dirs_exist_ok=True)
+                shutil.copytree(src_dir, dest_dir, copy_function=copy_file, dirs_exist_ok=True)
             else:
                 # Selective copy: only items whose relative path starts with prefix
                 for item in Path(src_dir).rglob(f"{prefix}*"):
                     if item.is_file():
                         dest_path = os.path.join(dest_dir, item.relative_to(src_dir))
                         os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-                        shutil.copy2(item, dest_path)
+                        copy_file(str(item), dest_path)
     elif archive_path_or_dir.endswith(".zip"):
-        with zipfile.ZipFile(archive_path_or_dir, "r") as zip_ref:
-            if prefix is None:
-                zip_ref.extractall(dest_dir)
-            else:
-                for member in zip_ref.namelist():
-                    if member.startswith(prefix):
-                        relative_path = member[len(prefix_folder):]
-                        if not relative_path or relative_path.endswith("/"):
-                            continue  # Skip directory entries
-                        output_path = os.path.join(dest_dir, relative_path)
-                        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-                        with zip_ref.open(member) as source, open(output_path, "wb") as target:
-                            target.write(source.read())
+        _extract_zip(archive_path_or_dir, dest_dir, prefix, prefix_folder, file_mode)
     elif archive_path_or_dir.endswith(".tar.gz"):
-        with tarfile.open(archive_path_or_dir, "r:gz") as tar_ref:
-            if prefix is None:
-                tar_ref.extractall(dest_dir)
-            else:
-                for member in tar_ref.getmembers():
-                    if member.name.startswith(prefix):
-                        relative_path = member.name[len(prefix_folder):]
-                        if not relative_path or relative_path.endswith("/"):
-                            continue
-                        output_path = os.path.join(dest_dir, relative_path)
-                        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-                        source = tar_ref.extractfile(member)
-                        if source is not None:
-                            with source, open(output_path, "wb") as target:
-                                target.write(source.read())
+        _extract_tar(archive_path_or_dir, dest_dir, prefix, prefix_folder, file_mode)
     else:
         raise Exception("Unsupported archive format")
 
+def _cached_payload(
+    sources: Callable[[dict[str, Any]], list[str]],
+    destinations: Callable[[dict[str, Any]], list[str]],
+    path_arguments: tuple[str, ...],
+) -> Callable[[Callable[..., None]], Callable[..., None]]:
+    """Makes a payload builder reuse the payload cache configured with PERFLAB_PAYLOAD_CACHE_DIR.
+
+    The cache key is made of the fingerprints of the `sources` of the build and of the
+    arguments of the builder, except for the `path_arguments`: the same inputs laid out into
+    another working directory hit the same entry. On a hit the cached `destinations` are
+    hardlinked into place and the builder does not run.
+    """
+    def decorator(build: Callable[..., None]) -> Callable[..., None]:
+        @functools.wraps(build)
+        def build_or_restore(*args: Any, **kwargs: Any) -> None:
+            cache = PayloadCache.from_environment()
+            if cache is None:
+                return build(*args, **kwargs)
+
+            bound_arguments = inspect.signature(build).bind(*args, **kwargs)
+            bound_arguments.apply_defaults()
+            arguments = dict(bound_arguments.arguments)
+            parameters = {name: value for name, value in arguments.items() if name not in path_arguments}
+            key = PayloadCache.get_key(build.__name__, sources(arguments), parameters)
+            if key is None:
+                return build(*args, **kwargs)
+            if cache.restore(key, destinations(arguments)):
+                return
+
+            build(*args, **kwargs)
+            cache.save(key, destinations(arguments), {"builder": build.__name__, "parameters": parameters})
+        return build_or_restore
+    return decorator
+
+
+@_cached_payload(
+    sources=lambda args: [args["runtime_repo_dir"], args["coreclr_archive_or_dir"] or os.path.join(args["runtime_repo_dir"], "artifacts", "bin")],
+    destinations=lambda args: [args["core_root_dest"]],
+    path_arguments=("runtime_repo_dir", "core_root_dest", "coreclr_archive_or_dir"),
+)
 def build_coreroot_payload(
     runtime_repo_dir: str,
     core_root_dest: str,
@@ -208,6 +334,11 @@ def build_coreroot_payload(
         ignore=shutil.ignore_patterns("*.pdb"),  # Exclude PDBs (not needed in payloads)
     )
 
+@_cached_payload(
+    sources=lambda args: [args["coreclr_archive_or_dir"]],
+    destinations=lambda args: [args["core_root_dest"]],
+    path_arguments=("core_root_dest", "coreclr_archive_or_dir"),
+)
 def build_coreroot_payload_simple(
     core_root_dest: str,
     tfm: str,
@@ -236,6 +367,11 @@ def build_coreroot_payload_simple(
         if os.path.exists(corerun_executable):
             os.chmod(corerun_executable, 0o755)
 
+@_cached_payload(
+    sources=lambda args: [args["mono_archive_or_dir"] or os.path.join(args["runtime_repo_dir"] or "", "artifacts", "bin")],
+    destinations=lambda args: [args["mono_payload_dst"]],
+    path_arguments=("mono_payload_dst", "runtime_repo_dir", "mono_archive_or_dir"),
+)
 def build_mono_payload(
     mono_payload_dst: str,
     os_group: str,
@@ -274,6 +410,11 @@ def build_mono_payload(
         prefix=f"coreclr/{os_group}.{architecture}.{build_config_upper}/corerun",
     )
 
+@_cached_payload(
+    sources=lambda args: [args["monoaot_artifacts_archive_or_dir"]],
+    destinations=lambda args: [args["payload_dest"]],
+    path_arguments=("monoaot_artifacts_archive_or_dir", "payload_dest"),
+)
 def build_monoaot_payload(
     monoaot_artifacts_archive_or_dir: str, payload_dest: str, architecture: str
 ) -> None:
@@ -299,6 +440,11 @@ def build_monoaot_payload(
         prefix=f"artifacts/bin/microsoft.netcore.app.runtime.linux-{architecture}/Release/",
     )
     
+@_cached_payload(
+    sources=lambda args: [args["browser_wasm_archive_or_dir"]],
+    destinations=lambda args: [os.path.join(args["payload_parent_dir"], "dotnet"), os.path.join(args["payload_parent_dir"], "built-nugets")],
+    path_arguments=("browser_wasm_archive_or_dir", "payload_parent_dir"),
+)
 def build_wasm_payload(
     browser_wasm_archive_or_dir: str,
     payload_parent_dir: str,  # wasm creates two payload directories
@@ -312,16 +458,19 @@ def build_wasm_payload(
     wasm_built_nugets_dir = os.path.join(payload_parent_dir, "built-nugets")
 
     extract_archive_or_copy(
-        browser_wasm_archive_or_dir, wasm_dotnet_dir, prefix="staging/dotnet-latest/"
+        browser_wasm_archive_or_dir, wasm_dotnet_dir, prefix="staging/dotnet-latest/", file_mode=WASM_PAYLOAD_FILE_MODE
     )
 
     extract_archive_or_copy(
-        browser_wasm_archive_or_dir, wasm_built_nugets_dir, prefix="staging/built-nugets/"
+        browser_wasm_archive_or_dir, wasm_built_nugets_dir, prefix="staging/built-nugets/", file_mode=WASM_PAYLOAD_FILE_MODE
     )
 
-    _set_permissions_recursive([wasm_dotnet_dir, wasm_built_nugets_dir], mode=0o664) # rw-rw-r--
-
 
+@_cached_payload(
+    sources=lambda args: [args["browser_wasm_coreclr_archive_or_dir"]],
+    destinations=lambda args: [os.path.join(args["payload_parent_dir"], "dotnet"), os.path.join(args["payload_parent_dir"], "built-nugets")],
+    path_arguments=("browser_wasm_coreclr_archive_or_dir", "payload_parent_dir"),
+)
 def build_wasm_coreclr_payload(
     browser_wasm_coreclr_archive_or_dir: str,
     payload_parent_dir: str,
@@ -339,12 +488,12 @@ def build_wasm_coreclr_payload(
 
     # Extract the SDK from dotnet-none
     extract_archive_or_copy(
-        browser_wasm_coreclr_archive_or_dir, wasm_dotnet_dir, prefix="staging/dotnet-none/"
+        browser_wasm_coreclr_archive_or_dir, wasm_dotnet_dir, prefix="staging/dotnet-none/", file_mode=WASM_PAYLOAD_FILE_MODE
     )
 
     # Extract built NuGet packages (WebAssembly SDK pack, ref pack)
     extract_archive_or_copy(
-        browser_wasm_coreclr_archive_or_dir, wasm_built_nugets_dir, prefix="staging/built-nugets/"
+        browser_wasm_coreclr_archive_or_dir, wasm_built_nugets_dir, prefix="staging/built-nugets/", file_mode=WASM_PAYLOAD_FILE_MODE
     )
 
     # Determine version from the runtime pack directory structure
@@ -367,14 +516,18 @@ def build_wasm_coreclr_payload(
                     browser_wasm_coreclr_archive_or_dir,
                     coreclr_pack_dest,
                     prefix="staging/microsoft.netcore.app.runtime.browser-wasm/Release/",
+                    file_mode=WASM_PAYLOAD_FILE_MODE,
                 )
                 getLogger().info("Installed CoreCLR browser-wasm runtime pack version %s", pack_version)
         else:
             getLogger().warning("Microsoft.NETCore.App.Ref pack not found – cannot determine version")
 
-    _set_permissions_recursive([wasm_dotnet_dir, wasm_built_nugets_dir], mode=0o664)
-
 
+@_cached_payload(
+    sources=lambda args: [args["artifacts_archive_or_dir"]],
+    destinations=lambda args: [args["payload_dest"]],
+    path_arguments=("artifacts_archive_or_dir", "payload_dest"),
+)
 def build_r2r_interpreter_payload(
     artifacts_archive_or_dir: str,
     payload_dest: str,
@@ -308,7 +308,10 @@ class CiSetupArgs:
             target_windows: bool = True,
             physical_promotion_status: Optional[str] = None,
             r2r_status: Optional[str] = None,
-            experiment_name: Optional[str] = None):
+            experiment_name: Optional[str] = None,
+            sdk_cache_dir: Optional[str] = None,
+            sdk_cache_seed: Optional[str] = None,
+            sdk_cache_budget_gb: Optional[float] = None):
         self.channel = channel
         self.quiet = quiet
         self.commit_sha = commit_sha
@@ -337,6 +340,9 @@ class CiSetupArgs:
         self.physical_promotion_status = physical_promotion_status
         self.r2r_status = r2r_status
         self.experiment_name = experiment_name
+        self.sdk_cache_dir = sdk_cache_dir
+        self.sdk_cache_seed = sdk_cache_seed
+        self.sdk_cache_budget_gb = sdk_cache_budget_gb
         self.perf_repo_branch = "main"
         self.only_sanity_check = False
 
@@ -360,6 +366,7 @@ def main(args: CiSetupArgs):
     architecture = 'x64' if args.architecture == 'arm64' else args.architecture
 
     if not args.dotnet_path:
+        dotnet.configure_sdk_cache(args)
         if args.architecture == 'arm64':
             init_tools(
                 architecture='arm64',
@@ -6,16 +6,19 @@ Contains the functionality around DotNet Cli.
 
 import re
 import json
-import datetime
 from argparse import ArgumentParser, ArgumentTypeError
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from glob import iglob
 from logging import getLogger
-from os import chmod, environ, listdir, makedirs, path, pathsep, system
-from re import search, MULTILINE
-from shutil import rmtree
+from os import chmod, cpu_count, environ, getpid, listdir, makedirs, path, pathsep, replace, system
+from re import search
+from shutil import copytree, rmtree
 from stat import S_IRWXU
 from subprocess import CalledProcessError, check_output
 from sys import argv, platform
+from tempfile import mkdtemp
+from threading import Lock
 from typing import Any, NamedTuple, Optional
 from urllib.error import URLError
 from urllib.parse import urlparse
@@ -23,12 +26,18 @@ from urllib.request import urlopen
 from time import sleep
 
 from channel_map import ChannelMap
+from performance.common import file_lock
 from performance.common import get_machine_architecture
 from performance.common import get_repo_root_path
 from performance.common import get_tools_directory
 from performance.common import push_dir
+from performance.common import remove_directory
 from performance.common import RunCommand
+from performance.common import run_commands_concurrently
 from performance.common import validate_supported_runtime
+from performance.build_cache import get_project_references
+from performance.commit_dates import CommitDateCache, CommitDateResolver, GitCommitDateResolver, HttpPatchCommitDateResolver, get_default_cache_path, resolve_commit_date
+from performance.sdk_cache import DEFAULT_BUDGET_GB, SdkCache, extract_archive, get_install_lock_path, merge_installation
 from performance.logger import setup_loggers
 from performance.tracer import setup_tracing, get_tracer
 
@@ -323,55 +332,113 @@ class CSharpProject:
               target_framework_monikers: Optional[list[str]] = None,
               output_to_bindir: bool = False,
               runtime_identifier: Optional[str] = None,
-              args: Optional[list[str]] = None) -> None:
-        '''Calls dotnet to build the specified project.'''
+              args: Optional[list[str]] = None,
+              parallel: bool = False,
+              max_cpu_count: int = 1) -> None:
+        '''
+        Calls dotnet to build the specified project.
+
+        Keyword arguments:
+            parallel -- Build the given target frameworks concurrently instead
+                of one after the other.
+            max_cpu_count -- The /m value of every dotnet build process.
+        '''
+        if max_cpu_count < 1:
+            raise ValueError('max_cpu_count must be >= 1')
+
         if not target_framework_monikers:  # Build all supported frameworks.
-            cmdline = [
-                'dotnet', 'build',
-                self.csproj_file,
-                '--configuration', configuration,
-                '--no-restore',
-                "/p:NuGetPackageRoot={}".format(packages_path),
-                "/p:RestorePackagesPath={}".format(packages_path),
-                '/p:UseSharedCompilation=false', '/p:BuildInParallel=false', '/m:1',
-            ]
-
-            if output_to_bindir:
-                cmdline += self.__get_output_build_arg(self.__bin_directory)
-            
-            if runtime_identifier:
-                cmdline = cmdline + ['--runtime', runtime_identifier]
-            
-            if args:
-                cmdline = cmdline + args
-            
+            output_directory = self.__bin_directory if output_to_bindir else None
+            cmdline = self.__get_build_command(configuration, packages_path, max_cpu_count, None, output_directory, runtime_identifier, args)
             RunCommand(cmdline, verbose=verbose).run(
                 self.working_directory)
 
+        elif parallel and len(target_framework_monikers) > 1 and not runtime_identifier:
+            self.__build_frameworks_in_parallel(configuration, verbose, packages_path, target_framework_monikers, output_to_bindir, args, max_cpu_count)
+
         else:  # Only build specified frameworks
             for target_framework_moniker in target_framework_monikers:
-                cmdline = [
-                    'dotnet', 'build',
-                    self.csproj_file,
-                    '--configuration', configuration,
-                    '--framework', target_framework_moniker,
-                    '--no-restore',
-                    "/p:NuGetPackageRoot={}".format(packages_path),
-                    "/p:RestorePackagesPath={}".format(packages_path),
-                    '/p:UseSharedCompilation=false', '/p:BuildInParallel=false', '/m:1',
-                ]
-
-                if output_to_bindir:
-                    cmdline += self.__get_output_build_arg(self.__bin_directory)
-
-                if runtime_identifier:
-                    cmdline = cmdline + ['--runtime', runtime_identifier]
-
-                if args:
-                    cmdline = cmdline + args
-                
+                output_directory = self.__bin_directory if output_to_bindir else None
+                cmdline = self.__get_build_command(configuration, packages_path, max_cpu_count, target_framework_moniker, output_directory, runtime_identifier, args)
                 RunCommand(cmdline, verbose=verbose).run(
                     self.working_directory)
+
+    def __get_build_command(self,
+                            configuration: str,
+                            packages_path: str,
+                            max_cpu_count: int,
+                            target_framework_moniker: Optional[str],
+                            output_directory: Optional[str],
+                            runtime_identifier: Optional[str],
+                            args: Optional[list[str]],
+                            project_file: Optional[str] = None) -> list[str]:
+        cmdline = [
+            'dotnet', 'build',
+            project_file or self.csproj_file,
+            '--configuration', configuration,
+        ]
+
+        if target_framework_moniker:
+            cmdline += ['--framework', target_framework_moniker]
+
+        cmdline += [
+            '--no-restore',
+            "/p:NuGetPackageRoot={}".format(packages_path),
+            "/p:RestorePackagesPath={}".format(packages_path),
+            '/p:UseSharedCompilation=false', '/p:BuildInParallel=false', '/m:{}'.format(max_cpu_count),
+        ]
+
+        if output_directory:
+            cmdline += self.__get_output_build_arg(output_directory)
+
+        if runtime_identifier:
+            cmdline = cmdline + ['--runtime', runtime_identifier]
+
+        if args:
+            cmdline = cmdline + args
+
+        return cmdline
+
+    def __build_frameworks_in_parallel(self,
+                                       configuration: str,
+                                       verbose: bool,
+                                       packages_path: str,
+                                       target_framework_monikers: list[str],
+                                       output_to_bindir: bool,
+                                       args: Optional[list[str]],
+                                       max_cpu_count: int) -> None:
+        '''
+        Builds the referenced projects once, then every framework of the
+        project in its own dotnet process with /p:BuildProjectReferences=false,
+        so that the concurrent builds only write their own framework specific
+        intermediate directories. With output_to_bindir, each framework is built
+        into a separate directory and those are copied into the bin directory
+        in the given framework order, which gives the same files as the serial
+        builds that overwrite each other.
+        '''
+        for reference in get_project_references(self.csproj_file):
+            cmdline = self.__get_build_command(configuration, packages_path, max_cpu_count, None, None, None, args, reference)
+            RunCommand(cmdline, verbose=verbose).run(
+                self.working_directory)
+
+        staging_directory = None
+        if output_to_bindir:
+            makedirs(path.dirname(path.abspath(self.__bin_directory)), exist_ok=True)
+            staging_directory = mkdtemp(prefix='.build-', dir=path.dirname(path.abspath(self.__bin_directory)))
+        try:
+            commands: list[tuple[RunCommand, Optional[str]]] = []
+            for target_framework_moniker in target_framework_monikers:
+                output_directory = path.join(staging_directory, target_framework_moniker) if staging_directory else None
+                cmdline = self.__get_build_command(configuration, packages_path, max_cpu_count, target_framework_moniker, output_directory, None, args)
+                commands.append((RunCommand(cmdline + ['/p:BuildProjectReferences=false'], verbose=verbose), self.working_directory))
+            run_commands_concurrently(commands, max(1, (cpu_count() or 1) // max_cpu_count))
+
+            if staging_directory:
+                for target_framework_moniker in target_framework_monikers:
+                    copytree(path.join(staging_directory, target_framework_moniker), self.__bin_directory, dirs_exist_ok=True)
+        finally:
+            if staging_directory:
+                remove_directory(staging_directory)
+
     @staticmethod
     @tracer.start_as_current_span("csharpproject_new")
     def new(template: str,
@@ -633,57 +700,37 @@ def get_repository(repository: str) -> tuple[str, str]:
 def get_commit_date(
     framework: str,
     commit_sha: str,
-    repository: Optional[str] = None
+    repository: Optional[str] = None,
+    resolvers: Optional[list[CommitDateResolver]] = None
 ) -> str:
     '''
-    Gets the .NET Core committer date using the GitHub Web API from the
-    repository.
+    Gets the .NET Core commit date, from the commit date cache or else from
+    the resolvers: by default a local clone of the repository, then the
+    commit's .patch file on GitHub.
     '''
     if not framework:
         raise ValueError('Target framework was not defined.')
     if not commit_sha:
         raise ValueError('.NET Commit sha was not defined.')
 
-    build_timestamp = None
-    sleep_time = 10 # Start with 10 second sleep timer
-
     if repository is None:
         core_sdk_frameworks = ChannelMap.get_supported_frameworks()
-        urls: list[str] = []
 
         if framework in core_sdk_frameworks:
             # Try dotnet/dotnet first, then dotnet/sdk, then dotnet/core-sdk
-            urls.append(f'https://github.com/dotnet/dotnet/commit/{commit_sha}.patch')
-            urls.append(f'https://github.com/dotnet/sdk/commit/{commit_sha}.patch')
-            urls.append(f'https://github.com/dotnet/core-sdk/commit/{commit_sha}.patch')
+            repositories = ['dotnet/dotnet', 'dotnet/sdk', 'dotnet/core-sdk']
         else:
             # Fallback to cli
-            urls.append(f'https://github.com/dotnet/cli/commit/{commit_sha}.patch')
+            repositories = ['dotnet/cli']
     else:
         owner, repo = get_repository(repository)
-        urls = [f'https://github.com/{owner}/{repo}/commit/{commit_sha}.patch']
-
-    for retrycount in range(5):
-        for url in urls:
-            try:
-                with urlopen(url) as response:
-                    getLogger().info("Commit: %s", url)
-                    patch = response.read().decode('utf-8')
-                    dateMatch = search(r'^Date: (.+)$', patch, MULTILINE)
-                    if dateMatch:
-                        build_timestamp = datetime.datetime.strptime(
-                            dateMatch.group(1), '%a, %d %b %Y %H:%M:%S %z'
-                        ).astimezone(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-                        getLogger().info(f"Got UTC timestamp {build_timestamp} from {dateMatch.group(1)}")
-                        return build_timestamp
-            except URLError as error:
-                getLogger().warning(f"URL Error trying to get commit date from {url}; Reason: {error.reason}; Attempt {retrycount}")
-            except Exception as error:
-                getLogger().warning(f"Error trying to get commit date from {url}; {type(error).__name__}: {error}; Attempt {retrycount}")
-        sleep(sleep_time)
-        sleep_time = sleep_time * 2
-
-    raise RuntimeError(f'Could not get timestamp for commit {commit_sha}')
+        repositories = [f'{owner}/{repo}']
+
+    if resolvers is None:
+        # The product repository is usually the one the performance repository is cloned into
+        clone_paths = [path.abspath(path.join(get_repo_root_path(), '..')), get_repo_root_path()]
+        resolvers = [GitCommitDateResolver(clone_paths), HttpPatchCommitDateResolver()]
+    return resolve_commit_date(repositories, commit_sha, resolvers, CommitDateCache(get_default_cache_path()))
 
 def get_project_name(csproj_file: str) -> str:
     '''
@@ -783,33 +830,19 @@ def shutdown_server(verbose:bool) -> None:
         else:
             system('killall -9 dotnet 2> /dev/null || killall -9 VSTest.Console 2> /dev/null || killall -9 msbuild 2> /dev/null')
 
-@tracer.start_as_current_span("dotnet_install")
-def install(
-        architecture: str,
-        channels: list[str],
-        versions: list[str],
-        verbose: bool,
-        install_dir: Optional[str] = None,
-        azure_feed_url: Optional[str] = None,
-        internal_build_key: Optional[str] = None) -> None:
+# dotnet-install is network bound, and each installation extracts to its own staging directory
+MAX_PARALLEL_SDK_INSTALLS = 4
+
+def __download_install_script(directory: str) -> list[str]:
     '''
-    Downloads dotnet cli into the tools folder.
+    Downloads the dotnet-install script into directory, returning the command line that runs it.
     '''
-    __log_script_header("Downloading DotNet Cli")
-
-    if not install_dir:
-        install_dir = __get_directory(architecture)
-    makedirs(install_dir, exist_ok=True)
-
-    getLogger().info("DotNet Install Path: '%s'", install_dir)
-
-    # Download appropriate dotnet install script
     dotnetInstallScriptExtension = '.ps1' if platform == 'win32' else '.sh'
     dotnetInstallScriptName = 'dotnet-install' + dotnetInstallScriptExtension
     url = 'https://dot.net/v1/'
     dotnetInstallScriptUrl = url + dotnetInstallScriptName
 
-    dotnetInstallScriptPath = path.join(install_dir, dotnetInstallScriptName)
+    dotnetInstallScriptPath = path.join(directory, dotnetInstallScriptName)
 
     getLogger().info('Downloading %s', dotnetInstallScriptUrl)
     count = 0
@@ -821,9 +854,12 @@ def install(
                     count = count + 1
                     sleep(count ** 2)
                     continue
-                with open(dotnetInstallScriptPath, 'wb') as outfile:
+                # Written to a temporary file first, as other scripts may be running the installed one
+                temporaryScriptPath = f'{dotnetInstallScriptPath}.{getpid()}.tmp'
+                with open(temporaryScriptPath, 'wb') as outfile:
                     outfile.write(response.read())
-                    break
+                replace(temporaryScriptPath, dotnetInstallScriptPath)
+                break
         except URLError as error:
             getLogger().warning(f"Could not download dotnet-install script from {dotnetInstallScriptUrl}; {error.reason}; Attempt {count}")
             count = count + 1
@@ -844,7 +880,7 @@ def install(
     if platform != 'win32':
         chmod(dotnetInstallScriptPath, S_IRWXU)
 
-    dotnetInstallInterpreter = [
+    return [
         'powershell.exe',
         '-NoProfile',
         '-ExecutionPolicy', 'Bypass',
@@ -852,16 +888,90 @@ def install(
         f'[System.Net.ServicePointManager]::SecurityProtocol = [System.Net.SecurityProtocolType]::Tls12; & "{dotnetInstallScriptPath}"'
     ] if platform == 'win32' else [dotnetInstallScriptPath]
 
-    # If Version is supplied, pull down the specified version
+_REPEATABLE_INVOCATION_RE = re.compile(r'Repeatable invocation:.*?-(?:-version|Version) "?([^"\s]+)"?')
+def __resolve_sdk_version(dry_run_cmdline: list[str], verbose: bool) -> str:
+    '''
+    Resolves the SDK version a dotnet-install channel/quality installation would install, by parsing
+    the repeatable invocation printed by a dry run.
+    '''
+    command = RunCommand(dry_run_cmdline, verbose=True, echo=verbose)
+    command.run(get_repo_root_path())
+    match = _REPEATABLE_INVOCATION_RE.search(command.stdout)
+    if not match:
+        raise RuntimeError('Could not resolve the SDK version from the dotnet-install dry run')
+    return match.group(1)
+
+def __get_sdk_version(install_command: Callable[..., list[str]], install_args: list[str], install_dir: str, verbose: bool) -> str:
+    '''The SDK version install_args select: the version given, or the one the channel currently resolves to.'''
+    if install_args[0] == '-Version':
+        return install_args[1]
+    # The channel has to be resolved to a version on every run, as it moves with new builds
+    return __resolve_sdk_version(install_command(install_dir, *install_args, '-DryRun'), verbose)
+
+def __get_cache_populate(
+        sdk_cache: SdkCache,
+        install_command: Callable[..., list[str]],
+        version: str,
+        architecture: str,
+        verbose: bool) -> Callable[[str], None]:
+    '''Populates a staging directory of the SDK cache with version, from the seed directory or with dotnet-install.'''
+    archive = sdk_cache.find_seed_archive(version, architecture)
+    def populate(staging_dir: str) -> None:
+        if archive is not None:
+            getLogger().info("Extracting SDK %s from '%s'", version, archive)
+            extract_archive(archive, staging_dir)
+        else:
+            RunCommand(install_command(staging_dir, '-Version', version), verbose=verbose, retry=1).run(
+                get_repo_root_path()
+            )
+    return populate
 
-    common_cmdline_args = dotnetInstallInterpreter + [
-        '-InstallDir', install_dir,
-        '-Architecture', architecture
-    ]
+@tracer.start_as_current_span("dotnet_install")
+def install(
+        architecture: str,
+        channels: list[str],
+        versions: list[str],
+        verbose: bool,
+        install_dir: Optional[str] = None,
+        azure_feed_url: Optional[str] = None,
+        internal_build_key: Optional[str] = None,
+        sdk_cache: Optional[SdkCache] = None) -> None:
+    '''
+    Downloads dotnet cli into the tools folder.
+    When an SDK cache is given, or configured through PERFLAB_SDK_CACHE_DIR, SDKs are installed
+    from the cache and only downloaded on a cache miss.
+    Several SDKs are downloaded in parallel into staging directories, and merged into install_dir
+    under a lock file so that concurrent scripts installing into the same directory are safe.
+    '''
+    __log_script_header("Downloading DotNet Cli")
+
+    if not install_dir:
+        install_dir = __get_directory(architecture)
+    install_dir = path.abspath(install_dir)
+    makedirs(install_dir, exist_ok=True)
+
+    getLogger().info("DotNet Install Path: '%s'", install_dir)
+
+    if sdk_cache is None:
+        sdk_cache = SdkCache.from_environment()
 
-    if azure_feed_url and internal_build_key:
-        common_cmdline_args += ['-AzureFeed', azure_feed_url]
-        common_cmdline_args += ['-FeedCredential', internal_build_key]
+    # Download appropriate dotnet install script, only once it is needed
+    dotnetInstallInterpreter: list[str] = []
+    dotnetInstallScriptLock = Lock()
+    def install_command(target_dir: str, *args: str) -> list[str]:
+        with dotnetInstallScriptLock:
+            if not dotnetInstallInterpreter:
+                dotnetInstallInterpreter.extend(__download_install_script(install_dir))
+
+        cmdline_args = dotnetInstallInterpreter + [
+            '-InstallDir', target_dir,
+            '-Architecture', architecture
+        ]
+
+        if azure_feed_url and internal_build_key:
+            cmdline_args += ['-AzureFeed', azure_feed_url]
+            cmdline_args += ['-FeedCredential', internal_build_key]
+        return cmdline_args + list(args)
 
     # Shield subsequent `dotnet` invocations (e.g. `dotnet --info` in ci_setup.py)
     # from picking up an unrelated repo's global.json `paths` entry during the
@@ -894,12 +1004,7 @@ def install(
             "Could not shield global.json at %s: %s", shield_global_json, ex)
 
     # Install Runtime/SDKs
-    if versions:
-        for version in versions:
-            cmdline_args = common_cmdline_args + ['-Version', version]
-            RunCommand(cmdline_args, verbose=verbose, retry=1).run(
-                get_repo_root_path()
-            )
+    requests: list[tuple[list[str], dict[str, Any]]] = [(['-Version', version], {}) for version in dict.fromkeys(versions)]
 
     # Only check channels if versions are not supplied.
     # When we supply a version, but still pull down with -Channel, we will use
@@ -907,14 +1012,69 @@ def install(
     # or if there is a new version between when we start a run and when we actually
     # run, we will be testing the "wrong" version, ie, not the version we specified.
     if (not versions) and channels:
-        for channel in channels:
-            cmdline_args = common_cmdline_args + ['-Channel', ChannelMap.get_branch(channel)]
+        for channel in dict.fromkeys(channels):
+            channel_args = ['-Channel', ChannelMap.get_branch(channel)]
             quality = ChannelMap.get_quality_from_channel(channel)
             if quality is not None:
-                cmdline_args += ['-Quality', quality]
-            RunCommand(cmdline_args, verbose=verbose, retry=1).run(
-                get_repo_root_path()
-            )
+                channel_args += ['-Quality', quality]
+            requests.append((channel_args, {'channel': ChannelMap.get_branch(channel), 'quality': quality}))
+
+    # SDKs are downloaded concurrently, and merged into install_dir in the order they were requested,
+    # so that the non-versioned root files (the dotnet host) are the ones of the last SDK like when
+    # installing them one after the other
+    staging_dirs: list[str] = []
+    def download_sdk(request: tuple[list[str], dict[str, Any]]) -> Optional[Callable[[], None]]:
+        '''Downloads the SDK of request and returns the function merging it into install_dir, if there is anything left to merge.'''
+        install_args, metadata = request
+        if sdk_cache is not None:
+            # Narrowing sdk_cache does not carry into materialize
+            cache = sdk_cache
+            version = __get_sdk_version(install_command, install_args, install_dir, verbose)
+            key = SdkCache.get_key(version, architecture)
+            populate = __get_cache_populate(cache, install_command, version, architecture, verbose)
+            entry_metadata = {'version': version, 'architecture': architecture, **metadata}
+            cache.ensure(key, populate, entry_metadata)
+            def materialize() -> None:
+                # Adds the entry again if another process evicted it since it was downloaded
+                if cache.install(key, install_dir, populate, entry_metadata):
+                    getLogger().info("Used SDK %s from the SDK cache at '%s'", key, cache.root)
+            return materialize
+
+        if len(requests) == 1:
+            # dotnet-install skips the download when the SDK is already in install_dir
+            with file_lock(get_install_lock_path(install_dir)):
+                RunCommand(install_command(install_dir, *install_args), verbose=verbose, retry=1).run(
+                    get_repo_root_path()
+                )
+            return None
+
+        # Installing into a staging directory defeats the check of dotnet-install for an SDK that
+        # is already installed, so it is done here
+        version = __get_sdk_version(install_command, install_args, install_dir, verbose)
+        if path.isdir(path.join(install_dir, 'sdk', version)):
+            getLogger().info("SDK %s is already installed in '%s'", version, install_dir)
+            return None
+        staging_dir = mkdtemp(prefix=path.basename(install_dir) + '.staging-', dir=path.dirname(install_dir))
+        staging_dirs.append(staging_dir)
+        RunCommand(install_command(staging_dir, '-Version', version), verbose=verbose, retry=1).run(
+            get_repo_root_path()
+        )
+        def merge() -> None:
+            with file_lock(get_install_lock_path(install_dir)):
+                merge_installation(staging_dir, install_dir)
+        return merge
+
+    try:
+        if requests:
+            with ThreadPoolExecutor(max_workers=min(len(requests), MAX_PARALLEL_SDK_INSTALLS)) as executor:
+                # Iterating the results raises the first installation failure
+                merges = list(executor.map(download_sdk, requests))
+            for merge in merges:
+                if merge is not None:
+                    merge()
+    finally:
+        for staging_dir in staging_dirs:
+            remove_directory(staging_dir)
 
     setup_dotnet(install_dir)
 
@@ -964,8 +1124,45 @@ def __add_arguments(parser: ArgumentParser) -> ArgumentParser:
         help='Version of the dotnet cli to install in the A.B.C format'
     )
 
+    parser.add_argument(
+        '--sdk-cache-dir',
+        dest='sdk_cache_dir',
+        required=False,
+        default=None,
+        help='Directory of a persistent SDK cache. Cached SDKs are hardlinked into the install directory instead of being downloaded again'
+    )
+
+    parser.add_argument(
+        '--sdk-cache-seed',
+        dest='sdk_cache_seed',
+        required=False,
+        default=None,
+        help='Directory of dotnet-sdk-<version>-<rid> .zip/.tar.gz archives used to fill the SDK cache without network access'
+    )
+
+    parser.add_argument(
+        '--sdk-cache-budget-gb',
+        dest='sdk_cache_budget_gb',
+        required=False,
+        default=None,
+        type=float,
+        help='Disk budget of the SDK cache in GB, least recently used SDKs are evicted beyond it (default %s)' % DEFAULT_BUDGET_GB
+    )
+
     return parser
 
+def configure_sdk_cache(args: Any) -> None:
+    '''
+    Exports the --sdk-cache-* arguments to the environment, where install and the scripts started
+    from this one read them.
+    '''
+    if args.sdk_cache_dir:
+        environ['PERFLAB_SDK_CACHE_DIR'] = path.abspath(args.sdk_cache_dir)
+    if args.sdk_cache_seed:
+        environ['PERFLAB_SDK_CACHE_SEED'] = path.abspath(args.sdk_cache_seed)
+    if args.sdk_cache_budget_gb is not None:
+        environ['PERFLAB_SDK_CACHE_BUDGET_GB'] = str(args.sdk_cache_budget_gb)
+
 
 def add_arguments(parser: ArgumentParser) -> ArgumentParser:
     '''
@@ -1029,6 +1226,7 @@ def __main(argv: list[str]) -> None:
     validate_supported_runtime()
     args = __process_arguments(argv)
     setup_loggers(verbose=args.verbose)
+    configure_sdk_cache(args)
     install(
         architecture=args.architecture,
         channels=args.channels,
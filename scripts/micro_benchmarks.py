@@ -9,14 +9,16 @@ from argparse import ArgumentTypeError
 from argparse import SUPPRESS
 from io import StringIO
 from logging import getLogger
-from os import path
+from os import environ, path
 from subprocess import CalledProcessError
 from traceback import format_exc
-from typing import Any
+from typing import Any, Optional
 
 import csv
 import sys
 
+from performance.build_cache import BuildCache, compute_fingerprint, get_build_inputs, get_project_graph
+from performance.common import get_machine_architecture
 from performance.common import get_repo_root_path
 from performance.common import get_artifacts_directory
 from performance.common import get_packages_directory
@@ -83,6 +85,37 @@ def add_arguments(parser: ArgumentParser) -> ArgumentParser:
              '''executed (Default yes).''',
     )
 
+    parser.add_argument(
+        '--build-cache-dir',
+        dest='build_cache_dir',
+        required=False,
+        default=environ.get('PERFLAB_BUILD_CACHE_DIR'),
+        type=str,
+        help='''Directory of a build cache. Builds whose inputs (sources, '''
+             '''project files, SDK, frameworks and build arguments) match a '''
+             '''cached build restore its outputs instead of building '''
+             '''(Default $PERFLAB_BUILD_CACHE_DIR).''',
+    )
+
+    parser.add_argument(
+        '--parallel-build',
+        dest='parallel_build',
+        required=False,
+        default=False,
+        action='store_true',
+        help='''Builds the target frameworks concurrently, each in its own '''
+             '''dotnet build process.''',
+    )
+
+    parser.add_argument(
+        '--build-max-cpu-count',
+        dest='build_max_cpu_count',
+        required=False,
+        default=1,
+        type=int,
+        help='''The -maxcpucount of every dotnet build process (Default 1).''',
+    )
+
     # BenchmarkDotNet
     parser.add_argument(
         '--enable-hardware-counters',
@@ -301,6 +334,58 @@ def get_bin_dir_to_use(csprojfile: dotnet.CSharpProjFile, bin_directory: str, ru
     else:
         return bin_directory
 
+def __get_sdk_version() -> str:
+    '''The version and commit of the SDK building the project, from its .version file.'''
+    with open(path.join(dotnet.get_base_path(), '.version')) as sdk_version_file:
+        return sdk_version_file.read().strip()
+
+def __get_build_output_directories(BENCHMARKS_CSPROJ: dotnet.CSharpProject, run_isolated: bool) -> list[str]:
+    '''The directories, relative to the artifacts directory, that a build of the benchmarks writes.'''
+    artifacts = get_artifacts_directory()
+    if run_isolated:
+        return [path.relpath(BENCHMARKS_CSPROJ.bin_path, artifacts)]
+    directories: list[str] = []
+    for project in get_project_graph(BENCHMARKS_CSPROJ.csproj_file):
+        project_name = dotnet.get_project_name(project)
+        directories += [
+            relative_directory
+            for relative_directory in (path.join('bin', project_name), path.join('obj', project_name))
+            if path.isdir(path.join(artifacts, relative_directory))
+        ]
+    return directories
+
+def __restore(BENCHMARKS_CSPROJ: dotnet.CSharpProject, packages: str, verbose: bool, skip_when_unchanged: bool) -> None:
+    '''
+    Restores the benchmarks. With skip_when_unchanged, the restore is skipped when the project files,
+    SDK and frameworks it was last done for are unchanged and its assets and packages are still there.
+    '''
+    obj_dir = path.join(get_artifacts_directory(), 'obj', BENCHMARKS_CSPROJ.project_name)
+    stamp_file = path.join(obj_dir, 'perflab-restore.fingerprint')
+    restore_fingerprint = ''
+    if skip_when_unchanged:
+        repo_root = get_repo_root_path()
+        restore_fingerprint = compute_fingerprint(
+            get_build_inputs(BENCHMARKS_CSPROJ.csproj_file, repo_root, project_files_only=True),
+            repo_root,
+            {
+                'sdk': __get_sdk_version(),
+                'frameworks': environ.get('PERFLAB_TARGET_FRAMEWORKS'),
+                'packages': packages,
+            })
+        if path.isfile(path.join(obj_dir, 'project.assets.json')) and path.isdir(packages) and path.isfile(stamp_file):
+            with open(stamp_file) as stamp:
+                if stamp.read() == restore_fingerprint:
+                    __log_script_header("Restore of .NET micro benchmarks is up to date")
+                    return
+
+    # dotnet restore
+    __log_script_header("Restoring .NET micro benchmarks")
+    BENCHMARKS_CSPROJ.restore(packages_path=packages, verbose=verbose)
+
+    if skip_when_unchanged and path.isdir(obj_dir):
+        with open(stamp_file, 'w') as stamp:
+            stamp.write(restore_fingerprint)
+
 @tracer.start_as_current_span(name="micro_benchmarks_build")
 def build(
         BENCHMARKS_CSPROJ: dotnet.CSharpProject,
@@ -309,11 +394,48 @@ def build(
         incremental: str,
         run_isolated: bool,
         for_wasm: bool,
-        verbose: bool) -> None:
-    '''Restores and builds the benchmarks'''
+        verbose: bool,
+        build_cache_dir: Optional[str] = None,
+        parallel: bool = False,
+        max_cpu_count: int = 1) -> None:
+    '''
+    Restores and builds the benchmarks.
+    With a build cache, a build whose fingerprint is cached restores the
+    cached outputs instead, and a new build is added to the cache.
+    With parallel, the target frameworks are built concurrently.
+    '''
 
     packages = get_packages_directory()
 
+    build_args: list[str] = []
+    if for_wasm:
+        build_args += ['/p:BuildingForWasm=true']
+
+    build_cache = BuildCache(build_cache_dir) if build_cache_dir else None
+    fingerprint = ''
+    if build_cache is not None:
+        repo_root = get_repo_root_path()
+        fingerprint = compute_fingerprint(
+            get_build_inputs(BENCHMARKS_CSPROJ.csproj_file, repo_root),
+            repo_root,
+            {
+                'sdk': __get_sdk_version(),
+                'configuration': configuration,
+                'frameworks': target_framework_monikers,
+                'build_args': build_args,
+                'run_isolated': run_isolated,
+                'platform': sys.platform,
+                'architecture': get_machine_architecture(),
+                # obj holds absolute paths, so outputs are only reused at the same location
+                'artifacts': get_artifacts_directory(),
+                'bin_directory': BENCHMARKS_CSPROJ.bin_path,
+            })
+        getLogger().info("Build fingerprint: %s", fingerprint)
+        if build_cache.restore(fingerprint, get_artifacts_directory()):
+            if not run_isolated:
+                __restore(BENCHMARKS_CSPROJ, packages, verbose, skip_when_unchanged=True)
+            return
+
     if incremental == 'no':
         __log_script_header("Removing packages, bin and obj folders.")
         binary_folders = [
@@ -323,13 +445,7 @@ def build(
         for binary_folder in binary_folders:
             remove_directory(path=binary_folder)
 
-    # dotnet restore
-    __log_script_header("Restoring .NET micro benchmarks")
-    BENCHMARKS_CSPROJ.restore(packages_path=packages, verbose=verbose)
-
-    build_args: list[str] = []
-    if for_wasm:
-        build_args += ['/p:BuildingForWasm=true']
+    __restore(BENCHMARKS_CSPROJ, packages, verbose, skip_when_unchanged=build_cache is not None)
 
     # dotnet build
     build_title = "Building .NET micro benchmarks for '{}'".format(
@@ -341,7 +457,9 @@ def build(
         output_to_bindir=run_isolated,
         verbose=verbose,
         packages_path=packages,
-        args=build_args)
+        args=build_args,
+        parallel=parallel,
+        max_cpu_count=max_cpu_count)
 
     # When running isolated, artifacts/obj/{project_name} will still be
     # there, and would interfere with any subsequent builds. So, remove
@@ -350,6 +468,13 @@ def build(
         objDir = path.join(get_artifacts_directory(), 'obj', BENCHMARKS_CSPROJ.project_name)
         remove_directory(objDir)
 
+    if build_cache is not None:
+        build_cache.save(
+            fingerprint,
+            get_artifacts_directory(),
+            __get_build_output_directories(BENCHMARKS_CSPROJ, run_isolated),
+            {'frameworks': target_framework_monikers, 'configuration': configuration})
+
 @tracer.start_as_current_span(name="micro_benchmarks_run")
 def run(
         BENCHMARKS_CSPROJ: dotnet.CSharpProject,
@@ -425,7 +550,10 @@ def __main(argv: list[str]) -> int:
             incremental,
             args.run_isolated,
             for_wasm=args.wasm,
-            verbose=verbose
+            verbose=verbose,
+            build_cache_dir=args.build_cache_dir,
+            parallel=args.parallel_build,
+            max_cpu_count=args.build_max_cpu_count
         )
 
         for framework in frameworks:
@@ -0,0 +1,128 @@
+'''
+Packaging of the BenchmarkDotNet artifacts directory for upload.
+
+shutil.make_archive deflates every file of the artifacts tree at the default level, including the
+binlogs (which are already compressed) and the reports and binlogs that benchmarks_ci copies to the
+Helix upload root next to the archive. write_artifacts_archive skips the files that are already in
+the upload root, listing them in the archive instead, and picks the compression of every entry by
+file type. It can also write a tar archive compressed by zstd on all cores, when the optional
+zstandard package is installed.
+'''
+
+from fnmatch import fnmatch
+from logging import getLogger
+from typing import Optional
+
+import filecmp
+import io
+import os
+import tarfile
+import zipfile
+
+ARCHIVE_FORMATS = ['zip', 'tar.zst']
+
+# Name of the archive entry listing the files left out because they are in the upload root
+UPLOADED_SEPARATELY_FILE = 'uploaded-separately.txt'
+
+# (file name patterns, compression, level), first match wins
+COMPRESSION_POLICY: list[tuple[tuple[str, ...], int, Optional[int]]] = [
+    # Already compressed, deflating them again costs time and saves nothing
+    (('*.binlog', '*.zip', '*.gz', '*.zst', '*.nupkg', '*.png', '*.jpg'), zipfile.ZIP_STORED, None),
+    # Text compresses well, it is worth the strongest level
+    (('*.json', '*.log', '*.txt', '*.csv', '*.md', '*.html', '*.xml', '*.cs', '*.csproj'), zipfile.ZIP_DEFLATED, 9),
+]
+DEFAULT_COMPRESSION: tuple[int, Optional[int]] = (zipfile.ZIP_DEFLATED, 6)
+
+ZSTD_LEVEL = 10
+
+def get_compression(file_name: str) -> tuple[int, Optional[int]]:
+    '''The zip compression method and level for a file name.'''
+    for patterns, compression, level in COMPRESSION_POLICY:
+        if any(fnmatch(file_name.lower(), pattern) for pattern in patterns):
+            return compression, level
+    return DEFAULT_COMPRESSION
+
+def get_files_in_upload_root(source_dir: str, upload_root: str) -> set[str]:
+    '''
+    The paths, relative to source_dir, of the files of source_dir that have an identical copy
+    with the same name at the top of upload_root.
+    '''
+    uploaded: set[str] = set()
+    upload_names = {name for name in os.listdir(upload_root) if os.path.isfile(os.path.join(upload_root, name))}
+    for dirpath, _, filenames in os.walk(source_dir):
+        for name in filenames:
+            if name not in upload_names:
+                continue
+            path = os.path.join(dirpath, name)
+            upload_path = os.path.join(upload_root, name)
+            if not os.path.samefile(path, upload_path) and filecmp.cmp(path, upload_path, shallow=False):
+                uploaded.add(os.path.relpath(path, source_dir))
+    return uploaded
+
+def __get_entries(source_dir: str, archive_path: str, skipped: set[str]) -> list[tuple[str, str]]:
+    entries: list[tuple[str, str]] = []
+    archive_real_path = os.path.realpath(archive_path)
+    for dirpath, dirnames, filenames in os.walk(source_dir):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            relative_path = os.path.relpath(path, source_dir)
+            if relative_path not in skipped and os.path.realpath(path) != archive_real_path:
+                entries.append((path, relative_path.replace(os.sep, '/')))
+    return entries
+
+def __write_zip(entries: list[tuple[str, str]], archive_path: str, uploaded_separately: str) -> None:
+    with zipfile.ZipFile(archive_path, 'w', allowZip64=True) as archive:
+        for path, name in entries:
+            compression, level = get_compression(name)
+            # ZipFile.write streams the file in chunks
+            archive.write(path, name, compress_type=compression, compresslevel=level)
+        if uploaded_separately:
+            archive.writestr(UPLOADED_SEPARATELY_FILE, uploaded_separately, compress_type=zipfile.ZIP_DEFLATED)
+
+def __write_tar_zst(entries: list[tuple[str, str]], archive_path: str, uploaded_separately: str) -> None:
+    try:
+        import zstandard  # pyright: ignore[reportMissingImports] -- optional dependency
+    except ImportError as error:
+        raise RuntimeError("The tar.zst artifacts format requires the zstandard package") from error
+
+    # threads=-1 compresses on as many threads as there are cores
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, threads=-1)  # pyright: ignore[reportUnknownMemberType, reportUnknownVariableType]
+    with open(archive_path, 'wb') as archive_file, compressor.stream_writer(archive_file) as stream:  # pyright: ignore[reportUnknownMemberType, reportUnknownVariableType]
+        with tarfile.open(fileobj=stream, mode='w|') as archive:  # pyright: ignore[reportUnknownArgumentType]
+            for path, name in entries:
+                archive.add(path, name, recursive=False)
+            if uploaded_separately:
+                content = uploaded_separately.encode('utf-8')
+                info = tarfile.TarInfo(UPLOADED_SEPARATELY_FILE)
+                info.size = len(content)
+                archive.addfile(info, io.BytesIO(content))
+
+def write_artifacts_archive(source_dir: str, archive_base_path: str, upload_root: Optional[str] = None, archive_format: str = 'zip') -> str:
+    '''
+    Archives source_dir to archive_base_path plus the extension of archive_format and returns the
+    path of the archive. Files that are already in upload_root are left out and listed in
+    uploaded-separately.txt.
+    '''
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f"Invalid archive format '{archive_format}', expected one of {ARCHIVE_FORMATS}")
+
+    archive_path = f'{archive_base_path}.{archive_format}'
+    skipped: set[str] = get_files_in_upload_root(source_dir, upload_root) if upload_root is not None else set()
+    entries = __get_entries(source_dir, archive_path, skipped)
+    uploaded_separately = ''.join(f'{path}\n' for path in sorted(path.replace(os.sep, '/') for path in skipped))
+
+    temp_path = f'{archive_path}.tmp'
+    try:
+        if archive_format == 'zip':
+            __write_zip(entries, temp_path, uploaded_separately)
+        else:
+            __write_tar_zst(entries, temp_path, uploaded_separately)
+        os.replace(temp_path, archive_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    getLogger().info("Archived %d files of '%s' to '%s' (%d bytes), %d files left out as already in the upload root",
+                     len(entries), source_dir, archive_path, os.path.getsize(archive_path), len(skipped))
+    return archive_path
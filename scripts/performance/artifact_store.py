@@ -0,0 +1,198 @@
+'''
+Content-addressed store of build artifact directories.
+
+benchmarks_local keeps the runtime artifacts of every commit it builds (Core_Root, dotnet_mono,
+monoaot, wasm_bundle), and used to copy each tree in full once per run type that needs it. Most of
+the files of those trees are identical across run types and across nearby commits. ArtifactStore
+keeps every distinct file once, as a blob named by the SHA-256 of its content, and materializes a
+stored tree into a directory with reflinks (copy-on-write clones) where the file system supports
+them and plain copies otherwise. Both give writable files, like the copies they replace.
+
+The hardlink mode is only used when asked for: hardlinked files are the read-only blobs themselves,
+and tools that copy the materialized trees and later overwrite files of the copy (BenchmarkDotNet
+does it with the CoreRun directory) fail on them.
+'''
+
+from logging import getLogger
+from sys import platform
+from typing import Any, Optional
+
+import hashlib
+import json
+import os
+import shutil
+import stat
+import uuid
+
+from .common import remove_directory
+
+LINK_MODES = ['auto', 'reflink', 'hardlink', 'copy']
+
+# Linux FICLONE ioctl, _IOW(0x94, 9, int)
+_FICLONE = 0x40049409
+
+def get_file_digest(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as content:
+        for chunk in iter(lambda: content.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def reflink(source: str, target: str) -> None:
+    '''Clones source to target sharing its data blocks, raises OSError when the file system cannot.'''
+    if platform == 'darwin':
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(source.encode('utf-8'), target.encode('utf-8'), 0) != 0:
+            raise OSError(ctypes.get_errno(), 'clonefile failed', target)
+    elif platform.startswith('linux'):
+        import fcntl
+        with open(source, 'rb') as source_file, open(target, 'wb') as target_file:
+            try:
+                fcntl.ioctl(target_file.fileno(), _FICLONE, source_file.fileno())
+            except OSError:
+                target_file.close()
+                os.remove(target)
+                raise
+    else:
+        raise OSError(f'Reflinks are not supported on {platform}')
+
+class ArtifactStore:
+    '''
+    Files under root/blobs/<2 digits>/<sha256>[.x] (.x for executables, which keep their mode) and
+    trees under root/trees/<tree id>.json, mapping the relative path of every file of a stored
+    directory to its blob. Blobs are read-only, as the files materialized in hardlink mode share
+    them; the other modes materialize writable files. A materialized
+    directory is recorded in a <directory>.artifact-tree file next to it, so corrupted blobs can be
+    traced back to the directories that use them.
+    '''
+
+    def __init__(self, root: str, link_mode: str = 'auto'):
+        if link_mode not in LINK_MODES:
+            raise ValueError(f"Invalid link mode '{link_mode}', expected one of {LINK_MODES}")
+        self.root = os.path.abspath(root)
+        self.link_mode = link_mode
+
+    def __blob_path(self, blob: str) -> str:
+        return os.path.join(self.root, 'blobs', blob[:2], blob)
+
+    def __tree_path(self, tree_id: str) -> str:
+        return os.path.join(self.root, 'trees', f'{tree_id}.json')
+
+    @staticmethod
+    def get_tree_marker_path(directory: str) -> str:
+        return os.path.normpath(directory) + '.artifact-tree'
+
+    def __add_blob(self, file_path: str) -> str:
+        executable = os.stat(file_path).st_mode & stat.S_IXUSR != 0
+        blob = get_file_digest(file_path) + ('.x' if executable else '')
+        blob_path = self.__blob_path(blob)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            temp_path = f'{blob_path}.{uuid.uuid4().hex}.tmp'
+            shutil.copyfile(file_path, temp_path)
+            os.chmod(temp_path, 0o555 if executable else 0o444)
+            os.replace(temp_path, blob_path)
+        return blob
+
+    def add_directory(self, directory: str) -> str:
+        '''Stores every file of directory (following symlinks) and returns the id of the tree.'''
+        files: dict[str, str] = {}
+        for dirpath, dirnames, filenames in os.walk(directory, followlinks=True):
+            dirnames.sort()
+            for name in sorted(filenames):
+                file_path = os.path.join(dirpath, name)
+                files[os.path.relpath(file_path, directory).replace(os.sep, '/')] = self.__add_blob(file_path)
+
+        content = json.dumps(files, sort_keys=True, indent=1)
+        tree_id = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        tree_path = self.__tree_path(tree_id)
+        if not os.path.exists(tree_path):
+            os.makedirs(os.path.dirname(tree_path), exist_ok=True)
+            temp_path = f'{tree_path}.{uuid.uuid4().hex}.tmp'
+            with open(temp_path, 'w', encoding='utf8') as tree_file:
+                tree_file.write(content)
+            os.replace(temp_path, tree_path)
+        getLogger().info("Stored '%s' in the artifact store as tree %s (%d files)", directory, tree_id, len(files))
+        return tree_id
+
+    def get_tree(self, tree_id: str) -> dict[str, str]:
+        with open(self.__tree_path(tree_id), 'r', encoding='utf8') as tree_file:
+            tree: dict[str, str] = json.load(tree_file)
+            return tree
+
+    def __materialize_file(self, blob_path: str, target: str) -> None:
+        if self.link_mode in ('auto', 'reflink'):
+            try:
+                reflink(blob_path, target)
+                # Clones are independent files, they do not have to stay read-only like the blob
+                os.chmod(target, 0o755 if blob_path.endswith('.x') else 0o644)
+                return
+            except OSError:
+                if self.link_mode == 'reflink':
+                    raise
+        if self.link_mode == 'hardlink':
+            os.link(blob_path, target)
+            return
+        shutil.copyfile(blob_path, target)
+        os.chmod(target, 0o755 if blob_path.endswith('.x') else 0o644)
+
+    def materialize(self, tree_id: str, directory: str) -> None:
+        '''Replaces directory with the files of the tree.'''
+        tree = self.get_tree(tree_id)
+        remove_directory(directory)
+        for relative_path, blob in tree.items():
+            target = os.path.join(directory, *relative_path.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            self.__materialize_file(self.__blob_path(blob), target)
+        with open(self.get_tree_marker_path(directory), 'w', encoding='utf8') as marker_file:
+            marker_file.write(tree_id)
+        getLogger().info("Materialized tree %s into '%s'", tree_id, directory)
+
+    def store_and_materialize(self, source: str, directories: list[str]) -> str:
+        '''Stores source once and materializes it into each of the directories.'''
+        tree_id = self.add_directory(source)
+        for directory in directories:
+            self.materialize(tree_id, directory)
+        return tree_id
+
+    def verify(self, remove_corrupted: bool = True) -> set[str]:
+        '''
+        Rehashes every blob and returns the ones whose content does not match their name,
+        removing them unless remove_corrupted is False.
+        '''
+        corrupted: set[str] = set()
+        blobs_directory = os.path.join(self.root, 'blobs')
+        for dirpath, _, filenames in os.walk(blobs_directory):
+            for blob in filenames:
+                if blob.endswith('.tmp'):
+                    continue
+                blob_path = os.path.join(dirpath, blob)
+                if get_file_digest(blob_path) != blob.split('.')[0]:
+                    getLogger().warning("Artifact store blob '%s' is corrupted", blob_path)
+                    corrupted.add(blob)
+                    if remove_corrupted:
+                        os.chmod(blob_path, stat.S_IWRITE | stat.S_IREAD)
+                        os.remove(blob_path)
+        return corrupted
+
+    def is_intact(self, tree_id: str, corrupted: Optional[set[str]] = None) -> bool:
+        '''Whether the tree exists and none of its blobs is missing or among the corrupted ones.'''
+        try:
+            tree: dict[str, Any] = self.get_tree(tree_id)
+        except (OSError, ValueError):
+            return False
+        return all(blob not in (corrupted or set()) and os.path.exists(self.__blob_path(blob)) for blob in tree.values())
+
+    def verify_directory(self, tree_id: str, directory: str) -> bool:
+        '''Whether every file of the tree is materialized in directory with the content it was stored with.'''
+        try:
+            tree = self.get_tree(tree_id)
+        except (OSError, ValueError):
+            return False
+        for relative_path, blob in tree.items():
+            target = os.path.join(directory, *relative_path.split('/'))
+            if not os.path.isfile(target) or get_file_digest(target) != blob.split('.')[0]:
+                getLogger().warning("'%s' does not match the artifact store tree %s", target, tree_id)
+                return False
+        return True
@@ -0,0 +1,47 @@
+'''
+Search of the first regressing commit of a commit range.
+
+The range is searched like git bisect, except that each step can probe several commits at once:
+the probes split the remaining range into equal segments and are all measured in a single
+benchmark run, so a run of k probes narrows the range k + 1 times instead of twice.
+'''
+
+from collections.abc import Callable, Sequence
+from typing import Optional
+
+def get_probe_indices(good: int, bad: int, probe_count: int) -> list[int]:
+    '''
+    Up to probe_count distinct indices strictly between good and bad that split the range into
+    equal segments.
+    '''
+    if bad - good < 2 or probe_count < 1:
+        return []
+    span = bad - good
+    indices = {good + (span * (i + 1)) // (probe_count + 1) for i in range(probe_count)}
+    return sorted(index for index in indices if good < index < bad)
+
+def find_first_regression(
+        commits: Sequence[str],
+        is_regressed: Callable[[list[str]], list[bool]],
+        probe_count: int = 1) -> Optional[str]:
+    '''
+    The first commit of commits (ordered from oldest to newest, all newer than the known good
+    commit) that is regressed. is_regressed judges a batch of commits against the good commit.
+    The newest commit is checked first, and None is returned when it is not regressed. The
+    regression is assumed to persist in every later commit.
+    '''
+    if not commits:
+        return None
+    if not is_regressed([commits[-1]])[0]:
+        return None
+
+    # commits[bad] is regressed; good is the index of the newest commit known not to be, -1 for the good commit
+    good, bad = -1, len(commits) - 1
+    while bad - good > 1:
+        probes = get_probe_indices(good, bad, probe_count)
+        for index, regressed in zip(probes, is_regressed([commits[index] for index in probes])):
+            if regressed:
+                bad = index
+                break
+            good = index
+    return commits[bad]
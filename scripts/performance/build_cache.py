@@ -0,0 +1,163 @@
+'''
+Fingerprint-keyed cache of project build outputs.
+
+Building the micro benchmarks is a full restore and compile on every Helix work item, even when
+neither the sources nor the SDK changed. The fingerprint of a build hashes everything it depends on:
+the files of the project and of the projects it references, the Directory.Build.* files and repo
+level build configuration, and properties such as the SDK version, target frameworks and build
+arguments. BuildCache stores the output directories of a build under its fingerprint, so a later
+build with the same fingerprint copies them back instead of building.
+'''
+
+from logging import getLogger
+from typing import Any, Optional
+from xml.etree import ElementTree
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+from .common import file_lock, remove_directory
+
+DEFAULT_MAX_ENTRIES = 4
+
+# Files outside of the project directories that affect every build of the repository
+REPO_BUILD_INPUTS = ['global.json', 'NuGet.config', os.path.join('eng', 'Versions.props'), os.path.join('eng', 'Version.Details.xml')]
+DIRECTORY_BUILD_FILES = ['Directory.Build.props', 'Directory.Build.targets', 'Directory.Packages.props']
+PROJECT_FILE_EXTENSIONS = ('.csproj', '.fsproj', '.vbproj', '.props', '.targets')
+
+def get_project_references(project_file: str) -> list[str]:
+    '''The absolute paths of the ProjectReference items of an MSBuild project file.'''
+    references: list[str] = []
+    for element in ElementTree.parse(project_file).getroot().iter():
+        if element.tag.rsplit('}', 1)[-1] == 'ProjectReference' and element.get('Include'):
+            include = element.get('Include', '').replace('\\', os.sep)
+            references.append(os.path.normpath(os.path.join(os.path.dirname(project_file), include)))
+    return references
+
+def get_project_graph(project_file: str) -> list[str]:
+    '''The project file and every project it references, directly or not.'''
+    projects: list[str] = []
+    pending = [os.path.abspath(project_file)]
+    while pending:
+        project = pending.pop()
+        if project in projects or not os.path.isfile(project):
+            continue
+        projects.append(project)
+        pending += get_project_references(project)
+    return sorted(projects)
+
+def get_build_inputs(project_file: str, repo_root: str, project_files_only: bool = False) -> list[str]:
+    '''
+    The files a build of project_file depends on: the files under the directory of every project of
+    its graph (bin and obj excluded), the Directory.Build.* files of their ancestors up to repo_root,
+    and the repository wide build configuration. With project_files_only, only the MSBuild files of
+    the project directories are included, which is what a restore depends on.
+    '''
+    repo_root = os.path.abspath(repo_root)
+    inputs: set[str] = set()
+    for project in get_project_graph(project_file):
+        project_directory = os.path.dirname(project)
+        for dirpath, dirnames, filenames in os.walk(project_directory):
+            dirnames[:] = sorted(name for name in dirnames if name not in ('bin', 'obj'))
+            inputs.update(os.path.join(dirpath, name) for name in filenames
+                          if not project_files_only or name.endswith(PROJECT_FILE_EXTENSIONS))
+
+        directory = project_directory
+        while directory.startswith(repo_root):
+            inputs.update(os.path.join(directory, name) for name in DIRECTORY_BUILD_FILES if os.path.isfile(os.path.join(directory, name)))
+            if directory == repo_root:
+                break
+            directory = os.path.dirname(directory)
+
+    inputs.update(os.path.join(repo_root, name) for name in REPO_BUILD_INPUTS if os.path.isfile(os.path.join(repo_root, name)))
+    return sorted(inputs)
+
+def compute_fingerprint(input_files: list[str], base_directory: str, properties: dict[str, Any]) -> str:
+    '''SHA-256 over the relative path and content of every input file, and the given properties.'''
+    digest = hashlib.sha256()
+    digest.update(json.dumps(properties, sort_keys=True).encode('utf-8'))
+    for input_file in sorted(input_files):
+        digest.update(b'\0' + os.path.relpath(input_file, base_directory).replace(os.sep, '/').encode('utf-8') + b'\0')
+        with open(input_file, 'rb') as content:
+            for chunk in iter(lambda: content.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+class BuildCache:
+    '''
+    Build outputs under root/<fingerprint>/outputs, stored relative to the directory they were built
+    in. root/<fingerprint>/manifest.json is written last and marks the entry as complete.
+    '''
+
+    def __init__(self, root: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.root = os.path.abspath(root)
+        self.max_entries = max_entries
+
+    def __entry_directory(self, fingerprint: str) -> str:
+        return os.path.join(self.root, fingerprint)
+
+    def __manifest_path(self, fingerprint: str) -> str:
+        return os.path.join(self.__entry_directory(fingerprint), 'manifest.json')
+
+    def __read_manifest(self, fingerprint: str) -> Optional[dict[str, Any]]:
+        try:
+            with open(self.__manifest_path(fingerprint), 'r', encoding='utf8') as manifest_file:
+                manifest: dict[str, Any] = json.load(manifest_file)
+                return manifest
+        except (OSError, ValueError):
+            return None
+
+    def contains(self, fingerprint: str) -> bool:
+        return self.__read_manifest(fingerprint) is not None
+
+    def restore(self, fingerprint: str, base_directory: str) -> bool:
+        '''
+        Copies the outputs stored for fingerprint into base_directory, replacing the directories they
+        came from. Returns False on a cache miss.
+        '''
+        with file_lock(os.path.join(self.root, '.lock')):
+            manifest = self.__read_manifest(fingerprint)
+            if manifest is None:
+                return False
+            outputs_directory = os.path.join(self.__entry_directory(fingerprint), 'outputs')
+            for relative_directory in manifest['directories']:
+                target = os.path.join(base_directory, relative_directory)
+                remove_directory(target)
+                # Plain copies get a new modification time, so the outputs are newer than the sources
+                # of a fresh checkout and MSBuild considers them up to date.
+                shutil.copytree(os.path.join(outputs_directory, relative_directory), target, symlinks=True, copy_function=shutil.copy)
+            os.utime(self.__manifest_path(fingerprint))
+        getLogger().info("Restored build %s from the build cache at '%s'", fingerprint, self.root)
+        return True
+
+    def save(self, fingerprint: str, base_directory: str, relative_directories: list[str], metadata: Optional[dict[str, Any]] = None) -> None:
+        '''Stores the given output directories of base_directory under fingerprint, then evicts the oldest entries.'''
+        os.makedirs(self.root, exist_ok=True)
+        staging_directory = os.path.join(self.root, f'.staging-{uuid.uuid4().hex}')
+        try:
+            for relative_directory in relative_directories:
+                shutil.copytree(os.path.join(base_directory, relative_directory), os.path.join(staging_directory, 'outputs', relative_directory), symlinks=True)
+            with open(os.path.join(staging_directory, 'manifest.json'), 'w', encoding='utf8') as manifest_file:
+                json.dump({**(metadata or {}), 'fingerprint': fingerprint, 'directories': relative_directories, 'created': time.time()}, manifest_file, indent=2)
+
+            with file_lock(os.path.join(self.root, '.lock')):
+                entry_directory = self.__entry_directory(fingerprint)
+                if os.path.isdir(entry_directory):
+                    remove_directory(entry_directory)
+                os.rename(staging_directory, entry_directory)
+                self.__evict(fingerprint)
+        finally:
+            if os.path.isdir(staging_directory):
+                remove_directory(staging_directory)
+        getLogger().info("Saved build %s to the build cache at '%s'", fingerprint, self.root)
+
+    def __evict(self, keep: str) -> None:
+        entries = [name for name in os.listdir(self.root) if not name.startswith('.') and name != keep]
+        entries.sort(key=lambda name: os.path.getmtime(self.__manifest_path(name)) if self.contains(name) else 0)
+        for name in entries[:max(0, len(entries) + 1 - self.max_entries)]:
+            getLogger().info('Evicting build %s from the build cache', name)
+            remove_directory(self.__entry_directory(name))
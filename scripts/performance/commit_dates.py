@@ -0,0 +1,161 @@
+'''
+Commit date resolution for the ci_setup script.
+
+Resolving the date of the product commit used to mean downloading its .patch file from GitHub,
+with retries that sleep for minutes when GitHub throttles. Commit dates never change, so they are
+kept in an on-disk JSON lines cache shared by every run on the machine, and cache misses go
+through a chain of resolvers: the local git object database when a clone is available, then the
+GitHub .patch download.
+'''
+
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from logging import getLogger
+from re import MULTILINE, search
+from time import sleep
+from typing import Optional
+from urllib.request import urlopen
+
+import json
+import os
+
+from .common import RunCommand, file_lock, override
+
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+def get_default_cache_path() -> str:
+    '''PERFLAB_COMMIT_DATE_CACHE, or commit-dates.jsonl in the user cache directory.'''
+    configured = os.environ.get('PERFLAB_COMMIT_DATE_CACHE')
+    if configured:
+        return configured
+    cache_home = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'dotnet-performance', 'commit-dates.jsonl')
+
+def parse_patch_date(patch: str) -> Optional[str]:
+    '''The UTC timestamp of the Date header of a git .patch file.'''
+    date_match = search(r'^Date: (.+)$', patch, MULTILINE)
+    if not date_match:
+        return None
+    return datetime.strptime(date_match.group(1), '%a, %d %b %Y %H:%M:%S %z').astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+class CommitDateCache:
+    '''
+    Commit timestamps keyed by commit sha, stored one JSON record per line. A sha identifies the
+    same commit in every fork and mirror, so the repositories it was looked up in and the resolver
+    that found it are only recorded as provenance.
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__dates: dict[str, str] = {}
+        try:
+            with open(path, 'r', encoding='utf8') as cache_file:
+                for line in cache_file:
+                    try:
+                        record = json.loads(line)
+                        self.__dates[record['commit']] = record['timestamp']
+                    except (ValueError, KeyError, TypeError):
+                        # Skip lines torn by an interrupted write
+                        continue
+        except OSError:
+            pass
+
+    def get(self, commit_sha: str) -> Optional[str]:
+        return self.__dates.get(commit_sha)
+
+    def put(self, repositories: list[str], commit_sha: str, timestamp: str, source: str) -> None:
+        self.__dates[commit_sha] = timestamp
+        try:
+            with file_lock(self.path + '.lock'):
+                with open(self.path, 'a', encoding='utf8') as cache_file:
+                    cache_file.write(json.dumps({'commit': commit_sha, 'timestamp': timestamp, 'repositories': repositories, 'source': source}) + '\n')
+        except OSError as error:
+            getLogger().warning("Could not write the commit date cache '%s': %s", self.path, error)
+
+class CommitDateResolver(ABC):
+    '''Looks up the timestamp of a commit of one of the given owner/repo repositories.'''
+    name = 'resolver'
+
+    @abstractmethod
+    def resolve(self, repositories: list[str], commit_sha: str) -> Optional[str]:
+        ...
+
+class GitCommitDateResolver(CommitDateResolver):
+    '''Reads the commit from the object database of local clones, without any network access.'''
+    name = 'git'
+
+    def __init__(self, clone_paths: list[str]):
+        self.clone_paths = clone_paths
+
+    @override
+    def resolve(self, repositories: list[str], commit_sha: str) -> Optional[str]:
+        for clone_path in self.clone_paths:
+            if not os.path.exists(os.path.join(clone_path, '.git')):
+                continue
+            # git exits with 128 when the commit is not in this clone
+            command = RunCommand(['git', '-C', clone_path, 'show', '-s', '--format=%at', f'{commit_sha}^{{commit}}'], success_exit_codes=[0, 128], verbose=True, echo=False)
+            try:
+                command.run()
+            except OSError:
+                # git is not installed
+                return None
+            author_time = command.stdout.strip()
+            if author_time.isdigit():
+                return datetime.fromtimestamp(int(author_time), timezone.utc).strftime(TIMESTAMP_FORMAT)
+        return None
+
+class HttpPatchCommitDateResolver(CommitDateResolver):
+    '''
+    Downloads the .patch file of the commit from GitHub (or base_url), trying every repository
+    before sleeping, with an exponential backoff between attempts.
+    '''
+    name = 'http'
+
+    def __init__(self, base_url: str = 'https://github.com', attempts: int = 5, initial_delay: float = 10):
+        self.base_url = base_url.rstrip('/')
+        self.attempts = attempts
+        self.initial_delay = initial_delay
+
+    @override
+    def resolve(self, repositories: list[str], commit_sha: str) -> Optional[str]:
+        sleep_time = self.initial_delay
+        for attempt in range(self.attempts):
+            for repository in repositories:
+                url = f'{self.base_url}/{repository}/commit/{commit_sha}.patch'
+                try:
+                    with urlopen(url) as response:
+                        getLogger().info("Commit: %s", url)
+                        timestamp = parse_patch_date(response.read().decode('utf-8'))
+                        if timestamp:
+                            return timestamp
+                except Exception as error:
+                    getLogger().warning(f"Error trying to get commit date from {url}; {type(error).__name__}: {error}; Attempt {attempt}")
+            if attempt < self.attempts - 1:
+                sleep(sleep_time)
+                sleep_time = sleep_time * 2
+        return None
+
+def resolve_commit_date(
+        repositories: list[str],
+        commit_sha: str,
+        resolvers: list[CommitDateResolver],
+        cache: Optional[CommitDateCache] = None) -> str:
+    '''
+    The UTC timestamp of the commit, from the cache or else from the first resolver that finds it.
+    Resolved timestamps are added to the cache.
+    '''
+    if cache is not None:
+        timestamp = cache.get(commit_sha)
+        if timestamp:
+            getLogger().info("Got UTC timestamp %s of commit %s from '%s'", timestamp, commit_sha, cache.path)
+            return timestamp
+
+    for resolver in resolvers:
+        timestamp = resolver.resolve(repositories, commit_sha)
+        if timestamp:
+            getLogger().info("Got UTC timestamp %s of commit %s from the %s resolver", timestamp, commit_sha, resolver.name)
+            if cache is not None:
+                cache.put(repositories, commit_sha, timestamp, resolver.name)
+            return timestamp
+
+    raise RuntimeError(f'Could not get timestamp for commit {commit_sha}')
@@ -2,6 +2,7 @@
 Common functionality used by the repository scripts.
 '''
 
+from collections import deque
 from collections.abc import Callable
 from contextlib import contextmanager
 from logging import getLogger
@@ -12,15 +13,26 @@ from subprocess import CalledProcessError
 from subprocess import list2cmdline
 from subprocess import PIPE, STDOUT, DEVNULL
 from subprocess import Popen
-from typing import Any, Optional, TypeVar
-from io import StringIO
+from typing import TYPE_CHECKING, Any, Optional, TypeVar, Union
 from platform import machine
 
+import asyncio
 import os
 import sys
 import time
 import base64
 
+from .resource_usage import CommandUsage, is_resource_accounting_enabled, resource_usage_recorder, wait_with_rusage
+
+if TYPE_CHECKING:
+    from typing_extensions import override as override
+else:
+    try:
+        from typing import override
+    except ImportError:
+        # typing.override is new in Python 3.12, it only matters to the type checker
+        def override(method):
+            return method
 
 def get_machine_architecture():
     machineArch = machine().lower()
@@ -36,6 +48,28 @@ def get_machine_architecture():
     else:
         return 'x64' # Default architecture
 
+def get_physical_memory_bytes() -> Optional[int]:
+    '''The total physical memory of the machine, or None when it cannot be determined.'''
+    if sys.platform == 'win32':
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                        ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                        ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                        ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return None
+        return int(status.ullTotalPhys)
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
 def iswin():
     return sys.platform == 'win32'
 
@@ -164,6 +198,37 @@ def push_dir(path: Optional[str] = None):
     else:
         yield
 
+@contextmanager
+def file_lock(path: str):
+    '''
+    Holds an exclusive lock on the specified lock file (created when missing)
+    for the duration of the with block, across threads and processes.
+    '''
+    make_directory(os.path.dirname(os.path.abspath(path)))
+    with open(path, 'a+b') as lock_file:
+        if sys.platform == 'win32':
+            import msvcrt
+            lock_file.seek(0)
+            while True:
+                try:
+                    # LK_LOCK only retries for 10 seconds before raising
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
 TRet = TypeVar('TRet')
 def retry_on_exception(
         function: Callable[[], TRet],
@@ -263,6 +328,65 @@ def run_msbuild_command(args: list[str], verbose: bool=True, warn_as_error: bool
     cmdline += args
     return RunCommand(cmdline, verbose=verbose).run()
 
+# Size of the reads from a child process output pipe.
+OUTPUT_CHUNK_SIZE = 64 * 1024
+
+class OutputCapture:
+    '''
+    Collects the output of a child process as it is read in chunks. Complete lines are echoed to the
+    logger, at most max_bytes of the most recent output are kept in memory (everything when None),
+    and all of it can optionally be spilled to a file.
+    '''
+
+    def __init__(self, echo: bool, max_bytes: Optional[int] = None, spill_path: Optional[str] = None):
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError('max_bytes must be > 0')
+        self.__echo = echo
+        self.__max_bytes = max_bytes
+        self.__chunks: deque[bytes] = deque()
+        self.__size = 0
+        self.__truncated = False
+        self.__pending_line: bytes = b''
+        self.__spill = open(spill_path, 'wb') if spill_path else None
+
+    @property
+    def truncated(self) -> bool:
+        '''Whether older output was dropped to stay within max_bytes.'''
+        return self.__truncated
+
+    def write(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        if self.__spill is not None:
+            self.__spill.write(chunk)
+        self.__chunks.append(chunk)
+        self.__size += len(chunk)
+        if self.__max_bytes is not None:
+            # Drop the oldest chunks that are entirely out of the last max_bytes, then trim the oldest one left
+            while self.__size - len(self.__chunks[0]) >= self.__max_bytes:
+                self.__size -= len(self.__chunks.popleft())
+                self.__truncated = True
+            if self.__size > self.__max_bytes:
+                self.__chunks[0] = self.__chunks[0][self.__size - self.__max_bytes:]
+                self.__size = self.__max_bytes
+                self.__truncated = True
+        if self.__echo:
+            lines = (self.__pending_line + chunk).split(b'\n')
+            self.__pending_line = lines.pop()
+            for line in lines:
+                getLogger().info(line.decode('utf-8', errors='backslashreplace').rstrip())
+
+    def close(self) -> None:
+        if self.__echo and self.__pending_line:
+            getLogger().info(self.__pending_line.decode('utf-8', errors='backslashreplace').rstrip())
+            self.__pending_line = b''
+        if self.__spill is not None:
+            self.__spill.close()
+            self.__spill = None
+
+    def getvalue(self) -> str:
+        return b''.join(self.__chunks).decode('utf-8', errors='backslashreplace')
+
 class RunCommand:
     '''
     This is a class wrapper around `subprocess.Popen` with an additional set
@@ -275,7 +399,9 @@ class RunCommand:
             success_exit_codes: Optional[list[int]] = None,
             verbose: bool = False,
             echo: bool = True,
-            retry: int = 0):
+            retry: int = 0,
+            max_output_bytes: Optional[int] = None,
+            output_file: Optional[str] = None):
         if not cmdline:
             raise ValueError('Specified command line is empty.')
 
@@ -283,6 +409,9 @@ class RunCommand:
         self.__verbose = verbose
         self.__retry = retry
         self.__echo = echo
+        self.__max_output_bytes = max_output_bytes
+        self.__output_file = output_file
+        self.__stdout = OutputCapture(False)
 
         if success_exit_codes is None:
             self.__success_exit_codes = [0]
@@ -314,39 +443,116 @@ class RunCommand:
 
     @property
     def stdout(self) -> str:
+        '''The captured output, limited to the last max_output_bytes when set.'''
         return self.__stdout.getvalue()
 
+    def __quoted_cmdline(self) -> str:
+        if '-AzureFeed' in self.cmdline or '-FeedCredential' in self.cmdline:
+            return "<dotnet-install command contains secrets, skipping log>"
+        return '$ ' + list2cmdline(self.cmdline)
+
+    def __new_usage(self, quoted_cmdline: str) -> Optional[CommandUsage]:
+        if not is_resource_accounting_enabled():
+            return None
+        start_time_ns = time.time_ns()
+        return CommandUsage(quoted_cmdline[2:] if quoted_cmdline.startswith('$ ') else quoted_cmdline, 0, start_time_ns, start_time_ns)
+
+    def __new_capture(self) -> OutputCapture:
+        return OutputCapture(self.echo, self.__max_output_bytes, self.__output_file)
+
+    def __get_cwd_and_cmdline(self, working_directory: Optional[str]) -> tuple[Optional[str], list[str]]:
+        '''
+        The working directory of the child and the command line to start it with. The working
+        directory is passed to the child rather than changed with push_dir, as commands can be
+        running concurrently on several threads of this process. Popen looks for a relative
+        executable relative to the working directory of the child on POSIX only, so one that
+        exists in the working directory is made absolute.
+        '''
+        if not working_directory:
+            return None, self.cmdline
+        cwd = os.path.abspath(working_directory)
+        executable = self.cmdline[0]
+        if not os.path.isabs(executable) and (os.path.dirname(executable) or sys.platform == 'win32') \
+                and os.path.isfile(os.path.join(cwd, executable)):
+            return cwd, [os.path.join(cwd, executable)] + self.cmdline[1:]
+        return cwd, self.cmdline
+
+    def __log_cmdline(self, quoted_cmdline: str, cwd: Optional[str]) -> None:
+        getLogger().info(quoted_cmdline if cwd is None else '{} (in "{}")'.format(quoted_cmdline, cwd))
+
     def __runinternal(self, working_directory: Optional[str] = None) -> tuple[int, str]:
         should_pipe = self.verbose
-        with push_dir(working_directory):
-            quoted_cmdline = '$ '
-            quoted_cmdline += list2cmdline(self.cmdline)
-
-            if '-AzureFeed' in self.cmdline or '-FeedCredential' in self.cmdline:
-                quoted_cmdline = "<dotnet-install command contains secrets, skipping log>"
-
-            getLogger().info(quoted_cmdline)
-
-            with Popen(
-                    self.cmdline,
-                    stdout=PIPE if should_pipe else DEVNULL,
-                    stderr=STDOUT,
-                    universal_newlines=False,
-                    encoding=None,
-                    bufsize=0
-            ) as proc:
-                if proc.stdout is not None:
-                    with proc.stdout:
-                        self.__stdout = StringIO()
-                        for raw_line in iter(proc.stdout.readline, b''):
-                            line = raw_line.decode('utf-8', errors='backslashreplace')
-                            self.__stdout.write(line)
-                            line = line.rstrip()
-                            if self.echo:
-                                getLogger().info(line)
-                proc.wait()
-                return (proc.returncode, quoted_cmdline)
-
+        cwd, cmdline = self.__get_cwd_and_cmdline(working_directory)
+        quoted_cmdline = self.__quoted_cmdline()
+        self.__log_cmdline(quoted_cmdline, cwd)
+
+        usage = self.__new_usage(quoted_cmdline)
+        with Popen(
+                cmdline,
+                stdout=PIPE if should_pipe else DEVNULL,
+                stderr=STDOUT,
+                universal_newlines=False,
+                encoding=None,
+                bufsize=0,
+                cwd=cwd
+        ) as proc:
+            if proc.stdout is not None:
+                with proc.stdout:
+                    self.__stdout = self.__new_capture()
+                    try:
+                        for chunk in iter(lambda: proc.stdout.read(OUTPUT_CHUNK_SIZE), b''): # pyright: ignore[reportOptionalMemberAccess] -- checked above
+                            self.__stdout.write(chunk)
+                    finally:
+                        self.__stdout.close()
+            if usage is not None:
+                waited = wait_with_rusage(proc.pid)
+                if waited is not None:
+                    # The child has been reaped by wait4, so hand its exit code to Popen
+                    proc.returncode, rusage = waited
+                    usage.set_rusage(rusage)
+            proc.wait()
+            if usage is not None:
+                usage.returncode = proc.returncode
+                usage.end_time_ns = time.time_ns()
+                resource_usage_recorder.add(usage)
+            return (proc.returncode, quoted_cmdline)
+
+    async def __runinternal_async(self, working_directory: Optional[str] = None) -> tuple[int, str]:
+        cwd, cmdline = self.__get_cwd_and_cmdline(working_directory)
+        quoted_cmdline = self.__quoted_cmdline()
+        self.__log_cmdline(quoted_cmdline, cwd)
+
+        # The asyncio child watcher reaps the process, so only the wall time is recorded on this path
+        usage = self.__new_usage(quoted_cmdline)
+        proc = await asyncio.create_subprocess_exec(
+            *cmdline,
+            stdout=asyncio.subprocess.PIPE if self.verbose else asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.STDOUT,
+            cwd=cwd)
+        if proc.stdout is not None:
+            self.__stdout = self.__new_capture()
+            try:
+                while True:
+                    chunk = await proc.stdout.read(OUTPUT_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    self.__stdout.write(chunk)
+            finally:
+                self.__stdout.close()
+        returncode = await proc.wait()
+        if usage is not None:
+            usage.returncode = returncode
+            usage.end_time_ns = time.time_ns()
+            resource_usage_recorder.add(usage)
+        return (returncode, quoted_cmdline)
+
+    def __check_returncode(self, returncode: int, quoted_cmdline: str) -> int:
+        if returncode not in self.success_exit_codes:
+            getLogger().error(
+                "Process exited with status %s", returncode)
+            raise CalledProcessError(
+                returncode, quoted_cmdline)
+        return returncode
 
     def run(self, working_directory: Optional[str] = None) -> int:
         '''Executes specified shell command.'''
@@ -357,13 +563,18 @@ class RunCommand:
             (returncode, _) = self.__runinternal(working_directory)
             retrycount += 1
 
-        if returncode not in self.success_exit_codes:
-            getLogger().error(
-                "Process exited with status %s", returncode)
-            raise CalledProcessError(
-                returncode, quoted_cmdline)
-        
-        return returncode
+        return self.__check_returncode(returncode, quoted_cmdline)
+
+    async def run_async(self, working_directory: Optional[str] = None) -> int:
+        '''Executes specified shell command without blocking the event loop.'''
+
+        retrycount = 0
+        (returncode, quoted_cmdline) = await self.__runinternal_async(working_directory)
+        while returncode not in self.success_exit_codes and self.__retry != 0 and retrycount < self.__retry:
+            (returncode, _) = await self.__runinternal_async(working_directory)
+            retrycount += 1
+
+        return self.__check_returncode(returncode, quoted_cmdline)
 
     def run_and_get_stdout(self, working_directory: Optional[str] = None) -> str:
         '''Executes specified shell command and returns its stdout.'''
@@ -380,4 +591,30 @@ class RunCommand:
             self.__verbose = prev_verbose
             self.__echo = prev_echo
 
-        return self.stdout
\ No newline at end of file
+        return self.stdout
+
+def run_commands_concurrently(
+        commands: list[tuple[RunCommand, Optional[str]]],
+        max_concurrency: Optional[int] = None) -> list[int]:
+    '''
+    Runs several (command, working directory) pairs concurrently, at most max_concurrency at a time
+    (defaults to the number of CPUs). Returns the exit codes in the order of the commands. If any
+    command fails, the CalledProcessError of the first failing command is raised once all have finished.
+    '''
+    if max_concurrency is not None and max_concurrency < 1:
+        raise ValueError('max_concurrency must be >= 1')
+
+    async def _run_all() -> list[Union[int, BaseException]]:
+        semaphore = asyncio.Semaphore(max_concurrency or os.cpu_count() or 1)
+
+        async def _run_one(command: RunCommand, working_directory: Optional[str]) -> int:
+            async with semaphore:
+                return await command.run_async(working_directory)
+
+        return await asyncio.gather(*(_run_one(command, working_directory) for command, working_directory in commands), return_exceptions=True)
+
+    results = asyncio.run(_run_all())
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return [result for result in results if not isinstance(result, BaseException)]
@@ -0,0 +1,312 @@
+'''
+Statistical comparison of base and diff benchmark results.
+
+This is a Python port of the two-input mode of src/tools/ResultsComparer, so that the compare flow
+on Helix does not have to build and run a C# tool. Each benchmark is judged with a two one-sided
+Mann-Whitney tests (TOST) against the user threshold and again against the noise threshold, exactly
+like ResultsComparer does with Perfolizer, and all benchmarks are processed in one pass.
+'''
+
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from functools import lru_cache
+from random import Random
+from statistics import median
+from typing import Any, Optional, cast
+from xml.etree import ElementTree as ET
+
+import json
+import math
+import os
+import re
+
+from .common import override
+from .results import ResultsTable
+
+SAME = 'Same'
+BASE = 'Base'
+FASTER = 'Faster'
+SLOWER = 'Slower'
+
+SIGNIFICANCE_LEVEL = 0.05
+
+# Above this sample size the exact Mann-Whitney distribution gets expensive and the normal approximation is good enough
+EXACT_SAMPLE_LIMIT = 30
+
+FULL_BDN_JSON_FILE_EXTENSION = 'full.json'
+
+_UNITS_TO_NS = {'ns': 1.0, 'us': 1e3, 'μs': 1e3, 'ms': 1e6, 's': 1e9}
+
+class Threshold:
+    '''A relative (5%) or absolute (0.3ns, 10ms) threshold, as accepted by ResultsComparer.'''
+
+    def __init__(self, value: float, relative: bool):
+        self.value = value
+        self.relative = relative
+
+    @staticmethod
+    def parse(text: str) -> 'Threshold':
+        match = re.fullmatch(r'\s*([0-9]*\.?[0-9]+)\s*(%|ns|us|μs|ms|s)\s*', text)
+        if match is None:
+            raise ValueError(f"Invalid threshold '{text}'. Examples: 5%, 10ms, 100ns, 1s.")
+        number, unit = float(match.group(1)), match.group(2)
+        if unit == '%':
+            return Threshold(number / 100, True)
+        return Threshold(number * _UNITS_TO_NS[unit], False)
+
+    def get_value(self, sample: Sequence[float]) -> float:
+        '''The threshold in nanoseconds for the given sample.'''
+        return self.value * (sum(sample) / len(sample)) if self.relative else self.value
+
+    @override
+    def __str__(self) -> str:
+        return f'{self.value * 100:g}%' if self.relative else f'{self.value:g}ns'
+
+@lru_cache(maxsize=None)
+def _u_distribution(n: int, m: int) -> tuple[int, ...]:
+    '''Number of orderings of n x-values and m y-values giving each U statistic (no ties).'''
+    if n == 0 or m == 0:
+        return (1,)
+    counts = [0] * (n * m + 1)
+    # The largest value is either an x (beating all m y-values) or a y (beating none of the x-values)
+    for u, count in enumerate(_u_distribution(n - 1, m)):
+        counts[u + m] += count
+    for u, count in enumerate(_u_distribution(n, m - 1)):
+        counts[u] += count
+    return tuple(counts)
+
+def mann_whitney_greater(x: Sequence[float], y: Sequence[float]) -> float:
+    '''One-sided Mann-Whitney U test p-value for the alternative "x is stochastically greater than y".'''
+    n, m = len(x), len(y)
+    if n == 0 or m == 0:
+        return 1.0
+    combined = sorted([(value, 0) for value in x] + [(value, 1) for value in y])
+    ranks = [0.0] * len(combined)
+    tie_term = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        i = j + 1
+    rank_sum_x = sum(rank for rank, (_, source) in zip(ranks, combined) if source == 0)
+    u = rank_sum_x - n * (n + 1) / 2
+
+    if tie_term == 0 and n + m <= EXACT_SAMPLE_LIMIT:
+        distribution = _u_distribution(n, m)
+        return sum(distribution[math.ceil(u):]) / sum(distribution)
+
+    mean = n * m / 2
+    variance = n * m / 12 * ((n + m + 1) - tie_term / ((n + m) * (n + m - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+def _is_greater(x: Sequence[float], y: Sequence[float], threshold: Threshold) -> bool:
+    '''Whether x is greater than y by more than the threshold.'''
+    shift = threshold.get_value(x)
+    return mann_whitney_greater(x, [value + shift for value in y]) < SIGNIFICANCE_LEVEL
+
+def tost(base: Sequence[float], diff: Sequence[float], threshold: Threshold) -> str:
+    '''Two one-sided tests conclusion, mirroring Perfolizer's StatisticalTestHelper.CalculateTost.'''
+    if list(base) == list(diff):
+        return BASE
+    if _is_greater(base, diff, threshold):
+        return FASTER
+    if _is_greater(diff, base, threshold):
+        return SLOWER
+    return SAME
+
+def bootstrap_ratio_interval(
+        base: Sequence[float],
+        diff: Sequence[float],
+        iterations: int = 200,
+        confidence: float = 0.95,
+        seed: int = 0) -> tuple[float, float]:
+    '''Percentile bootstrap confidence interval of median(diff) / median(base).'''
+    rng = Random(seed)
+    ratios: list[float] = []
+    for _ in range(iterations):
+        base_median = median(rng.choices(base, k=len(base)))
+        diff_median = median(rng.choices(diff, k=len(diff)))
+        if base_median > 0:
+            ratios.append(diff_median / base_median)
+    if not ratios:
+        return (math.nan, math.nan)
+    ratios.sort()
+    tail = (1 - confidence) / 2
+    low = ratios[int(tail * (len(ratios) - 1))]
+    high = ratios[int(math.ceil((1 - tail) * (len(ratios) - 1)))]
+    return (low, high)
+
+@dataclass
+class ComparisonResult:
+    id: str
+    base: list[float]
+    diff: list[float]
+    conclusion: str
+    interval: Optional[tuple[float, float]] = None
+
+    @property
+    def base_median(self) -> float:
+        return median(self.base)
+
+    @property
+    def diff_median(self) -> float:
+        return median(self.diff)
+
+    @property
+    def ratio(self) -> float:
+        '''base/diff for improvements and diff/base otherwise, as printed by ResultsComparer.'''
+        numerator, denominator = (self.base_median, self.diff_median) if self.conclusion == FASTER else (self.diff_median, self.base_median)
+        return numerator / denominator if denominator != 0 else math.inf
+
+def get_files_to_parse(path: str) -> list[str]:
+    '''BDN full json files under a directory, or the given file itself.'''
+    if os.path.isdir(path):
+        files: list[str] = []
+        for dirpath, _, filenames in os.walk(path):
+            files += [os.path.join(dirpath, name) for name in filenames if name.endswith(FULL_BDN_JSON_FILE_EXTENSION)]
+        return sorted(files)
+    if os.path.isfile(path):
+        return [path]
+    raise FileNotFoundError(f'Provided path does NOT exist: {path}')
+
+def _get_benchmarks(content: Any) -> Optional[list[dict[str, Any]]]:
+    '''The benchmarks of a BDN full json file, None for any other json content.'''
+    if isinstance(content, dict):
+        return cast(dict[str, Any], content).get('Benchmarks')
+    return None
+
+def read_samples(files: Iterable[str]) -> dict[str, list[float]]:
+    '''
+    Reads benchmark samples keyed by benchmark id. BDN full json files contribute the original values of
+    each benchmark; perf-lab reports contribute the results of each test's default counter.
+    '''
+    samples: dict[str, list[float]] = {}
+    perf_lab_reports: list[str] = []
+    for file in files:
+        with open(file, 'r', encoding='utf8') as result_file:
+            benchmarks = _get_benchmarks(json.load(result_file))
+        if benchmarks is not None:
+            for benchmark in benchmarks:
+                statistics: Optional[dict[str, Any]] = benchmark.get('Statistics')
+                if statistics and statistics.get('OriginalValues'):  # failed benchmarks have no statistics
+                    samples[benchmark['FullName']] = [float(value) for value in statistics['OriginalValues']]
+        else:
+            perf_lab_reports.append(file)
+    if perf_lab_reports:
+        table = ResultsTable.from_files(perf_lab_reports)
+        for series in table.series(lambda _, counter: counter.default_counter):
+            samples[series.test.name] = list(series.values)
+    return samples
+
+def read_samples_by_job(files: Iterable[str], job_keys: Sequence[str]) -> dict[str, dict[str, list[float]]]:
+    '''
+    Reads the samples of BDN full json files that hold several jobs of each benchmark, like the results
+    of a run with several --corerun paths, keyed by job key and benchmark id. A benchmark belongs to the
+    first job key found in its DisplayInfo, which names the toolchain of the job.
+    '''
+    samples: dict[str, dict[str, list[float]]] = {job_key: {} for job_key in job_keys}
+    for file in files:
+        with open(file, 'r', encoding='utf8') as result_file:
+            benchmarks = _get_benchmarks(json.load(result_file)) or []
+        for benchmark in benchmarks:
+            statistics: Optional[dict[str, Any]] = benchmark.get('Statistics')
+            job_key = next((job_key for job_key in job_keys if job_key in benchmark.get('DisplayInfo', '')), None)
+            if job_key is not None and statistics and statistics.get('OriginalValues'):
+                samples[job_key][benchmark['FullName']] = [float(value) for value in statistics['OriginalValues']]
+    return samples
+
+def compare(
+        base: dict[str, list[float]],
+        diff: dict[str, list[float]],
+        threshold: Threshold,
+        noise: Threshold,
+        filters: Optional[list[str]] = None,
+        bootstrap_iterations: int = 200) -> list[ComparisonResult]:
+    '''
+    Compares every benchmark present in both inputs. All benchmarks are returned; the ones whose
+    difference is not significant against both the threshold and the noise threshold are Same.
+    Bootstrap intervals are only computed for the benchmarks that are not Same.
+    '''
+    results: list[ComparisonResult] = []
+    for benchmark_id, base_values in base.items():
+        diff_values = diff.get(benchmark_id)
+        if diff_values is None or (filters and not any(fnmatch(benchmark_id.lower(), pattern.lower()) for pattern in filters)):
+            continue
+        conclusion = tost(base_values, diff_values, threshold)
+        if conclusion in (FASTER, SLOWER) and tost(base_values, diff_values, noise) in (SAME, BASE):
+            conclusion = SAME
+        result = ComparisonResult(benchmark_id, base_values, diff_values, conclusion)
+        if conclusion in (FASTER, SLOWER) and bootstrap_iterations > 0:
+            result.interval = bootstrap_ratio_interval(base_values, diff_values, bootstrap_iterations)
+        results.append(result)
+    return results
+
+def _geomean(values: list[float]) -> float:
+    return math.pow(10, sum(math.log10(value) for value in values) / len(values))
+
+def format_markdown(
+        results: list[ComparisonResult],
+        threshold: Threshold,
+        noise: Threshold,
+        top: Optional[int] = None,
+        full_id: bool = False) -> str:
+    '''Formats the summary and Slower/Faster tables printed by ResultsComparer.'''
+    not_same = [result for result in results if result.conclusion in (FASTER, SLOWER)]
+    if not not_same:
+        return f'No differences found between the benchmark results with threshold {threshold}.\n'
+
+    lines: list[str] = ['summary:']
+    for label, conclusion in (('better', FASTER), ('worse', SLOWER)):
+        matching = [result for result in not_same if result.conclusion == conclusion]
+        if matching:
+            # If the baseline doesn't have the same set of tests the ratio is infinite, exclude those from the geomean
+            ratios = [result.ratio for result in matching if not math.isinf(result.ratio)]
+            geomean = _geomean(ratios) if ratios else math.nan
+            lines.append(f'{label}: {len(matching)}, geomean: {geomean:.3f}')
+    lines.append(f'total diff: {len(not_same)}')
+    lines.append('')
+
+    for conclusion in (SLOWER, FASTER):
+        matching = sorted((result for result in not_same if result.conclusion == conclusion), key=lambda result: result.ratio, reverse=True)[:top]
+        if not matching:
+            lines.append(f'No {conclusion} results for the provided threshold = {threshold} and noise filter = {noise}.')
+            lines.append('')
+            continue
+        ratio_header = 'base/diff' if conclusion == FASTER else 'diff/base'
+        lines.append(f'| {conclusion} | {ratio_header} | Base Median (ns) | Diff Median (ns) | diff/base 95% CI |')
+        lines.append('| --- | ---:| ---:| ---:| ---:|')
+        for result in matching:
+            benchmark_id = result.id if full_id or len(result.id) <= 80 else result.id[:80]
+            interval = f'{result.interval[0]:.2f}-{result.interval[1]:.2f}' if result.interval else ''
+            lines.append(f'| {benchmark_id} | {result.ratio:.2f} | {result.base_median:.2f} | {result.diff_median:.2f} | {interval} |')
+        lines.append('')
+    return '\n'.join(lines) + '\n'
+
+def write_xunit_xml(results: list[ComparisonResult], path: str, name: str = 'ResultsComparer') -> None:
+    '''Writes the results as xUnit XML so Helix reports each benchmark as a test and each regression as a failure.'''
+    failed = sum(1 for result in results if result.conclusion == SLOWER)
+    assemblies = ET.Element('assemblies')
+    assembly = ET.SubElement(assemblies, 'assembly', {
+        'name': name, 'test-framework': name, 'total': str(len(results)),
+        'passed': str(len(results) - failed), 'failed': str(failed), 'skipped': '0', 'errors': '0'})
+    collection = ET.SubElement(assembly, 'collection', {
+        'name': name, 'total': str(len(results)), 'passed': str(len(results) - failed), 'failed': str(failed), 'skipped': '0'})
+    for result in results:
+        type_name, _, method = result.id.partition('(')[0].rpartition('.')
+        test = ET.SubElement(collection, 'test', {
+            'name': result.id, 'type': type_name or result.id, 'method': method or result.id, 'time': '0',
+            'result': 'Fail' if result.conclusion == SLOWER else 'Pass'})
+        if result.conclusion == SLOWER:
+            failure = ET.SubElement(test, 'failure')
+            ET.SubElement(failure, 'message').text = (
+                f'Regression: diff/base {result.ratio:.2f}, base median {result.base_median:.2f}ns, diff median {result.diff_median:.2f}ns')
+    ET.ElementTree(assemblies).write(path, encoding='utf-8', xml_declaration=True)
@@ -0,0 +1,163 @@
+'''
+Assembly of the Helix correlation payload of run_performance_job.
+
+The payload used to be assembled with one copytree per component: the performance repository,
+then its scripts, shared and staticdeps directories again, Core_Root and Baseline_Core_Root in
+full (most of their files are identical), and the arm64 dotnet directory. CorrelationPayload
+collects the files of every component in a manifest first and then writes them, hardlinking the
+ones that already exist in the payload instead of copying them again, and log_payload_sizes
+reports what each component of the payload weighs.
+'''
+
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Optional
+
+import os
+import shutil
+import stat
+
+from .artifact_store import get_file_digest
+
+IgnoreFunction = Callable[[str, list[str]], Iterable[str]]
+
+@dataclass
+class PayloadComponentSize:
+    files: int = 0
+    size: int = 0
+    # Bytes of the files that are not hardlinks of a file counted before
+    unique_size: int = 0
+
+class CorrelationPayload:
+    '''
+    Files are added to a manifest, keyed by their path relative to the payload directory, and
+    written by build(). A file whose source is inside the payload directory is hardlinked to its
+    source, and a file of a deduplicated directory is hardlinked to an earlier deduplicated file
+    with the same content (same size, then same SHA-256). Files are copied when hardlinks are not
+    possible. Hardlinked files share their content: files of the payload must be replaced, which
+    build() does for files added again, and never modified in place.
+    '''
+
+    def __init__(self, payload_dir: str):
+        self.payload_dir = os.path.abspath(payload_dir)
+        self.__manifest: dict[str, tuple[str, bool]] = {}
+        self.__directories: list[str] = []
+        self.__deduplicated_by_size: dict[int, list[str]] = {}
+        self.__digests: dict[str, str] = {}
+
+    def add_file(self, source: str, destination: str, deduplicate: bool = False) -> None:
+        '''Adds source as destination, a path relative to the payload directory.'''
+        self.__manifest[os.path.normpath(destination)] = (os.path.abspath(source), deduplicate)
+
+    def add_directory(self, source: str, destination: str, ignore: Optional[IgnoreFunction] = None, deduplicate: bool = False) -> None:
+        '''
+        Adds the files of source (following symlinks, like shutil.copytree) under destination, a
+        path relative to the payload directory. ignore has the signature of the ignore argument
+        of shutil.copytree.
+        '''
+        source = os.path.abspath(source)
+        for dirpath, dirnames, filenames in os.walk(source, followlinks=True):
+            if ignore is not None:
+                ignored = set(ignore(dirpath, dirnames + filenames))
+                dirnames[:] = [name for name in dirnames if name not in ignored]
+                filenames = [name for name in filenames if name not in ignored]
+            relative_dir = os.path.normpath(os.path.join(destination, os.path.relpath(dirpath, source)))
+            self.__directories.append(relative_dir)
+            for name in filenames:
+                self.add_file(os.path.join(dirpath, name), os.path.join(relative_dir, name), deduplicate)
+
+    def register_directory(self, destination: str) -> None:
+        '''
+        Makes the files already laid out under destination (by something else than this class)
+        candidates for the deduplication of the files added later.
+        '''
+        for dirpath, _, filenames in os.walk(os.path.join(self.payload_dir, destination)):
+            for name in filenames:
+                self.__index(os.path.join(dirpath, name))
+
+    def __index(self, path: str) -> None:
+        self.__deduplicated_by_size.setdefault(os.path.getsize(path), []).append(path)
+
+    def __get_digest(self, path: str) -> str:
+        if path not in self.__digests:
+            self.__digests[path] = get_file_digest(path)
+        return self.__digests[path]
+
+    def __is_in_payload(self, path: str) -> bool:
+        try:
+            return os.path.commonpath([path, self.payload_dir]) == self.payload_dir
+        except ValueError:
+            # On Windows, paths on different drives have no common path
+            return False
+
+    def __find_duplicate(self, source: str) -> Optional[str]:
+        candidates = self.__deduplicated_by_size.get(os.path.getsize(source), [])
+        if not candidates:
+            return None
+        digest = self.__get_digest(source)
+        return next((candidate for candidate in candidates if self.__get_digest(candidate) == digest), None)
+
+    def build(self) -> None:
+        '''Writes the files added since the last build.'''
+        linked_files = linked_size = copied_files = copied_size = 0
+        for relative_dir in self.__directories:
+            os.makedirs(os.path.join(self.payload_dir, relative_dir), exist_ok=True)
+        for relative_path, (source, deduplicate) in self.__manifest.items():
+            destination = os.path.join(self.payload_dir, relative_path)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            if os.path.lexists(destination):
+                os.chmod(destination, stat.S_IWRITE | stat.S_IREAD)
+                os.remove(destination)
+
+            if self.__is_in_payload(source):
+                link_target: Optional[str] = source
+            else:
+                link_target = self.__find_duplicate(source) if deduplicate else None
+            try:
+                if link_target is None:
+                    raise OSError('No file to link to')
+                os.link(link_target, destination)
+                linked_files += 1
+                linked_size += os.path.getsize(destination)
+            except OSError:
+                shutil.copy2(source, destination)
+                copied_files += 1
+                copied_size += os.path.getsize(destination)
+            if deduplicate:
+                self.__index(destination)
+
+        getLogger().info("Correlation payload: copied %d files (%d bytes), hardlinked %d files (%d bytes)", copied_files, copied_size, linked_files, linked_size)
+        self.__manifest.clear()
+        self.__directories.clear()
+
+def get_payload_sizes(payload_dir: str) -> dict[str, PayloadComponentSize]:
+    '''The size of every top level file or directory of the payload, in name order.'''
+    sizes: dict[str, PayloadComponentSize] = {}
+    seen: set[tuple[int, int]] = set()
+    for component in sorted(os.listdir(payload_dir)):
+        size = sizes[component] = PayloadComponentSize()
+        component_path = os.path.join(payload_dir, component)
+        if os.path.isdir(component_path):
+            paths = (os.path.join(dirpath, name) for dirpath, _, filenames in os.walk(component_path) for name in filenames)
+        else:
+            paths = iter([component_path])
+        for path in paths:
+            status = os.lstat(path)
+            size.files += 1
+            size.size += status.st_size
+            if (status.st_dev, status.st_ino) not in seen:
+                seen.add((status.st_dev, status.st_ino))
+                size.unique_size += status.st_size
+    return sizes
+
+def log_payload_sizes(payload_dir: str) -> None:
+    '''Logs the size of every component of the payload, largest first.'''
+    sizes = get_payload_sizes(payload_dir)
+    getLogger().info("Correlation payload size by component (unique counts hardlinked files once):")
+    for component, size in sorted(sizes.items(), key=lambda item: item[1].size, reverse=True):
+        getLogger().info("  %-40s %8d files %12d bytes %12d unique", component, size.files, size.size, size.unique_size)
+    getLogger().info("  %-40s %8d files %12d bytes %12d unique", "total",
+                     sum(size.files for size in sizes.values()),
+                     sum(size.size for size in sizes.values()),
+                     sum(size.unique_size for size in sizes.values()))
@@ -0,0 +1,204 @@
+'''
+Duration-aware partitioning of the micro benchmarks.
+
+By default every Helix partition runs the benchmarks whose name hashes to its index (see
+PartitionFilter in the BDN harness), which balances benchmark counts but not run time. When the
+durations of a previous run are available, plan_partitions bin-packs benchmark classes into
+partitions of similar expected run time, and each partition runs its classes through --filter.
+The remainder partition excludes the patterns of every partition, so they are bounded by
+MAX_FILTERS_LENGTH: a plan falls back to namespace patterns, then to hash partitioning.
+'''
+
+from collections.abc import Iterable
+from typing import Any, Optional, cast
+
+import heapq
+import json
+import os
+
+PARTITION_PLAN_VERSION = 1
+
+# BDN aims at 250ms per iteration (see RecommendedConfig), which is used to estimate the run time of benchmarks
+# that only have perf-lab results.
+ITERATION_TIME_SECONDS = 0.25
+
+# Bound on the total length of the patterns of a plan, which the remainder partition passes to
+# --exclusion-filter. Command lines are limited to 32K characters by CreateProcess on Windows, and
+# to 8K by cmd.exe.
+MAX_FILTERS_LENGTH = 6 * 1024
+
+def get_type_name(full_name: str) -> str:
+    '''
+    The benchmark class of a BDN benchmark full name, e.g. 'System.Tests.Perf_String' for
+    'System.Tests.Perf_String.Trim(s: "Test")'. Dots inside generic arguments are not separators.
+    '''
+    name = full_name.split('(', 1)[0]
+    depth = 0
+    for i in range(len(name) - 1, -1, -1):
+        if name[i] == '>':
+            depth += 1
+        elif name[i] == '<':
+            depth -= 1
+        elif name[i] == '.' and depth == 0:
+            return name[:i]
+    return name
+
+def _get_namespace_durations(class_durations: dict[str, float]) -> dict[str, float]:
+    '''
+    Groups the class durations by namespace. A namespace pattern also matches the classes of the nested
+    namespaces, so these are grouped with their outermost namespace that has classes, for the patterns
+    of the partitions not to overlap.
+    '''
+    namespaces = sorted({get_type_name(type_name) for type_name in class_durations}, key=len)
+    outermost: dict[str, str] = {}
+    for namespace in namespaces:
+        outermost[namespace] = next((outer for outer in namespaces if namespace.startswith(outer + '.')), namespace)
+    namespace_durations: dict[str, float] = {}
+    for type_name, seconds in class_durations.items():
+        namespace = outermost[get_type_name(type_name)]
+        namespace_durations[namespace] = namespace_durations.get(namespace, 0) + seconds
+    return namespace_durations
+
+def _get_filters_length(group_names: Iterable[str]) -> int:
+    return sum(len(f'{name}.*') + 1 for name in group_names)
+
+def _bdn_durations(content: dict[str, Any]) -> dict[str, float]:
+    '''Seconds spent in every benchmark of a BDN full json result, from the total time of all its measurements.'''
+    durations: dict[str, float] = {}
+    benchmarks: list[dict[str, Any]] = content.get('Benchmarks') or []
+    for benchmark in benchmarks:
+        measurements: list[dict[str, Any]] = benchmark.get('Measurements') or []
+        seconds = sum(measurement.get('Nanoseconds', 0) for measurement in measurements) / 1e9
+        if seconds > 0:
+            durations[benchmark['FullName']] = durations.get(benchmark['FullName'], 0) + seconds
+    return durations
+
+def _perf_lab_durations(report: dict[str, Any]) -> dict[str, float]:
+    '''Estimated seconds spent in every test of a perf-lab report: one iteration per result of its default counter.'''
+    durations: dict[str, float] = {}
+    tests: list[dict[str, Any]] = report.get('tests') or []
+    for test in tests:
+        counters: list[dict[str, Any]] = test.get('counters') or []
+        for counter in counters:
+            if not counter.get('defaultCounter'):
+                continue
+            results: list[float] = counter.get('results') or []
+            # results are per operation in nanoseconds, an iteration lasts at least ITERATION_TIME_SECONDS
+            durations[test['name']] = sum(max(ITERATION_TIME_SECONDS, result / 1e9) for result in results)
+    return durations
+
+def read_durations(paths: Iterable[str]) -> dict[str, float]:
+    '''
+    Reads the duration in seconds of each benchmark from previous results. Paths can be BDN *full.json
+    files, perf-lab reports, combined perf-lab reports, or directories containing any of them.
+    '''
+    durations: dict[str, float] = {}
+    files: list[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                files += [os.path.join(dirpath, name) for name in filenames if name.endswith('full.json') or name.endswith('perf-lab-report.json')]
+        elif os.path.isfile(path):
+            files.append(path)
+
+    for file in sorted(files):
+        try:
+            with open(file, 'r', encoding='utf8') as result_file:
+                content: Any = json.load(result_file)
+        except (OSError, ValueError):
+            continue
+        items: list[Any] = cast(list[Any], content) if isinstance(content, list) else [content]
+        for item in items:
+            if isinstance(item, dict):
+                report = cast(dict[str, Any], item)
+                durations.update(_bdn_durations(report) if 'Benchmarks' in report else _perf_lab_durations(report))
+    return durations
+
+def plan_partitions(durations: dict[str, float], partition_count: int) -> Optional[dict[str, Any]]:
+    '''
+    Bin-packs benchmark classes into partition_count partitions with balanced expected run time, using
+    the longest-processing-time-first heuristic, or whole namespaces when the patterns of the classes
+    would exceed MAX_FILTERS_LENGTH. Returns None when there is no history to plan with, or when the
+    namespace patterns are too long as well, leaving the run to hash partitioning.
+
+    The plan lists the --filter patterns of every partition. Classes missing from the history are run
+    by the remainder partition (the one with the least expected time) through --exclusion-filter.
+    '''
+    if partition_count < 1:
+        raise ValueError('partition_count must be >= 1')
+    if not durations:
+        return None
+
+    class_durations: dict[str, float] = {}
+    for full_name, seconds in durations.items():
+        type_name = get_type_name(full_name)
+        class_durations[type_name] = class_durations.get(type_name, 0) + seconds
+
+    granularity = 'class'
+    group_durations = class_durations
+    if _get_filters_length(group_durations) > MAX_FILTERS_LENGTH:
+        granularity = 'namespace'
+        group_durations = _get_namespace_durations(class_durations)
+        if _get_filters_length(group_durations) > MAX_FILTERS_LENGTH:
+            return None
+
+    partitions: list[dict[str, Any]] = [{'index': i, 'expected_seconds': 0.0, 'filters': []} for i in range(partition_count)]
+    heap = [(0.0, i) for i in range(partition_count)]
+    for group_name, seconds in sorted(group_durations.items(), key=lambda item: (-item[1], item[0])):
+        load, index = heapq.heappop(heap)
+        partitions[index]['filters'].append(f'{group_name}.*')
+        partitions[index]['expected_seconds'] = load + seconds
+        heapq.heappush(heap, (load + seconds, index))
+
+    for partition in partitions:
+        partition['filters'].sort()
+    remainder = min(partitions, key=lambda partition: partition['expected_seconds'])['index']
+    return {
+        'version': PARTITION_PLAN_VERSION,
+        'partition_count': partition_count,
+        'granularity': granularity,
+        'remainder_partition': remainder,
+        'partitions': partitions,
+    }
+
+def write_plan(plan: dict[str, Any], path: str) -> None:
+    with open(path, 'w', encoding='utf8') as plan_file:
+        json.dump(plan, plan_file, indent=2)
+
+def read_plan(path: str) -> dict[str, Any]:
+    with open(path, 'r', encoding='utf8') as plan_file:
+        plan: dict[str, Any] = json.load(plan_file)
+    if plan.get('version') != PARTITION_PLAN_VERSION:
+        raise ValueError(f"Unsupported partition plan version {plan.get('version')} in {path}")
+    return plan
+
+def _strip_option(arguments: list[str], option: str) -> tuple[list[str], list[str]]:
+    '''Removes option and its values from arguments, returning the remaining arguments and the values.'''
+    if option not in arguments:
+        return arguments, []
+    index = arguments.index(option)
+    end = index + 1
+    while end < len(arguments) and not arguments[end].startswith('-'):
+        end += 1
+    return arguments[:index] + arguments[end:], arguments[index + 1:end]
+
+def get_partition_bdn_arguments(plan: dict[str, Any], partition_index: int, bdn_arguments: list[str]) -> list[list[str]]:
+    '''
+    Rewrites the BDN arguments of a hash-partitioned run into the BDN invocations that run the planned
+    partition: one with the partition's --filter patterns and, for the remainder partition, one that
+    excludes every planned class so benchmarks added since the history was recorded still run.
+    '''
+    if plan['partition_count'] <= partition_index:
+        raise ValueError(f"Partition {partition_index} is out of range of the {plan['partition_count']} planned partitions")
+    arguments, _ = _strip_option(bdn_arguments, '--partition-count')
+    arguments, _ = _strip_option(arguments, '--partition-index')
+
+    invocations: list[list[str]] = []
+    filters: list[str] = plan['partitions'][partition_index]['filters']
+    if filters:
+        invocations.append(arguments + ['--filter', *filters])
+    if plan['remainder_partition'] == partition_index:
+        arguments, exclusions = _strip_option(arguments, '--exclusion-filter')
+        planned = [pattern for partition in plan['partitions'] for pattern in partition['filters']]
+        invocations.append(arguments + ['--exclusion-filter', *exclusions, *planned])
+    return invocations
@@ -0,0 +1,143 @@
+'''
+Cache of the runtime payload layouts built by build_runtime_payload.
+
+Every leg of a pipeline that runs on the same agent (other queues, other run kinds) extracts the
+same runtime build artifacts and lays them out into the same Core_Root, Mono or WASM payloads.
+PayloadCache stores the output directories of a payload builder under a key derived from the
+content of its input archives or directories and the parameters of the builder, and a later
+build with the same key hardlinks the cached layout into place instead of extracting it again.
+The cache is enabled by setting PERFLAB_PAYLOAD_CACHE_DIR.
+'''
+
+from logging import getLogger
+from typing import Any, Optional
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+from .common import RunCommand, file_lock, remove_directory
+
+DEFAULT_MAX_ENTRIES = 8
+
+def get_source_fingerprint(path: str) -> Optional[str]:
+    '''
+    Identifies the content of a payload input: the SHA-256 of an archive, the commit of a git
+    clone, or the relative path, size and modification time of every file of a directory.
+    None when the path does not exist or the commit of a clone cannot be read.
+    '''
+    if os.path.isfile(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as archive:
+            for chunk in iter(lambda: archive.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return f'sha256:{digest.hexdigest()}'
+    if not os.path.isdir(path):
+        return None
+    if os.path.exists(os.path.join(path, '.git')):
+        command = RunCommand(['git', '-C', path, 'rev-parse', 'HEAD'], verbose=True, echo=False)
+        try:
+            command.run()
+        except Exception:
+            return None
+        return f'git:{command.stdout.strip()}'
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for name in sorted(filenames):
+            file_path = os.path.join(dirpath, name)
+            status = os.stat(file_path)
+            digest.update(f'{os.path.relpath(file_path, path)}\0{status.st_size}\0{status.st_mtime_ns}\n'.encode('utf-8'))
+    return f'tree:{digest.hexdigest()}'
+
+def link_tree(source: str, destination: str) -> None:
+    '''Recreates the tree of source in destination with hardlinks, copying where hardlinks are not possible.'''
+    def link_file(source_file: str, destination_file: str) -> None:
+        try:
+            os.link(source_file, destination_file)
+        except OSError:
+            shutil.copy2(source_file, destination_file)
+    shutil.copytree(source, destination, symlinks=True, copy_function=link_file, dirs_exist_ok=True)
+
+class PayloadCache:
+    '''
+    Payload layouts under root/<key>/<n>, one directory per output directory of the builder.
+    root/<key>/manifest.json is written last and marks the entry as complete.
+    '''
+
+    def __init__(self, root: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.root = os.path.abspath(root)
+        self.max_entries = max_entries
+
+    @staticmethod
+    def from_environment() -> Optional['PayloadCache']:
+        '''The cache configured with PERFLAB_PAYLOAD_CACHE_DIR, if any.'''
+        root = os.environ.get('PERFLAB_PAYLOAD_CACHE_DIR')
+        return PayloadCache(root) if root else None
+
+    @staticmethod
+    def get_key(builder: str, sources: list[str], parameters: dict[str, Any]) -> Optional[str]:
+        '''The key of a payload build, None when one of its sources cannot be fingerprinted.'''
+        fingerprints: list[str] = []
+        for source in sources:
+            fingerprint = get_source_fingerprint(source)
+            if fingerprint is None:
+                return None
+            fingerprints.append(fingerprint)
+        content = json.dumps({'builder': builder, 'sources': fingerprints, 'parameters': parameters}, sort_keys=True, default=str)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def __entry_directory(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def __manifest_path(self, key: str) -> str:
+        return os.path.join(self.__entry_directory(key), 'manifest.json')
+
+    def contains(self, key: str) -> bool:
+        return os.path.isfile(self.__manifest_path(key))
+
+    def restore(self, key: str, destinations: list[str]) -> bool:
+        '''
+        Replaces the destinations with hardlinks to the cached layout. Returns False on a cache miss.
+        The restored files share their content with the cache and must not be modified in place.
+        '''
+        with file_lock(os.path.join(self.root, '.lock')):
+            if not self.contains(key):
+                return False
+            for index, destination in enumerate(destinations):
+                remove_directory(destination)
+                link_tree(os.path.join(self.__entry_directory(key), str(index)), destination)
+            os.utime(self.__manifest_path(key))
+        getLogger().info("Restored payload %s from the payload cache at '%s'", key, self.root)
+        return True
+
+    def save(self, key: str, destinations: list[str], metadata: Optional[dict[str, Any]] = None) -> None:
+        '''Stores the destinations of a payload build under key, then evicts the least recently used entries.'''
+        os.makedirs(self.root, exist_ok=True)
+        staging_directory = os.path.join(self.root, f'.staging-{uuid.uuid4().hex}')
+        try:
+            for index, destination in enumerate(destinations):
+                link_tree(destination, os.path.join(staging_directory, str(index)))
+            with open(os.path.join(staging_directory, 'manifest.json'), 'w', encoding='utf8') as manifest_file:
+                json.dump({**(metadata or {}), 'key': key, 'created': time.time()}, manifest_file, indent=2)
+
+            with file_lock(os.path.join(self.root, '.lock')):
+                entry_directory = self.__entry_directory(key)
+                if os.path.isdir(entry_directory):
+                    remove_directory(entry_directory)
+                os.rename(staging_directory, entry_directory)
+                self.__evict(key)
+        finally:
+            if os.path.isdir(staging_directory):
+                remove_directory(staging_directory)
+        getLogger().info("Saved payload %s to the payload cache at '%s'", key, self.root)
+
+    def __evict(self, keep: str) -> None:
+        entries = [name for name in os.listdir(self.root) if not name.startswith('.') and name != keep]
+        entries.sort(key=lambda name: os.path.getmtime(self.__manifest_path(name)) if self.contains(name) else 0)
+        for name in entries[:max(0, len(entries) + 1 - self.max_entries)]:
+            getLogger().info('Evicting payload %s from the payload cache', name)
+            remove_directory(self.__entry_directory(name))
@@ -0,0 +1,118 @@
+'''
+Per-command resource accounting for RunCommand.
+
+When enabled (PERFLAB_RESOURCE_ACCOUNTING=1 or enable_resource_accounting()), every child process
+started through RunCommand records its wall time and, where the OS reports them through wait4, its
+user/sys CPU time, peak RSS and block I/O. Each record is emitted as an OpenTelemetry span and kept
+for the JSON summary written at the end of benchmarks_ci.main and Runner.run.
+'''
+
+from dataclasses import asdict, dataclass
+from logging import getLogger
+from threading import Lock
+from typing import Any, Optional
+
+import json
+import os
+import sys
+
+from .tracer import get_tracer
+
+# Linux and macOS report block I/O as a count of 512 byte blocks
+_BLOCK_SIZE = 512
+
+@dataclass
+class CommandUsage:
+    '''Resources used by one child process (and the descendants it waited for).'''
+    command: str
+    returncode: int
+    start_time_ns: int
+    end_time_ns: int
+    user_seconds: Optional[float] = None
+    sys_seconds: Optional[float] = None
+    max_rss_bytes: Optional[int] = None
+    read_bytes: Optional[int] = None
+    write_bytes: Optional[int] = None
+
+    @property
+    def wall_seconds(self) -> float:
+        return (self.end_time_ns - self.start_time_ns) / 1e9
+
+    def set_rusage(self, rusage: Any) -> None:
+        '''Fills the CPU, memory and I/O fields from a resource.struct_rusage.'''
+        self.user_seconds = rusage.ru_utime
+        self.sys_seconds = rusage.ru_stime
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        self.max_rss_bytes = rusage.ru_maxrss if sys.platform == 'darwin' else rusage.ru_maxrss * 1024
+        self.read_bytes = rusage.ru_inblock * _BLOCK_SIZE
+        self.write_bytes = rusage.ru_oublock * _BLOCK_SIZE
+
+    def to_dict(self) -> dict[str, Any]:
+        result = asdict(self)
+        result['wall_seconds'] = self.wall_seconds
+        return result
+
+class ResourceUsageRecorder:
+    '''Process-wide list of the CommandUsage recorded so far.'''
+
+    def __init__(self):
+        self.enabled = os.environ.get('PERFLAB_RESOURCE_ACCOUNTING') == '1'
+        self.__records: list[CommandUsage] = []
+        self.__lock = Lock()
+
+    def add(self, usage: CommandUsage) -> None:
+        with self.__lock:
+            self.__records.append(usage)
+        attributes: dict[str, Any] = {key: value for key, value in usage.to_dict().items() if value is not None and key not in ('start_time_ns', 'end_time_ns')}
+        get_tracer().record_span('run_command', usage.start_time_ns, usage.end_time_ns, attributes)
+
+    @property
+    def records(self) -> list[CommandUsage]:
+        with self.__lock:
+            return list(self.__records)
+
+resource_usage_recorder = ResourceUsageRecorder()
+
+def enable_resource_accounting() -> None:
+    '''Enables resource accounting for this process and the scripts it starts.'''
+    resource_usage_recorder.enabled = True
+    os.environ['PERFLAB_RESOURCE_ACCOUNTING'] = '1'
+
+def is_resource_accounting_enabled() -> bool:
+    return resource_usage_recorder.enabled
+
+def wait_with_rusage(pid: int) -> Optional[tuple[int, Any]]:
+    '''
+    Waits for the child process using wait4, returning its exit code and resource usage, or None where
+    wait4 is not available (Windows).
+    '''
+    if not hasattr(os, 'wait4'):
+        return None
+    _, status, rusage = os.wait4(pid, 0)
+    return (os.waitstatus_to_exitcode(status), rusage)
+
+def write_resource_usage_summary(path: str) -> None:
+    '''
+    Logs the slowest commands and writes every recorded CommandUsage to a JSON file, creating its
+    directory. A summary that cannot be written is logged as a warning.
+    '''
+    records = resource_usage_recorder.records
+    if not resource_usage_recorder.enabled or not records:
+        return
+
+    total_wall = sum(record.wall_seconds for record in records)
+    getLogger().info('Resource usage of %d commands, %.1fs wall time in total:', len(records), total_wall)
+    for record in sorted(records, key=lambda record: record.wall_seconds, reverse=True)[:10]:
+        cpu = '' if record.user_seconds is None or record.sys_seconds is None else ', cpu %.1fs user %.1fs sys' % (record.user_seconds, record.sys_seconds)
+        rss = '' if record.max_rss_bytes is None else ', peak rss %.0fMB' % (record.max_rss_bytes / 2**20)
+        getLogger().info('  %.1fs%s%s: %s', record.wall_seconds, cpu, rss, record.command)
+
+    # The summary is written from finally blocks, so failing to write it must not hide the error of the run
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf8') as summary_file:
+            json.dump({'total_wall_seconds': total_wall, 'commands': [record.to_dict() for record in records]}, summary_file, indent=2)
+    except OSError as error:
+        getLogger().warning('Could not write the resource usage summary to %s: %s', path, error)
+        return
+    getLogger().info('Wrote resource usage summary to %s', path)
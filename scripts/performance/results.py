@@ -0,0 +1,191 @@
+'''
+Columnar in-memory store for perf-lab reports.
+
+A perf-lab report is nested JSON (report -> tests -> counters -> results). Walking that structure
+for every query gets slow once there are tens of thousands of benchmarks, so ResultsTable flattens
+the reports into one row per counter sample held in typed arrays, with an index on
+(test name, counter name) pointing at a contiguous range of rows.
+'''
+
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import Any, Optional, cast
+
+import json
+
+
+@dataclass(frozen=True)
+class CounterInfo:
+    '''Descriptive fields of a counter, shared by all of its samples.'''
+    name: str
+    metric_name: str
+    top_counter: bool = False
+    default_counter: bool = False
+    higher_is_better: bool = False
+
+
+@dataclass
+class TestInfo:
+    '''Descriptive fields of a test. id is its row in ResultsTable.tests, report the index of the report it came from.'''
+    name: str
+    id: int
+    report: int
+    categories: list[str] = field(default_factory=lambda: [])
+    additional_data: dict[str, Any] = field(default_factory=lambda: {})
+
+
+@dataclass(frozen=True)
+class Series:
+    '''The samples of one counter of one test.'''
+    test: TestInfo
+    counter: CounterInfo
+    values: 'array[float]'
+
+    def mean(self) -> float:
+        return sum(self.values) / len(self.values) if self.values else float('nan')
+
+
+class ResultsTable:
+    '''
+    Perf-lab report samples stored column-wise.
+
+    Each row is one counter sample. The test_ids, counter_ids and values columns are parallel arrays,
+    and the rows of a (test, counter) pair are always contiguous so that lookups are a dictionary hit
+    followed by an array slice. A test may have several counters with the same name (size on disk
+    reports name the folders of a package without their version), so series are keyed by the
+    occurrence of the counter in the test too.
+    '''
+
+    def __init__(self):
+        self.reports: list[dict[str, Any]] = []
+        self.tests: list[TestInfo] = []
+        self.counters: list[CounterInfo] = []
+        self.test_ids = array('q')
+        self.counter_ids = array('q')
+        self.values = array('d')
+        self.__counter_lookup: dict[CounterInfo, int] = {}
+        self.__test_lookup: dict[str, list[int]] = {}
+        self.__index: dict[tuple[int, int, int], tuple[int, int]] = {}
+        self.__name_index: dict[tuple[str, str], list[tuple[int, int]]] = {}
+        self.__test_counters: list[list[tuple[int, int]]] = []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @staticmethod
+    def from_reports(reports: Iterable[dict[str, Any]]) -> 'ResultsTable':
+        '''Builds a table from already parsed perf-lab reports.'''
+        table = ResultsTable()
+        for report in reports:
+            table.add_report(report)
+        return table
+
+    @staticmethod
+    def from_files(paths: Iterable[str]) -> 'ResultsTable':
+        '''
+        Builds a table from perf-lab report files. A file may hold a single report or, like the
+        combined report, a JSON array of reports.
+        '''
+        table = ResultsTable()
+        for path in paths:
+            with open(path, 'r', encoding='utf8') as report_file:
+                content: Any = json.load(report_file)
+            reports: list[dict[str, Any]] = cast(list[dict[str, Any]], content) if isinstance(content, list) else [content]
+            for report in reports:
+                table.add_report(report)
+        return table
+
+    def __intern_counter(self, counter: CounterInfo) -> int:
+        counter_id = self.__counter_lookup.get(counter)
+        if counter_id is None:
+            counter_id = len(self.counters)
+            self.counters.append(counter)
+            self.__counter_lookup[counter] = counter_id
+        return counter_id
+
+    def add_report(self, report: dict[str, Any]) -> None:
+        '''Appends the samples of a perf-lab report to the table.'''
+        report_id = len(self.reports)
+        self.reports.append({key: value for key, value in report.items() if key != 'tests'})
+        tests: list[dict[str, Any]] = report.get('tests') or []
+        for test in tests:
+            test_id = len(self.tests)
+            self.tests.append(TestInfo(
+                name=test['name'],
+                id=test_id,
+                report=report_id,
+                categories=list(test.get('categories') or []),
+                additional_data=dict(test.get('additionalData') or {})))
+            self.__test_lookup.setdefault(test['name'], []).append(test_id)
+            self.__test_counters.append([])
+            counters: list[dict[str, Any]] = test.get('counters') or []
+            occurrences: dict[int, int] = {}
+            for counter in counters:
+                counter_id = self.__intern_counter(CounterInfo(
+                    name=counter['name'],
+                    metric_name=counter.get('metricName') or '',
+                    top_counter=bool(counter.get('topCounter')),
+                    default_counter=bool(counter.get('defaultCounter')),
+                    higher_is_better=bool(counter.get('higherIsBetter'))))
+                results: list[float] = counter.get('results') or []
+                start = len(self.values)
+                self.values.extend(float(result) for result in results)
+                self.test_ids.extend([test_id] * len(results))
+                self.counter_ids.extend([counter_id] * len(results))
+                occurrence = occurrences.get(counter_id, 0)
+                occurrences[counter_id] = occurrence + 1
+                self.__index[(test_id, counter_id, occurrence)] = (start, len(self.values))
+                self.__test_counters[test_id].append((counter_id, occurrence))
+                self.__name_index.setdefault((test['name'], counter['name']), []).append((start, len(self.values)))
+
+    def test_names(self) -> list[str]:
+        '''Distinct test names, in the order they were first added.'''
+        return list(self.__test_lookup)
+
+    def find_tests(self, name: Optional[str] = None, category: Optional[str] = None) -> list[TestInfo]:
+        '''Tests matching the given name and/or category.'''
+        candidates = [self.tests[i] for i in self.__test_lookup.get(name, [])] if name is not None else self.tests
+        return [test for test in candidates if category is None or category in test.categories]
+
+    def series(self, predicate: Optional[Callable[[TestInfo, CounterInfo], bool]] = None) -> Iterator[Series]:
+        '''Yields every (test, counter) series, optionally filtered by predicate.'''
+        for (test_id, counter_id, _), (start, end) in self.__index.items():
+            test, counter = self.tests[test_id], self.counters[counter_id]
+            if predicate is None or predicate(test, counter):
+                yield Series(test, counter, self.values[start:end])
+
+    def test_series(self, test: TestInfo) -> list[Series]:
+        '''The series of every counter of the given test.'''
+        series: list[Series] = []
+        for counter_id, occurrence in self.__test_counters[test.id]:
+            start, end = self.__index[(test.id, counter_id, occurrence)]
+            series.append(Series(test, self.counters[counter_id], self.values[start:end]))
+        return series
+
+    def values_for(self, test: str, counter: str) -> 'array[float]':
+        '''All samples of the named counter for every test with the given name.'''
+        result = array('d')
+        for start, end in self.__name_index.get((test, counter), []):
+            result.extend(self.values[start:end])
+        return result
+
+    def aggregate(
+            self,
+            reducer: Callable[['array[float]'], float],
+            predicate: Optional[Callable[[TestInfo, CounterInfo], bool]] = None) -> dict[tuple[str, str], float]:
+        '''Reduces every matching series to a single value keyed by (test name, counter name).'''
+        return {(s.test.name, s.counter.name): reducer(s.values) for s in self.series(predicate) if s.values}
+
+    def to_numpy(self) -> dict[str, Any]:
+        '''
+        Returns the columns as NumPy arrays for vectorized processing.
+        NumPy is optional for the scripts, so it is only imported here.
+        '''
+        import numpy  # pyright: ignore[reportMissingImports] -- optional dependency
+
+        return {
+            'test_ids': numpy.frombuffer(self.test_ids, dtype=numpy.int64),  # pyright: ignore[reportUnknownMemberType]
+            'counter_ids': numpy.frombuffer(self.counter_ids, dtype=numpy.int64),  # pyright: ignore[reportUnknownMemberType]
+            'values': numpy.frombuffer(self.values, dtype=numpy.float64),  # pyright: ignore[reportUnknownMemberType]
+        }
@@ -0,0 +1,282 @@
+'''
+Persistent cache of .NET SDK installations.
+
+dotnet-install downloads and extracts a few hundred megabytes for every SDK it installs, and the
+scripts reinstall the SDK into tools/dotnet/<arch> on every run. SdkCache keeps one standalone
+installation per resolved SDK version and runtime identifier, and materializes it into an install
+directory with hardlinks, so repeat runs and runs switching between SDK versions need neither the
+network nor an extraction. Entries are evicted least recently used first once the cache exceeds
+its disk budget, and can be seeded offline from a directory of SDK archives.
+'''
+
+from collections.abc import Callable
+from logging import getLogger
+from sys import platform
+from typing import Any, Optional
+
+import json
+import os
+import shutil
+import tarfile
+import time
+import uuid
+import zipfile
+
+from .common import file_lock, remove_directory
+
+DEFAULT_BUDGET_GB = 10.0
+
+def get_runtime_identifier(architecture: str) -> str:
+    '''The portable runtime identifier of the SDK archives for architecture, e.g. linux-x64.'''
+    os_name = 'win' if platform == 'win32' else 'osx' if platform == 'darwin' else 'linux'
+    return f'{os_name}-{architecture}'
+
+def _directory_size(directory: str) -> int:
+    size = 0
+    for dirpath, _, filenames in os.walk(directory):
+        for name in filenames:
+            file_path = os.path.join(dirpath, name)
+            if not os.path.islink(file_path):
+                size += os.path.getsize(file_path)
+    return size
+
+def _write_json_atomically(file_path: str, content: dict[str, Any]) -> None:
+    temp_path = f'{file_path}.{uuid.uuid4().hex}.tmp'
+    with open(temp_path, 'w', encoding='utf8') as json_file:
+        json.dump(content, json_file, indent=2)
+    os.replace(temp_path, file_path)
+
+def _link_file(source: str, target: str) -> None:
+    '''Hardlinks (or, across file systems, copies) source to target, replacing target atomically.'''
+    temp_path = f'{target}.{uuid.uuid4().hex}.tmp'
+    if os.path.islink(source):
+        os.symlink(os.readlink(source), temp_path)
+    else:
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            shutil.copy2(source, temp_path)
+    os.replace(temp_path, target)
+
+def merge_installation(source: str, install_directory: str) -> None:
+    '''
+    Hardlinks the files of the dotnet installation in source into install_directory, next to the
+    SDKs already installed there. Like dotnet-install, files in versioned directories are kept when
+    present, and the non-versioned files at the root (the dotnet host, licenses) are replaced.
+    '''
+    for dirpath, dirnames, filenames in os.walk(source):
+        relative_path = os.path.relpath(dirpath, source)
+        target_directory = os.path.normpath(os.path.join(install_directory, relative_path))
+        os.makedirs(target_directory, exist_ok=True)
+        for name in [name for name in dirnames if os.path.islink(os.path.join(dirpath, name))]:
+            dirnames.remove(name)
+            filenames.append(name)
+        for name in filenames:
+            target = os.path.join(target_directory, name)
+            if relative_path != '.' and os.path.lexists(target):
+                continue
+            _link_file(os.path.join(dirpath, name), target)
+
+def get_install_lock_path(install_directory: str) -> str:
+    '''The lock file serializing changes to install_directory. It lives next to it, so it is not part of the installation.'''
+    return os.path.normpath(os.path.abspath(install_directory)) + '.lock'
+
+def extract_archive(archive: str, destination: str) -> None:
+    '''Extracts an SDK .zip or .tar.gz archive.'''
+    if archive.endswith('.zip'):
+        with zipfile.ZipFile(archive) as zip_file:
+            zip_file.extractall(destination)
+        return
+    with tarfile.open(archive) as tar_file:
+        if hasattr(tarfile, 'data_filter'):
+            tar_file.extractall(destination, filter='data')
+        else:
+            tar_file.extractall(destination)
+
+class SdkCache:
+    '''
+    Cache of standalone SDK installations under root/sdks/<version>-<rid>. Each entry has a
+    root/sdks/<version>-<rid>.json metadata file, which is written last and marks the entry as complete.
+    '''
+
+    def __init__(self, root: str, budget_bytes: int = int(DEFAULT_BUDGET_GB * 2**30), seed_directory: Optional[str] = None):
+        self.root = os.path.abspath(root)
+        self.budget_bytes = budget_bytes
+        self.seed_directory = seed_directory
+        self.__used: set[str] = set()
+        os.makedirs(self.__sdks_directory, exist_ok=True)
+
+    @staticmethod
+    def from_environment() -> Optional['SdkCache']:
+        '''
+        The cache configured by PERFLAB_SDK_CACHE_DIR, PERFLAB_SDK_CACHE_BUDGET_GB and
+        PERFLAB_SDK_CACHE_SEED, or None when PERFLAB_SDK_CACHE_DIR is not set.
+        '''
+        root = os.environ.get('PERFLAB_SDK_CACHE_DIR')
+        if not root:
+            return None
+        budget_gb = float(os.environ.get('PERFLAB_SDK_CACHE_BUDGET_GB') or DEFAULT_BUDGET_GB)
+        return SdkCache(root, int(budget_gb * 2**30), os.environ.get('PERFLAB_SDK_CACHE_SEED') or None)
+
+    @staticmethod
+    def get_key(version: str, architecture: str) -> str:
+        return f'{version}-{get_runtime_identifier(architecture)}'
+
+    @property
+    def __sdks_directory(self) -> str:
+        return os.path.join(self.root, 'sdks')
+
+    def __entry_directory(self, key: str) -> str:
+        return os.path.join(self.__sdks_directory, key)
+
+    def __metadata_path(self, key: str) -> str:
+        return os.path.join(self.__sdks_directory, key + '.json')
+
+    def __read_metadata(self, key: str) -> Optional[dict[str, Any]]:
+        try:
+            with open(self.__metadata_path(key), 'r', encoding='utf8') as metadata_file:
+                metadata: dict[str, Any] = json.load(metadata_file)
+        except (OSError, ValueError):
+            return None
+        return metadata if os.path.isdir(self.__entry_directory(key)) else None
+
+    def keys(self) -> list[str]:
+        '''The keys of the complete entries.'''
+        return sorted(name[:-len('.json')] for name in os.listdir(self.__sdks_directory)
+                      if name.endswith('.json') and os.path.isdir(self.__entry_directory(name[:-len('.json')])))
+
+    def __lock(self):
+        '''Serializes publishing, materializing and evicting entries.'''
+        return file_lock(os.path.join(self.root, '.lock'))
+
+    def lookup(self, key: str) -> Optional[str]:
+        '''The directory of the entry for key, marking it as recently used, or None on a cache miss.'''
+        with self.__lock():
+            return self.__lookup(key)
+
+    def __lookup(self, key: str) -> Optional[str]:
+        metadata = self.__read_metadata(key)
+        if metadata is None:
+            return None
+        metadata['last_used'] = time.time()
+        _write_json_atomically(self.__metadata_path(key), metadata)
+        self.__used.add(key)
+        return self.__entry_directory(key)
+
+    def add(self, key: str, populate: Callable[[str], None], metadata: Optional[dict[str, Any]] = None) -> str:
+        '''
+        Creates the entry for key by calling populate with an empty staging directory, which is moved
+        into the cache once populate returns. Returns the entry directory.
+        '''
+        staging_directory = self.__populate(key, populate)
+        try:
+            with self.__lock():
+                self.__publish(key, staging_directory, metadata)
+                self.__evict()
+        finally:
+            if os.path.isdir(staging_directory):
+                remove_directory(staging_directory)
+        return self.__entry_directory(key)
+
+    def __populate(self, key: str, populate: Callable[[str], None]) -> str:
+        staging_directory = os.path.join(self.root, f'.staging-{key}-{uuid.uuid4().hex}')
+        os.makedirs(staging_directory)
+        try:
+            populate(staging_directory)
+        except:
+            remove_directory(staging_directory)
+            raise
+        return staging_directory
+
+    def __publish(self, key: str, staging_directory: str, metadata: Optional[dict[str, Any]]) -> None:
+        entry_directory = self.__entry_directory(key)
+        if os.path.isdir(entry_directory):
+            # Left behind by an interrupted add, as complete entries are looked up first
+            remove_directory(entry_directory)
+        os.rename(staging_directory, entry_directory)
+
+        now = time.time()
+        _write_json_atomically(self.__metadata_path(key), {
+            **(metadata or {}),
+            'key': key,
+            'size_bytes': _directory_size(entry_directory),
+            'created': now,
+            'last_used': now,
+        })
+        self.__used.add(key)
+        getLogger().info("Added %s to the SDK cache at '%s'", key, self.root)
+
+    def find_seed_archive(self, version: str, architecture: str) -> Optional[str]:
+        '''The SDK archive for version in the seed directory, if there is one.'''
+        if not self.seed_directory:
+            return None
+        rid = get_runtime_identifier(architecture)
+        for extension in ('.zip', '.tar.gz'):
+            archive = os.path.join(self.seed_directory, f'dotnet-sdk-{version}-{rid}{extension}')
+            if os.path.isfile(archive):
+                return archive
+        return None
+
+    def materialize(self, key: str, install_directory: str) -> None:
+        '''Merges the installation of the entry for key into install_directory (see merge_installation).'''
+        with self.__lock():
+            self.__materialize(key, install_directory)
+
+    def __materialize(self, key: str, install_directory: str) -> None:
+        entry_directory = self.__entry_directory(key)
+        if not os.path.isdir(entry_directory):
+            raise KeyError(f'{key} is not in the SDK cache')
+        with file_lock(get_install_lock_path(install_directory)):
+            merge_installation(entry_directory, install_directory)
+
+    def ensure(self, key: str, populate: Callable[[str], None], metadata: Optional[dict[str, Any]] = None) -> bool:
+        '''
+        Adds the entry for key on a cache miss, like install but without materializing it. Returns
+        whether the entry was already cached.
+        '''
+        with file_lock(os.path.join(self.__sdks_directory, key + '.lock')):
+            if self.lookup(key) is not None:
+                return True
+            self.add(key, populate, metadata)
+        return False
+
+    def install(self, key: str, install_directory: str, populate: Callable[[str], None], metadata: Optional[dict[str, Any]] = None) -> bool:
+        '''
+        Materializes the entry for key into install_directory, adding it first on a cache miss.
+        Safe to call concurrently for the same key from several threads or processes: only one of
+        them populates the entry. Returns whether the entry was already cached.
+        '''
+        with file_lock(os.path.join(self.__sdks_directory, key + '.lock')):
+            with self.__lock():
+                if self.__lookup(key) is not None:
+                    self.__materialize(key, install_directory)
+                    return True
+            staging_directory = self.__populate(key, populate)
+            try:
+                with self.__lock():
+                    self.__publish(key, staging_directory, metadata)
+                    self.__materialize(key, install_directory)
+                    self.__evict()
+            finally:
+                if os.path.isdir(staging_directory):
+                    remove_directory(staging_directory)
+        return False
+
+    def evict(self) -> None:
+        '''Removes the least recently used entries until the cache fits its budget. Entries used by this process are kept.'''
+        with self.__lock():
+            self.__evict()
+
+    def __evict(self) -> None:
+        entries = [metadata for metadata in (self.__read_metadata(key) for key in self.keys()) if metadata is not None]
+        total = sum(metadata.get('size_bytes', 0) for metadata in entries)
+        for metadata in sorted(entries, key=lambda metadata: metadata.get('last_used', 0)):
+            if total <= self.budget_bytes:
+                break
+            key = metadata['key']
+            if key in self.__used:
+                continue
+            getLogger().info('Evicting %s from the SDK cache', key)
+            os.remove(self.__metadata_path(key))
+            remove_directory(self.__entry_directory(key))
+            total -= metadata.get('size_bytes', 0)
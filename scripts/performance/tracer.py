@@ -102,3 +102,20 @@ class AwareTracer:
             return cast(_F, wrapped)
 
         return decorator
+
+    def record_span(self, name: str, start_time_ns: int, end_time_ns: int, attributes: Optional[dict[str, Any]] = None) -> None:
+        """
+        Records an already finished operation as a span with explicit start and end times (in ns since the epoch)
+        if OpenTelemetry is imported. Does nothing otherwise.
+
+        Args:
+            name: The name of the span.
+            start_time_ns: When the operation started.
+            end_time_ns: When the operation ended.
+            attributes: Attributes to attach to the span.
+        """
+        if self._tracer is None:
+            return
+
+        span = self._tracer.start_span(name, start_time=start_time_ns, attributes=attributes)
+        span.end(end_time=end_time_ns)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+'''
+Compares two sets of benchmark results and reports the statistically significant regressions and
+improvements, like src/tools/ResultsComparer but without requiring a .NET SDK build.
+
+Accepts BenchmarkDotNet *full.json files and perf-lab reports.
+'''
+
+from argparse import ArgumentParser
+from logging import getLogger
+import sys
+
+from performance.common import validate_supported_runtime
+from performance.comparison import Threshold, compare, format_markdown, get_files_to_parse, read_samples, write_xunit_xml
+from performance.logger import setup_loggers
+
+def __process_arguments(args: list[str]):
+    parser = ArgumentParser(description='Compares base and diff benchmark results.', allow_abbrev=False)
+    parser.add_argument('-b', '--base', dest='base', required=True, help='Path to the folder/file with base results.')
+    parser.add_argument('-d', '--diff', dest='diff', required=True, help='Path to the folder/file with diff results.')
+    parser.add_argument('-t', '--threshold', dest='threshold', required=True, type=Threshold.parse,
+                        help='Threshold for Statistical Test. Examples: 5%%, 10ms, 100ns, 1s.')
+    parser.add_argument('-n', '--noise', dest='noise', default=Threshold.parse('0.3ns'), type=Threshold.parse,
+                        help='Noise threshold for Statistical Test. Examples: 0.5ns 1ns.')
+    parser.add_argument('--top', dest='top', type=int, default=None, help='Filter the diff to top/bottom N results.')
+    parser.add_argument('-f', '--filter', dest='filters', nargs='+', default=None,
+                        help='Filter the benchmarks by name using glob pattern(s).')
+    parser.add_argument('--full-id', dest='full_id', action='store_true', default=False, help='Display the full benchmark name id.')
+    parser.add_argument('--bootstrap-iterations', dest='bootstrap_iterations', type=int, default=200,
+                        help='Bootstrap resamples used for the confidence interval of each regression or improvement. 0 disables it.')
+    parser.add_argument('--xml', dest='xml', default=None, help='Path of the xUnit XML results file to write.')
+    parser.add_argument('--md', dest='md', default=None, help='Path of the markdown results file to write.')
+    return parser.parse_args(args)
+
+def main(argv: list[str]) -> int:
+    validate_supported_runtime()
+    args = __process_arguments(argv)
+    setup_loggers(verbose=True)
+
+    base = read_samples(get_files_to_parse(args.base))
+    diff = read_samples(get_files_to_parse(args.diff))
+    if not base or not diff:
+        getLogger().error('Provided paths contained no benchmark results.')
+        return 1
+
+    results = compare(base, diff, args.threshold, args.noise, args.filters, args.bootstrap_iterations)
+    markdown = format_markdown(results, args.threshold, args.noise, args.top, args.full_id)
+    print(markdown)
+
+    if args.md:
+        with open(args.md, 'w', encoding='utf8') as md_file:
+            md_file.write(markdown)
+    if args.xml:
+        write_xunit_xml(results, args.xml)
+        getLogger().info('Wrote %s', args.xml)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -17,9 +17,13 @@ import xml.etree.ElementTree as ET
 from typing import Any, Optional
 
 from build_runtime_payload import *
+import benchmarks_ci
 import ci_setup
 from performance.common import RunCommand, set_environment_variable
+from performance.correlation_payload import CorrelationPayload, log_payload_sizes
+from performance import partitioning
 from performance.logger import setup_loggers
+from performance.results import ResultsTable
 from send_to_helix import PerfSendToHelixArgs, perf_send_to_helix
 
 DEFAULT_BUILD_CONFIG = "Release"
@@ -32,25 +36,23 @@ def output_counters_for_crank(reports: list[Any]):
         "measurements": []
     }
 
-    for report in reports:
-        for test in report["tests"]:
-            for counter in test["counters"]:
-                measurement_name = f"benchmarkdotnet/{test['name']}/{counter['name']}"
-                for result in counter["results"]:
-                    statistics["measurements"].append({
-                        "name": measurement_name,
-                        "value": result
-                    })
-
-                if counter["topCounter"] == True:
-                    statistics["metadata"].append({
-                        "source": "BenchmarkDotNet",
-                        "name": measurement_name,
-                        "aggregate": "avg",
-                        "reduce": "avg",
-                        "format": "n0",
-                        "shortDescription": f"{test['name']} ({counter['metricName']})"
-                    })
+    for series in ResultsTable.from_reports(reports).series():
+        measurement_name = f"benchmarkdotnet/{series.test.name}/{series.counter.name}"
+        for result in series.values:
+            statistics["measurements"].append({
+                "name": measurement_name,
+                "value": result
+            })
+
+        if series.counter.top_counter:
+            statistics["metadata"].append({
+                "source": "BenchmarkDotNet",
+                "name": measurement_name,
+                "aggregate": "avg",
+                "reduce": "avg",
+                "format": "n0",
+                "shortDescription": f"{series.test.name} ({series.counter.metric_name})"
+            })
 
     statistics["metadata"] = sorted(statistics["metadata"], key=lambda m: m["name"])
 
@@ -84,6 +86,8 @@ class RunPerformanceJobArgs:
     os_sub_group: Optional[str] = None
     project_file: Optional[str] = None
     partition_count: Optional[int] = None
+    partition_history: Optional[str] = None
+    prebuild_benchmarks: bool = False
     build_repository_name: str = os.environ.get("BUILD_REPOSITORY_NAME", "dotnet/performance")
     build_source_branch: str = os.environ.get("BUILD_SOURCEBRANCH", "main")
     build_number: str = os.environ.get("BUILD_BUILDNUMBER", "local")
@@ -122,6 +126,10 @@ class RunPerformanceJobArgs:
     live_libraries_build_config: Optional[str] = None
     cross_build: bool = False
 
+# Subdirectory (inside the Helix correlation payload) that holds the micro benchmarks built on the agent
+# with --prebuild-benchmarks. Every work item runs them with --run-only instead of building them again.
+MICROBENCHMARKS_BIN_PAYLOAD_SUBDIR = "microbenchmarks-bin"
+
 # Subdirectory (inside the Helix correlation payload) that holds the pre-downloaded ML.NET resources.
 # On the Helix machine this is referenced as <HELIX_CORRELATION_PAYLOAD>/mlnet-resources.
 MLNET_RESOURCES_PAYLOAD_SUBDIR = "mlnet-resources"
@@ -791,9 +799,13 @@ def run_performance_job(args: RunPerformanceJobArgs):
     os.makedirs(root_payload_dir, exist_ok=True)
 
     # Include a copy of the whole performance in the payload directory
+    # Files that already exist in the payload (or, for the Core_Root directories, files with the same content)
+    # are hardlinked instead of copied again
+    correlation_payload = CorrelationPayload(payload_dir)
     performance_payload_dir = os.path.join(payload_dir, "performance")
     getLogger().info("Copying performance repository to payload directory")
-    shutil.copytree(args.performance_repo_dir, performance_payload_dir, ignore=shutil.ignore_patterns("CorrelationStaging", ".git", "artifacts", ".dotnet", ".venv", ".vs"))
+    correlation_payload.add_directory(args.performance_repo_dir, "performance", ignore=shutil.ignore_patterns("CorrelationStaging", ".git", "artifacts", ".dotnet", ".venv", ".vs"))
+    correlation_payload.build()
 
     # For ML.NET runs, pre-download the SSWE word-embedding model into the payload so the benchmarks
     # don't have to fetch it from the network on the (flaky) Helix machines. See
@@ -1049,15 +1061,17 @@ def run_performance_job(args: RunPerformanceJobArgs):
                 architecture=args.architecture,
                 libraries_config=args.live_libraries_build_config,
                 cross_build=args.cross_build)
+            correlation_payload.register_directory("Core_Root")
         else:
             getLogger().info("Copying Core_Root directory to payload directory")
-            shutil.copytree(args.core_root_dir, coreroot_payload_dir, ignore=shutil.ignore_patterns("*.pdb"))
+            correlation_payload.add_directory(args.core_root_dir, "Core_Root", ignore=shutil.ignore_patterns("*.pdb"), deduplicate=True)
+            correlation_payload.build()
 
         if args.baseline_core_root_dir is not None:
             use_baseline_core_run = True
-            baseline_coreroot_payload_dir = os.path.join(payload_dir, "Baseline_Core_Root")
             getLogger().info("Copying Baseline Core_Root directory to payload directory")
-            shutil.copytree(args.baseline_core_root_dir, baseline_coreroot_payload_dir)
+            correlation_payload.add_directory(args.baseline_core_root_dir, "Baseline_Core_Root", deduplicate=True)
+            correlation_payload.build()
     
     if args.maui_version is not None:
         ci_setup_arguments.maui_version = args.maui_version
@@ -1184,7 +1198,8 @@ def run_performance_job(args: RunPerformanceJobArgs):
     # ci_setup may modify global.json, so we should copy it across to the payload directory if that happens
     # TODO: Refactor this when we eventually remove the dependency on ci_setup.py directly from the runtime repository.
     getLogger().info("Copying global.json to payload directory")
-    shutil.copy(global_json_path, os.path.join(performance_payload_dir, 'global.json'))
+    correlation_payload.add_file(global_json_path, os.path.join("performance", "global.json"))
+    correlation_payload.build()
 
     # Building CertHelper needs to happen here as we need it on every run. This also means that we will need to move the calculation
     # of the parameters needed outside of the if block
@@ -1310,17 +1325,19 @@ def run_performance_job(args: RunPerformanceJobArgs):
             os.environ.update(environ_copy)
 
         getLogger().info("Copying NuGet.config, shared, and staticdeps to payload directory")
-        shutil.copy(os.path.join(performance_payload_dir, "NuGet.config"), os.path.join(root_payload_dir, "NuGet.config"))
-        shutil.copytree(os.path.join(performance_payload_dir, "scripts"), os.path.join(payload_dir, "scripts"))
-        shutil.copytree(os.path.join(performance_payload_dir, "src", "scenarios", "shared"), os.path.join(payload_dir, "shared"))
-        shutil.copytree(os.path.join(performance_payload_dir, "src", "scenarios", "staticdeps"), os.path.join(payload_dir, "staticdeps"))
+        correlation_payload.add_file(os.path.join(performance_payload_dir, "NuGet.config"), os.path.join("root", "NuGet.config"))
+        correlation_payload.add_directory(os.path.join(performance_payload_dir, "scripts"), "scripts")
+        correlation_payload.add_directory(os.path.join(performance_payload_dir, "src", "scenarios", "shared"), "shared")
+        correlation_payload.add_directory(os.path.join(performance_payload_dir, "src", "scenarios", "staticdeps"), "staticdeps")
+        correlation_payload.build()
         
         if args.architecture == "arm64":
             dotnet_dir = os.path.join(ci_setup_arguments.install_dir, "")
             arm64_dotnet_dir = os.path.join(args.performance_repo_dir, "tools", "dotnet", "arm64")
             getLogger().info(f"Copying arm64 dotnet directory to payload dotnet directory")
             shutil.rmtree(dotnet_dir)
-            shutil.copytree(arm64_dotnet_dir, dotnet_dir)
+            correlation_payload.add_directory(arm64_dotnet_dir, os.path.relpath(dotnet_dir, payload_dir))
+            correlation_payload.build()
 
         # Zip the workitem directory (for xharness (mobile) based workitems)
         if args.run_kind == "ios_scenarios" or args.run_kind == "android_scenarios":
@@ -1365,6 +1382,48 @@ def run_performance_job(args: RunPerformanceJobArgs):
     work_item_command = get_work_item_command_for_artifact_dir(bdn_artifacts_directory)
     baseline_work_item_command = get_work_item_command_for_artifact_dir(bdn_baseline_artifacts_dir)
 
+    # Build the micro benchmarks once on the agent and ship the isolated build output in the correlation
+    # payload, so the work items of every partition only run them
+    if args.prebuild_benchmarks and not wasm and not args.is_scenario:
+        assert args.target_csproj is not None
+        prebuilt_bin_dir = os.path.join(payload_dir, MICROBENCHMARKS_BIN_PAYLOAD_SUBDIR)
+        getLogger().info(f"Building {args.target_csproj} into {prebuilt_bin_dir}")
+        benchmarks_ci.main([
+            "--csproj", os.path.join(args.performance_repo_dir, args.target_csproj.replace("\\", os.sep)),
+            "--incremental", "no",
+            "--architecture", args.architecture,
+            "-f", perf_lab_framework,
+            "--dotnet-path", os.path.dirname(dotnet_executable_path),
+            "--build-only",
+            "--run-isolated",
+            "--bin-directory", prebuilt_bin_dir,
+            "--skip-logger-setup"])
+
+        if args.os_group == "windows":
+            prebuilt_bin_payload_dir = f"%HELIX_CORRELATION_PAYLOAD%\\{MICROBENCHMARKS_BIN_PAYLOAD_SUBDIR}"
+        else:
+            prebuilt_bin_payload_dir = f"$HELIX_CORRELATION_PAYLOAD/{MICROBENCHMARKS_BIN_PAYLOAD_SUBDIR}"
+        prebuilt_arguments = ["--run-only", "--run-isolated", "--bin-directory", prebuilt_bin_payload_dir]
+        work_item_command += prebuilt_arguments
+        baseline_work_item_command += prebuilt_arguments
+
+    # Balance the partitions by the benchmark durations of a previous run when they are available,
+    # otherwise the harness keeps partitioning by benchmark name hash
+    if args.partition_count is not None and args.partition_history is not None:
+        partition_plan = partitioning.plan_partitions(partitioning.read_durations([args.partition_history]), args.partition_count)
+        if partition_plan is None:
+            getLogger().info(f"No benchmark durations found in '{args.partition_history}', or too many benchmark namespaces to filter on, using hash partitioning")
+        else:
+            partitioning.write_plan(partition_plan, os.path.join(payload_dir, "partition-plan.json"))
+            for partition in partition_plan["partitions"]:
+                getLogger().info(f"Partition {partition['index']}: {len(partition['filters'])} {partition_plan['granularity']} filters, expected {partition['expected_seconds']:.0f}s")
+            if args.os_group == "windows":
+                partition_plan_path = "%HELIX_CORRELATION_PAYLOAD%\\partition-plan.json"
+            else:
+                partition_plan_path = "$HELIX_CORRELATION_PAYLOAD/partition-plan.json"
+            work_item_command += ["--partition-plan", partition_plan_path]
+            baseline_work_item_command += ["--partition-plan", partition_plan_path]
+
     work_item_timeout = timedelta(hours=6)
     if args.only_sanity_check:
         work_item_timeout = timedelta(hours=1.5)
@@ -1376,20 +1435,18 @@ def run_performance_job(args: RunPerformanceJobArgs):
     if args.compare:
         fail_on_test_failure = False        
         if args.os_group == "windows":
-            dotnet_exe = f"%HELIX_WORKITEM_ROOT%\\performance\\tools\\dotnet\\{args.architecture}\\dotnet.exe"
-            results_comparer = "%HELIX_WORKITEM_ROOT%\\performance\\src\\tools\\ResultsComparer\\ResultsComparer.csproj"
+            python = "python"
+            results_comparer = "%HELIX_WORKITEM_ROOT%\\performance\\scripts\\results_comparer.py"
             threshold = "2%%"
             xml_results = "%HELIX_WORKITEM_ROOT%\\testResults.xml"
         else:
-            dotnet_exe = f"$HELIX_WORKITEM_ROOT/performance/tools/dotnet/{args.architecture}/dotnet"
-            results_comparer = "$HELIX_WORKITEM_ROOT/performance/src/tools/ResultsComparer/ResultsComparer.csproj"
+            python = "python3"
+            results_comparer = "$HELIX_WORKITEM_ROOT/performance/scripts/results_comparer.py"
             threshold = "2%"
             xml_results = "$HELIX_WORKITEM_ROOT/testResults.xml"
 
         compare_command = [
-            dotnet_exe, "run",
-            "-f", perf_lab_framework,
-            "-p", results_comparer,
+            python, results_comparer,
             "--base", bdn_baseline_artifacts_dir,
             "--diff", bdn_artifacts_directory,
             "--threshold", threshold,
@@ -1398,6 +1455,8 @@ def run_performance_job(args: RunPerformanceJobArgs):
     # Restore original global.json from backup before sending to Helix
     shutil.copy(global_json_backup_path, global_json_path)
 
+    log_payload_sizes(payload_dir)
+
     perf_send_to_helix_args = PerfSendToHelixArgs(
         helix_source=f"{helix_source_prefix}/{args.build_repository_name}/{args.build_source_branch}",
         helix_type=helix_type,
@@ -1473,7 +1532,8 @@ def main(argv: list[str]):
                 "--performance-repo-ci": "performance_repo_ci",
                 "--only-sanity": "only_sanity_check",
                 "--use-local-commit-time": "use_local_commit_time",
-                "--cross-build": "cross_build"
+                "--cross-build": "cross_build",
+                "--prebuild-benchmarks": "prebuild_benchmarks"
             }
 
             if key in bool_args:
@@ -1523,7 +1583,8 @@ def main(argv: list[str]):
                 "--logical-machine": "logical_machine",
                 "--machine-pool": "machine_pool",
                 "--build-config": "build_config",
-                "--live-libraries-build-config": "live_libraries_build_config"
+                "--live-libraries-build-config": "live_libraries_build_config",
+                "--partition-history": "partition_history"
             }
 
             if key in simple_arg_map:
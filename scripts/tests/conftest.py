@@ -0,0 +1,9 @@
+'''
+The scripts import each other as top level modules (from performance.common import ...), as they
+are run from the scripts directory, so it is put on the path for the tests of the scripts.
+'''
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
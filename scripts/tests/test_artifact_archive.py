@@ -0,0 +1,35 @@
+'''
+Because of how pytest finds things, all import modules must start with scripts.
+'''
+
+import zipfile
+from pathlib import Path
+
+from scripts.performance.artifact_archive import UPLOADED_SEPARATELY_FILE, get_compression, write_artifacts_archive
+
+def test_compression_policy():
+    assert get_compression('build.binlog') == (zipfile.ZIP_STORED, None)
+    assert get_compression('Report-full.JSON') == (zipfile.ZIP_DEFLATED, 9)
+    assert get_compression('trace.nettrace') == (zipfile.ZIP_DEFLATED, 6)
+
+def test_archive_leaves_out_files_in_upload_root(tmp_path: Path):
+    artifacts = tmp_path / 'artifacts'
+    (artifacts / 'results').mkdir(parents=True)
+    (artifacts / 'results' / 'a-perf-lab-report.json').write_text('{"report": 1}')
+    (artifacts / 'results' / 'a-report-full.json').write_text('{}')
+    (artifacts / 'log').mkdir()
+    (artifacts / 'log' / 'build.binlog').write_bytes(b'binlog')
+    upload_root = tmp_path / 'upload'
+    upload_root.mkdir()
+    (upload_root / 'a-perf-lab-report.json').write_text('{"report": 1}')
+    # Same name but different content, must stay in the archive
+    (upload_root / 'build.binlog').write_bytes(b'another binlog')
+
+    archive_path = write_artifacts_archive(str(artifacts), str(upload_root / 'bdn-artifacts'), str(upload_root))
+    assert archive_path == str(upload_root / 'bdn-artifacts.zip')
+    with zipfile.ZipFile(archive_path) as archive:
+        entries = {info.filename: info for info in archive.infolist()}
+        assert sorted(entries) == sorted([UPLOADED_SEPARATELY_FILE, 'log/build.binlog', 'results/a-report-full.json'])
+        assert entries['log/build.binlog'].compress_type == zipfile.ZIP_STORED
+        assert archive.read(UPLOADED_SEPARATELY_FILE).decode() == 'results/a-perf-lab-report.json\n'
+    assert not (upload_root / 'bdn-artifacts.zip.tmp').exists()
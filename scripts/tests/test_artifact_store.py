@@ -0,0 +1,55 @@
+'''
+Because of how pytest finds things, all import modules must start with scripts.
+'''
+
+import os
+import stat
+from pathlib import Path
+
+import pytest
+
+from scripts.performance.artifact_store import ArtifactStore
+
+def _write_tree(root: Path, runtime: str):
+    (root / 'shared').mkdir(parents=True)
+    (root / 'shared' / 'System.Private.CoreLib.dll').write_text(runtime)
+    (root / 'shared' / 'System.Runtime.dll').write_text('facade')
+    (root / 'corerun').write_text('#!/bin/sh')
+    os.chmod(root / 'corerun', 0o755)
+
+@pytest.mark.parametrize('link_mode', ['auto', 'hardlink', 'copy'])
+def test_store_and_materialize_deduplicates(tmp_path: Path, link_mode: str):
+    _write_tree(tmp_path / 'commit1', 'v1')
+    _write_tree(tmp_path / 'commit2', 'v2')
+    store = ArtifactStore(str(tmp_path / 'store'), link_mode)
+    tree1 = store.store_and_materialize(str(tmp_path / 'commit1'), [str(tmp_path / 'MonoJIT'), str(tmp_path / 'MonoInterpreter')])
+    store.store_and_materialize(str(tmp_path / 'commit2'), [str(tmp_path / 'CoreRun')])
+
+    # corerun and System.Runtime.dll are shared by both commits
+    blobs = [name for _, _, names in os.walk(tmp_path / 'store' / 'blobs') for name in names]
+    assert len(blobs) == 4
+    assert (tmp_path / 'MonoInterpreter' / 'shared' / 'System.Private.CoreLib.dll').read_text() == 'v1'
+    assert (tmp_path / 'CoreRun' / 'shared' / 'System.Private.CoreLib.dll').read_text() == 'v2'
+    assert os.stat(tmp_path / 'MonoJIT' / 'corerun').st_mode & stat.S_IXUSR
+    assert (tmp_path / 'MonoJIT.artifact-tree').read_text() == tree1
+    assert store.verify_directory(tree1, str(tmp_path / 'MonoJIT'))
+
+    # Only hardlinks share the read-only blobs, the other modes give files that can be overwritten
+    writable = os.stat(tmp_path / 'CoreRun' / 'corerun').st_mode & stat.S_IWUSR != 0
+    assert writable == (link_mode != 'hardlink')
+
+def test_verify_detects_corruption(tmp_path: Path):
+    _write_tree(tmp_path / 'commit1', 'v1')
+    store = ArtifactStore(str(tmp_path / 'store'), 'copy')
+    tree = store.store_and_materialize(str(tmp_path / 'commit1'), [str(tmp_path / 'CoreRun')])
+    assert store.verify() == set() and store.is_intact(tree)
+
+    blob = next(os.path.join(dirpath, name) for dirpath, _, names in os.walk(tmp_path / 'store' / 'blobs') for name in names if name.endswith('.x'))
+    os.chmod(blob, 0o644)
+    Path(blob).write_text('corrupted')
+    corrupted = store.verify()
+    assert len(corrupted) == 1 and not os.path.exists(blob)
+    assert not store.is_intact(tree, corrupted)
+
+    (tmp_path / 'CoreRun' / 'shared' / 'System.Runtime.dll').write_text('changed')
+    assert not store.verify_directory(tree, str(tmp_path / 'CoreRun'))
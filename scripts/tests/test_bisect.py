@@ -0,0 +1,26 @@
+'''
+Because of how pytest finds things, all import modules must start with scripts.
+'''
+
+from scripts.performance.bisect import find_first_regression, get_probe_indices
+
+def test_probe_indices():
+    assert get_probe_indices(-1, 9, 1) == [4]
+    assert get_probe_indices(-1, 9, 3) == [1, 4, 6]
+    assert get_probe_indices(3, 5, 3) == [4]
+    assert get_probe_indices(4, 5, 3) == []
+
+def test_find_first_regression():
+    commits = [f'c{i}' for i in range(20)]
+    for probe_count in (1, 3):
+        for first_bad in range(20):
+            batches: list[list[str]] = []
+            def is_regressed(batch: list[str]) -> list[bool]:
+                batches.append(batch)
+                return [int(commit[1:]) >= first_bad for commit in batch]
+            assert find_first_regression(commits, is_regressed, probe_count) == f'c{first_bad}'
+            assert len(batches) <= 6
+
+def test_no_regression():
+    assert find_first_regression(['c0', 'c1'], lambda batch: [False] * len(batch)) is None
+    assert find_first_regression([], lambda batch: [True] * len(batch)) is None
@@ -0,0 +1,51 @@
+'''
+Because of how pytest finds things, all import modules must start with scripts.
+'''
+
+from pathlib import Path
+
+from scripts.performance.build_cache import BuildCache, compute_fingerprint, get_build_inputs, get_project_graph
+
+def _write_projects(root: Path):
+    (root / 'app' / 'obj').mkdir(parents=True)
+    (root / 'lib').mkdir()
+    (root / 'app' / 'App.csproj').write_text('<Project><ItemGroup><ProjectReference Include="..\\lib\\Lib.csproj" /></ItemGroup></Project>')
+    (root / 'app' / 'Program.cs').write_text('class Program {}')
+    (root / 'app' / 'obj' / 'project.assets.json').write_text('{}')
+    (root / 'lib' / 'Lib.csproj').write_text('<Project />')
+    (root / 'lib' / 'Lib.cs').write_text('class Lib {}')
+    (root / 'Directory.Build.props').write_text('<Project />')
+
+def test_fingerprint_follows_project_graph(tmp_path: Path):
+    _write_projects(tmp_path)
+    project = str(tmp_path / 'app' / 'App.csproj')
+    assert [Path(p).name for p in get_project_graph(project)] == ['App.csproj', 'Lib.csproj']
+
+    inputs = get_build_inputs(project, str(tmp_path))
+    assert sorted(Path(p).name for p in inputs) == ['App.csproj', 'Directory.Build.props', 'Lib.cs', 'Lib.csproj', 'Program.cs']
+    assert sorted(Path(p).name for p in get_build_inputs(project, str(tmp_path), project_files_only=True)) == ['App.csproj', 'Directory.Build.props', 'Lib.csproj']
+
+    fingerprint = compute_fingerprint(inputs, str(tmp_path), {'sdk': '9.0.100'})
+    assert fingerprint == compute_fingerprint(inputs, str(tmp_path), {'sdk': '9.0.100'})
+    assert fingerprint != compute_fingerprint(inputs, str(tmp_path), {'sdk': '10.0.100'})
+    (tmp_path / 'lib' / 'Lib.cs').write_text('class Lib { }')
+    assert fingerprint != compute_fingerprint(inputs, str(tmp_path), {'sdk': '9.0.100'})
+
+def test_save_restore_and_evict(tmp_path: Path):
+    artifacts = tmp_path / 'artifacts'
+    (artifacts / 'bin' / 'App').mkdir(parents=True)
+    (artifacts / 'bin' / 'App' / 'App.dll').write_text('v1')
+    cache = BuildCache(str(tmp_path / 'cache'), max_entries=2)
+    assert not cache.restore('a', str(artifacts))
+
+    cache.save('a', str(artifacts), ['bin/App'])
+    (artifacts / 'bin' / 'App' / 'App.dll').write_text('v2')
+    (artifacts / 'bin' / 'App' / 'Stale.dll').write_text('')
+    assert cache.restore('a', str(artifacts))
+    assert (artifacts / 'bin' / 'App' / 'App.dll').read_text() == 'v1'
+    assert not (artifacts / 'bin' / 'App' / 'Stale.dll').exists()
+
+    cache.save('b', str(artifacts), ['bin/App'])
+    cache.save('c', str(artifacts), ['bin/App'])
+    assert not cache.contains('a')
+    assert cache.contains('b') and cache.contains('c')
@@ -0,0 +1,104 @@
+'''
+Because of how pytest finds things, all import modules must start with scripts.
+'''
+
+import io
+import os
+import stat
+import sys
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from scripts.build_runtime_payload import extract_archive_or_copy
+
+FILES = {
+    'root/sub/corerun': b'corerun',
+    'root/sub/coreclr.so': b'coreclr',
+    'root/sub/other.txt': b'other',
+    'root/top.txt': b'top',
+}
+
+def _read_tree(directory: Path) -> dict[str, bytes]:
+    return {path.relative_to(directory).as_posix(): path.read_bytes() for path in directory.rglob('*') if path.is_file()}
+
+def _write_zip(path: Path, files: dict[str, bytes]) -> None:
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+        archive.writestr('root/empty/', b'')
+
+def _add_tar_file(archive: tarfile.TarFile, name: str, content: bytes, mode: int = 0o644) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(content)
+    info.mode = mode
+    info.mtime = 1_700_000_000
+    archive.addfile(info, io.BytesIO(content))
+
+def _write_tar_gz(path: Path, files: dict[str, bytes]) -> None:
+    with tarfile.open(path, 'w:gz') as archive:
+        for name, content in files.items():
+            _add_tar_file(archive, name, content, 0o755 if name.endswith('corerun') else 0o644)
+        link = tarfile.TarInfo('root/sub/libcoreclr.so')
+        link.type = tarfile.SYMTYPE
+        link.linkname = 'coreclr.so'
+        archive.addfile(link)
+        hardlink = tarfile.TarInfo('root/sub/coreclr-copy.so')
+        hardlink.type = tarfile.LNKTYPE
+        hardlink.linkname = 'root/sub/coreclr.so'
+        archive.addfile(hardlink)
+
+def test_extract_zip(tmp_path: Path):
+    archive = tmp_path / 'payload.zip'
+    _write_zip(archive, FILES)
+
+    extract_archive_or_copy(str(archive), str(tmp_path / 'all'))
+    assert _read_tree(tmp_path / 'all') == FILES
+    assert (tmp_path / 'all' / 'root' / 'empty').is_dir()
+
+    extract_archive_or_copy(str(archive), str(tmp_path / 'folder'), prefix='root/sub/')
+    assert _read_tree(tmp_path / 'folder') == {'corerun': b'corerun', 'coreclr.so': b'coreclr', 'other.txt': b'other'}
+
+    extract_archive_or_copy(str(archive), str(tmp_path / 'files'), prefix='root/sub/core', file_mode=0o640)
+    assert _read_tree(tmp_path / 'files') == {'corerun': b'corerun', 'coreclr.so': b'coreclr'}
+    if sys.platform != 'win32':
+        assert stat.S_IMODE((tmp_path / 'files' / 'corerun').stat().st_mode) == 0o640
+
+def test_extract_tar_gz(tmp_path: Path):
+    archive = tmp_path / 'payload.tar.gz'
+    _write_tar_gz(archive, FILES)
+
+    extract_archive_or_copy(str(archive), str(tmp_path / 'all'))
+    extracted = tmp_path / 'all' / 'root' / 'sub'
+    assert (extracted / 'coreclr-copy.so').read_bytes() == b'coreclr'
+    assert (tmp_path / 'all' / 'root' / 'top.txt').stat().st_mtime == 1_700_000_000
+    if sys.platform != 'win32':
+        assert os.readlink(extracted / 'libcoreclr.so') == 'coreclr.so'
+        assert stat.S_IMODE((extracted / 'corerun').stat().st_mode) == 0o755
+        assert stat.S_IMODE((extracted / 'other.txt').stat().st_mode) == 0o644
+
+    extract_archive_or_copy(str(archive), str(tmp_path / 'files'), prefix='root/sub/core', file_mode=0o600)
+    files = _read_tree(tmp_path / 'files')
+    assert files['corerun'] == b'corerun' and files['coreclr-copy.so'] == b'coreclr'
+    assert 'other.txt' not in files and 'top.txt' not in files
+    if sys.platform != 'win32':
+        assert stat.S_IMODE((tmp_path / 'files' / 'corerun').stat().st_mode) == 0o600
+
+@pytest.mark.parametrize('member', ['../evil.txt', 'root/../../evil.txt', '/tmp/evil.txt'])
+def test_extract_rejects_members_outside_of_destination(tmp_path: Path, member: str):
+    destination = tmp_path / 'destination'
+    zip_archive = tmp_path / 'payload.zip'
+    _write_zip(zip_archive, {'root/top.txt': b'top', member: b'evil'})
+    with pytest.raises(ValueError):
+        extract_archive_or_copy(str(zip_archive), str(destination))
+
+    tar_archive = tmp_path / 'payload.tar.gz'
+    with tarfile.open(tar_archive, 'w:gz') as archive:
+        _add_tar_file(archive, member, b'evil')
+    with pytest.raises(ValueError):
+        extract_archive_or_copy(str(tar_archive), str(destination))
+
+    assert not (tmp_path / 'evil.txt').exists()
+    assert not [path for path in destination.rglob('*') if path.is_file()]
@@ -0,0 +1,81 @@
+'''
+Because of how pytest finds things, all import modules must start with scripts.
+'''
+
+import os
+import subprocess
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from threading import Thread
+from typing import Any, Optional
+
+from scripts.performance.common import override
+from scripts.performance.commit_dates import (CommitDateCache, CommitDateResolver, GitCommitDateResolver,
+                                              HttpPatchCommitDateResolver, resolve_commit_date)
+
+PATCH = '''From 0123456789abcdef Mon Sep 17 00:00:00 2001
+From: Someone <someone@example.com>
+Date: Tue, 3 Sep 2024 10:15:00 -0700
+Subject: [PATCH] Change
+'''
+
+class _PatchHandler(BaseHTTPRequestHandler):
+    requests: list[str] = []
+
+    def do_GET(self):
+        _PatchHandler.requests.append(self.path)
+        if self.path.startswith('/dotnet/sdk/'):
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(PATCH.encode('utf-8'))
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    @override
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+def test_http_resolver_with_fake_server():
+    server = HTTPServer(('127.0.0.1', 0), _PatchHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        resolver = HttpPatchCommitDateResolver(f'http://127.0.0.1:{server.server_port}', attempts=2, initial_delay=0)
+        assert resolver.resolve(['dotnet/dotnet', 'dotnet/sdk'], 'abc') == '2024-09-03T17:15:00Z'
+        assert _PatchHandler.requests == ['/dotnet/dotnet/commit/abc.patch', '/dotnet/sdk/commit/abc.patch']
+        assert resolver.resolve(['dotnet/runtime'], 'abc') is None
+    finally:
+        server.shutdown()
+
+def test_git_resolver(tmp_path: Path):
+    environment = {**os.environ, 'GIT_AUTHOR_DATE': '2024-09-03T17:15:00Z', 'GIT_COMMITTER_DATE': '2024-09-03T17:15:00Z',
+                   'GIT_AUTHOR_NAME': 'a', 'GIT_AUTHOR_EMAIL': 'a@b', 'GIT_COMMITTER_NAME': 'a', 'GIT_COMMITTER_EMAIL': 'a@b'}
+    subprocess.run(['git', 'init', '-q', str(tmp_path)], check=True)
+    subprocess.run(['git', '-C', str(tmp_path), 'commit', '-q', '--allow-empty', '-m', 'empty'], check=True, env=environment)
+    sha = subprocess.check_output(['git', '-C', str(tmp_path), 'rev-parse', 'HEAD'], text=True).strip()
+
+    resolver = GitCommitDateResolver([str(tmp_path / 'missing'), str(tmp_path)])
+    assert resolver.resolve([], sha) == '2024-09-03T17:15:00Z'
+    assert resolver.resolve([], '0' * 40) is None
+
+class _FakeResolver(CommitDateResolver):
+    name = 'fake'
+
+    def __init__(self, timestamp: Optional[str]):
+        self.timestamp = timestamp
+        self.calls = 0
+
+    @override
+    def resolve(self, repositories: list[str], commit_sha: str) -> Optional[str]:
+        self.calls += 1
+        return self.timestamp
+
+def test_resolver_chain_and_cache(tmp_path: Path):
+    cache_path = str(tmp_path / 'commit-dates.jsonl')
+    missing, found = _FakeResolver(None), _FakeResolver('2024-09-03T17:15:00Z')
+    assert resolve_commit_date(['dotnet/sdk'], 'abc', [missing, found], CommitDateCache(cache_path)) == '2024-09-03T17:15:00Z'
+    assert (missing.calls, found.calls) == (1, 1)
+
+    # A new cache instance reads the persisted entry, so the resolvers are not called again
+    assert resolve_commit_date(['dotnet/sdk'], 'abc', [missing, found], CommitDateCache(cache_path)) == '2024-09-03T17:15:00Z'
+    assert (missing.calls, found.calls) == (1, 1)
@@ -2,7 +2,118 @@
 Because of how pytest finds things, all import modules must start with scripts.
 '''
 
-from scripts.performance.common import get_repo_root_path
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from subprocess import CalledProcessError
+from typing import Optional
+import logging
+import os
+import stat
+import sys
+import time
+
+import pytest
+
+from scripts.performance.common import OutputCapture, RunCommand, get_repo_root_path, run_commands_concurrently
 
 def test_rootpath():
-    assert get_repo_root_path().endswith('performance')
\ No newline at end of file
+    assert get_repo_root_path().endswith('performance')
+
+def test_run_command_working_directories_on_concurrent_threads(tmp_path: Path):
+    directories = [os.path.join(tmp_path, str(index)) for index in range(8)]
+    for directory in directories:
+        os.makedirs(directory)
+    cwd = os.getcwd()
+
+    def get_child_cwd(directory: str) -> str:
+        command = RunCommand([sys.executable, '-c', 'import os; print(os.getcwd())'], verbose=True, echo=False)
+        command.run(directory)
+        return command.stdout.strip()
+
+    with ThreadPoolExecutor(max_workers=len(directories)) as executor:
+        child_cwds = list(executor.map(get_child_cwd, directories * 4))
+
+    assert [os.path.realpath(path) for path in child_cwds] == [os.path.realpath(path) for path in directories * 4]
+    assert os.getcwd() == cwd
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='shell script')
+def test_run_command_relative_executable_is_found_in_working_directory(tmp_path: Path):
+    script = os.path.join(tmp_path, 'tool.sh')
+    with open(script, 'w') as f:
+        f.write('#!/bin/sh\necho tool "$@"\n')
+    os.chmod(script, os.stat(script).st_mode | stat.S_IXUSR)
+
+    command = RunCommand(['./tool.sh', 'arg'], verbose=True, echo=False)
+    command.run(str(tmp_path))
+    assert command.stdout.strip() == 'tool arg'
+
+def test_output_capture_keeps_the_most_recent_bytes():
+    capture = OutputCapture(echo=False, max_bytes=10)
+    capture.write(b'0123456789')
+    assert not capture.truncated
+    capture.write(b'abcd')
+    capture.write(b'')
+    assert capture.getvalue() == '456789abcd'
+    assert capture.truncated
+
+    # A single chunk larger than the buffer keeps its end
+    capture.write(b'ABCDEFGHIJKLMNOP')
+    capture.close()
+    assert capture.getvalue() == 'GHIJKLMNOP'
+
+    with pytest.raises(ValueError):
+        OutputCapture(echo=False, max_bytes=0)
+
+def test_output_capture_spills_everything_to_a_file(tmp_path: Path):
+    spill = tmp_path / 'output.log'
+    capture = OutputCapture(echo=False, max_bytes=4, spill_path=str(spill))
+    for chunk in (b'first\n', b'second\n', b'third'):
+        capture.write(chunk)
+    capture.close()
+    assert capture.getvalue() == 'hird'
+    assert spill.read_bytes() == b'first\nsecond\nthird'
+
+def test_output_capture_echoes_lines_split_across_chunks(caplog: pytest.LogCaptureFixture):
+    caplog.set_level(logging.INFO)
+    capture = OutputCapture(echo=True)
+    for chunk in (b'one\ntw', b'o\r\nthr', b'ee', b'\n\nfo', b'ur'):
+        capture.write(chunk)
+    assert [record.getMessage() for record in caplog.records] == ['one', 'two', 'three', '']
+    capture.close()
+    assert [record.getMessage() for record in caplog.records] == ['one', 'two', 'three', '', 'four']
+    assert capture.getvalue() == 'one\ntwo\r\nthree\n\nfour'
+
+def test_run_command_limits_captured_output(tmp_path: Path):
+    output_file = tmp_path / 'output.log'
+    command = RunCommand([sys.executable, '-c', 'print("x" * 100000, end=""); print("end", end="")'],
+                         verbose=True, echo=False, max_output_bytes=1000, output_file=str(output_file))
+    command.run()
+    assert len(command.stdout) == 1000
+    assert command.stdout.endswith('end')
+    assert output_file.stat().st_size == 100003
+
+def test_run_commands_concurrently(tmp_path: Path):
+    commands: list[tuple[RunCommand, Optional[str]]] = [
+        (RunCommand([sys.executable, '-c', f'import time; time.sleep(0.5); print({index})'], verbose=True, echo=False), str(tmp_path))
+        for index in range(4)]
+    start = time.perf_counter()
+    assert run_commands_concurrently(commands, max_concurrency=4) == [0, 0, 0, 0]
+    # Run one after the other, they would take at least 2s
+    assert time.perf_counter() - start < 0.5 * 3
+    assert [command.stdout.strip() for command, _ in commands] == ['0', '1', '2', '3']
+
+def test_run_commands_concurrently_raises_the_first_failure_once_all_finished(tmp_path: Path):
+    marker = tmp_path / 'finished'
+    commands: list[tuple[RunCommand, Optional[str]]] = [
+        (RunCommand([sys.executable, '-c', 'import sys; sys.exit(3)']), None),
+        (RunCommand([sys.executable, '-c', 'import sys; sys.exit(4)']), None),
+        (RunCommand([sys.executable, '-c', f'import time; time.sleep(0.2); open(r"{marker}", "w").close()']), None),
+    ]
+    with pytest.raises(CalledProcessError) as error:
+        run_commands_concurrently(commands, max_concurrency=1)
+    assert error.value.returncode == 3
+    assert marker.exists()
+
+    assert run_commands_concurrently([(RunCommand([sys.executable, '-c', 'import sys; sys.exit(5)'], success_exit_codes=[5]), None)]) == [5]
+    with pytest.raises(ValueError):
+        run_commands_concurrently([], max_concurrency=0)
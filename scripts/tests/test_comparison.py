@@ -0,0 +1,42 @@
+'''
+Because of how pytest finds things, all import modules must start with scripts.
+'''
+
+import json
+from pathlib import Path
+from typing import Any
+
+from scripts.performance.comparison import FASTER, SAME, SLOWER, Threshold, compare, mann_whitney_greater, read_samples_by_job, tost
+
+def test_threshold_parse():
+    assert Threshold.parse('5%').relative
+    assert Threshold.parse('5%').value == 0.05
+    assert Threshold.parse('10ms').value == 10_000_000
+    assert Threshold.parse('0.3ns').value == 0.3
+
+def test_mann_whitney_exact():
+    # all of x above all of y: the only ordering out of C(6, 3) = 20 with the maximum U
+    assert abs(mann_whitney_greater([4, 5, 6], [1, 2, 3]) - 1 / 20) < 1e-12
+    assert mann_whitney_greater([1, 2, 3], [4, 5, 6]) == 1.0
+
+def test_tost_and_noise_filter():
+    base = [100.0 + i * 0.1 for i in range(20)]
+    assert tost(base, [value * 1.2 for value in base], Threshold.parse('5%')) == SLOWER
+    assert tost(base, [value * 0.8 for value in base], Threshold.parse('5%')) == FASTER
+    assert tost(base, [value * 1.01 for value in base], Threshold.parse('5%')) == SAME
+
+    tiny = [1.0 + i * 0.001 for i in range(20)]
+    results = compare({'A': base, 'B': tiny}, {'A': [value * 1.2 for value in base], 'B': [value * 1.2 for value in tiny]},
+                      Threshold.parse('5%'), Threshold.parse('0.3ns'), bootstrap_iterations=50)
+    conclusions = {result.id: result.conclusion for result in results}
+    assert conclusions == {'A': SLOWER, 'B': SAME}
+    interval = next(result.interval for result in results if result.id == 'A')
+    assert interval is not None and interval[0] <= 1.2 <= interval[1]
+
+def test_read_samples_by_job(tmp_path: Path):
+    benchmarks: list[dict[str, Any]] = [
+        {'FullName': 'A.B', 'DisplayInfo': f'A.B: Job-{job}(Toolchain=/CoreRun-{key}-linux-x64/Core_Root/corerun)', 'Statistics': {'OriginalValues': [value]}}
+        for job, key, value in (('X', 'aaa', 1.0), ('Y', 'bbb', 2.0))]
+    benchmarks.append({'FullName': 'A.Failed', 'DisplayInfo': 'A.Failed: Job-X(Toolchain=/CoreRun-aaa-linux-x64/Core_Root/corerun)', 'Statistics': None})
+    (tmp_path / 'A-report-full.json').write_text(json.dumps({'Benchmarks': benchmarks}))
+    assert read_samples_by_job([str(tmp_path / 'A-report-full.json')], ['aaa', 'bbb']) == {'aaa': {'A.B': [1.0]}, 'bbb': {'A.B': [2.0]}}
@@ -0,0 +1,68 @@
+'''
+Because of how pytest finds things, all import modules must start with scripts.
+'''
+
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from scripts.performance.correlation_payload import CorrelationPayload, get_payload_sizes
+
+def _is_hardlink(first: Path, second: Path) -> bool:
+    return os.stat(first).st_ino == os.stat(second).st_ino
+
+def test_build_links_payload_files_and_duplicates(tmp_path: Path):
+    repo = tmp_path / 'repo'
+    (repo / 'scripts').mkdir(parents=True)
+    (repo / 'scripts' / 'benchmarks_ci.py').write_text('print()')
+    (repo / '.git').mkdir()
+    (repo / '.git' / 'HEAD').write_text('ref')
+    (repo / 'global.json').write_text('{}')
+    core_root = tmp_path / 'core_root'
+    baseline_core_root = tmp_path / 'baseline_core_root'
+    for directory, corelib in [(core_root, 'diff'), (baseline_core_root, 'base')]:
+        directory.mkdir()
+        (directory / 'corerun').write_text('corerun')
+        (directory / 'System.Private.CoreLib.dll').write_text(corelib)
+    (core_root / 'corerun.pdb').write_text('')
+
+    payload_dir = tmp_path / 'payload'
+    payload = CorrelationPayload(str(payload_dir))
+    payload.add_directory(str(repo), 'performance', ignore=shutil.ignore_patterns('.git'))
+    payload.add_directory(str(core_root), 'Core_Root', ignore=shutil.ignore_patterns('*.pdb'), deduplicate=True)
+    payload.add_directory(str(baseline_core_root), 'Baseline_Core_Root', deduplicate=True)
+    payload.build()
+    assert not (payload_dir / 'performance' / '.git').exists()
+    assert not (payload_dir / 'Core_Root' / 'corerun.pdb').exists()
+    assert _is_hardlink(payload_dir / 'Core_Root' / 'corerun', payload_dir / 'Baseline_Core_Root' / 'corerun')
+    assert (payload_dir / 'Baseline_Core_Root' / 'System.Private.CoreLib.dll').read_text() == 'base'
+    assert not _is_hardlink(payload_dir / 'performance' / 'scripts' / 'benchmarks_ci.py', repo / 'scripts' / 'benchmarks_ci.py')
+
+    payload.add_directory(str(payload_dir / 'performance' / 'scripts'), 'scripts')
+    payload.build()
+    assert _is_hardlink(payload_dir / 'scripts' / 'benchmarks_ci.py', payload_dir / 'performance' / 'scripts' / 'benchmarks_ci.py')
+
+    # Files added again replace the payload file instead of writing through its hardlinks
+    (tmp_path / 'global.json').write_text('{"sdk": {}}')
+    payload.add_file(str(tmp_path / 'global.json'), os.path.join('performance', 'scripts', 'benchmarks_ci.py'))
+    payload.build()
+    assert (payload_dir / 'scripts' / 'benchmarks_ci.py').read_text() == 'print()'
+
+    sizes = get_payload_sizes(str(payload_dir))
+    # Components are counted in name order, so Core_Root is the one sharing corerun
+    assert sizes['Baseline_Core_Root'].size == sizes['Baseline_Core_Root'].unique_size == len('corerun') + len('base')
+    assert sizes['Core_Root'].size == len('corerun') + len('diff')
+    assert sizes['Core_Root'].unique_size == len('diff')
+
+def test_build_copies_files_on_another_drive(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    def commonpath(paths: list[str]) -> str:
+        raise ValueError("Paths don't have the same drive")
+    monkeypatch.setattr(os.path, 'commonpath', commonpath)
+    (tmp_path / 'source.txt').write_text('source')
+    payload = CorrelationPayload(str(tmp_path / 'payload'))
+    payload.add_file(str(tmp_path / 'source.txt'), 'source.txt')
+    payload.build()
+    assert (tmp_path / 'payload' / 'source.txt').read_text() == 'source'
+    assert not _is_hardlink(tmp_path / 'payload' / 'source.txt', tmp_path / 'source.txt')
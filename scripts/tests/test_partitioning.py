@@ -0,0 +1,44 @@
+'''
+Because of how pytest finds things, all import modules must start with scripts.
+'''
+
+from scripts.performance.partitioning import MAX_FILTERS_LENGTH, get_partition_bdn_arguments, get_type_name, plan_partitions
+
+def test_get_type_name():
+    assert get_type_name('System.Tests.Perf_String.Trim(s: "a.b")') == 'System.Tests.Perf_String'
+    assert get_type_name('System.Collections.Ctor<System.String>.Array') == 'System.Collections.Ctor<System.String>'
+
+def test_plan_is_balanced():
+    durations = {'A.X.M': 10.0, 'B.X.M': 6.0, 'C.X.M': 5.0, 'D.X.M': 4.0, 'C.X.N': 1.0}
+    plan = plan_partitions(durations, 2)
+    assert plan is not None
+    loads = sorted(partition['expected_seconds'] for partition in plan['partitions'])
+    assert loads == [12.0, 14.0]
+    assert sorted(f for p in plan['partitions'] for f in p['filters']) == ['A.X.*', 'B.X.*', 'C.X.*', 'D.X.*']
+    assert plan_partitions({}, 2) is None
+
+def test_partition_bdn_arguments():
+    plan = plan_partitions({'A.X.M': 10.0, 'B.X.M': 1.0}, 2)
+    assert plan is not None
+    args = ['--anyCategories', 'Libraries', '--exclusion-filter', '*Perf_Image*', '--partition-count', '2', '--partition-index', '0']
+    remainder = plan['remainder_partition']
+    runs = get_partition_bdn_arguments(plan, remainder, args)
+    assert runs[0] == ['--anyCategories', 'Libraries', '--exclusion-filter', '*Perf_Image*', '--filter', 'B.X.*']
+    assert runs[1] == ['--anyCategories', 'Libraries', '--exclusion-filter', '*Perf_Image*', 'A.X.*', 'B.X.*']
+    assert get_partition_bdn_arguments(plan, 1 - remainder, args) == [['--anyCategories', 'Libraries', '--exclusion-filter', '*Perf_Image*', '--filter', 'A.X.*']]
+
+def test_plan_falls_back_to_namespaces_then_to_hash_partitioning():
+    # Enough classes for their patterns to exceed the bound, in a few namespaces
+    durations = {f'System.Area{i % 5}.Perf_Benchmark_Class_Number_{i}.M': 1.0 for i in range(1000)}
+    durations['System.Area0.Nested.Perf_Nested.M'] = 1.0
+    plan = plan_partitions(durations, 3)
+    assert plan is not None
+    assert plan['granularity'] == 'namespace'
+    patterns = sorted(f for p in plan['partitions'] for f in p['filters'])
+    # System.Area0.Nested is matched by System.Area0.*, so it is not a pattern of its own
+    assert patterns == [f'System.Area{i}.*' for i in range(5)]
+    assert sum(p['expected_seconds'] for p in plan['partitions']) == 1001.0
+    remainder = get_partition_bdn_arguments(plan, plan['remainder_partition'], [])[-1]
+    assert sum(len(argument) + 1 for argument in remainder) <= MAX_FILTERS_LENGTH + len('--exclusion-filter ')
+
+    assert plan_partitions({f'Namespace_Number_{i}.Perf_Benchmark_Class.M': 1.0 for i in range(1000)}, 3) is None
@@ -0,0 +1,49 @@
+'''
+Because of how pytest finds things, all import modules must start with scripts.
+'''
+
+from pathlib import Path
+
+from scripts.performance.payload_cache import PayloadCache, get_source_fingerprint
+
+def test_key_follows_sources_and_parameters(tmp_path: Path):
+    archive = tmp_path / 'coreclr.tar.gz'
+    archive.write_bytes(b'v1')
+    key = PayloadCache.get_key('build_coreroot_payload', [str(archive)], {'architecture': 'x64'})
+    assert key is not None
+    assert key == PayloadCache.get_key('build_coreroot_payload', [str(archive)], {'architecture': 'x64'})
+    assert key != PayloadCache.get_key('build_coreroot_payload', [str(archive)], {'architecture': 'arm64'})
+    assert key != PayloadCache.get_key('build_mono_payload', [str(archive)], {'architecture': 'x64'})
+
+    archive.write_bytes(b'v2')
+    assert key != PayloadCache.get_key('build_coreroot_payload', [str(archive)], {'architecture': 'x64'})
+    assert PayloadCache.get_key('build_coreroot_payload', [str(tmp_path / 'missing.zip')], {}) is None
+
+    directory = tmp_path / 'bin'
+    directory.mkdir()
+    (directory / 'coreclr.dll').write_text('')
+    fingerprint = get_source_fingerprint(str(directory))
+    assert fingerprint is not None and fingerprint.startswith('tree:')
+    (directory / 'clrjit.dll').write_text('')
+    assert fingerprint != get_source_fingerprint(str(directory))
+
+def test_save_restore_and_evict(tmp_path: Path):
+    core_root = tmp_path / 'payload' / 'Core_Root'
+    (core_root / 'runtimes').mkdir(parents=True)
+    (core_root / 'corerun').write_text('v1')
+    (core_root / 'runtimes' / 'System.Private.CoreLib.dll').write_text('')
+    cache = PayloadCache(str(tmp_path / 'cache'), max_entries=2)
+    assert not cache.restore('a', [str(core_root)])
+
+    cache.save('a', [str(core_root)], {'builder': 'build_coreroot_payload'})
+    other_core_root = tmp_path / 'other' / 'Core_Root'
+    (other_core_root / 'stale').mkdir(parents=True)
+    assert cache.restore('a', [str(other_core_root)])
+    assert (other_core_root / 'corerun').read_text() == 'v1'
+    assert (other_core_root / 'runtimes' / 'System.Private.CoreLib.dll').exists()
+    assert not (other_core_root / 'stale').exists()
+
+    cache.save('b', [str(core_root)])
+    cache.save('c', [str(core_root)])
+    assert not cache.contains('a')
+    assert cache.contains('b') and cache.contains('c')
@@ -0,0 +1,59 @@
+'''
+Because of how pytest finds things, all import modules must start with scripts.
+'''
+
+import json
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from scripts.performance.common import RunCommand
+from scripts.performance.resource_usage import CommandUsage, resource_usage_recorder, wait_with_rusage, write_resource_usage_summary
+
+def test_command_usage_from_rusage():
+    usage = CommandUsage('cmd', 0, 1_000_000_000, 3_500_000_000)
+    usage.set_rusage(SimpleNamespace(ru_utime=1.5, ru_stime=0.5, ru_maxrss=2048, ru_inblock=2, ru_oublock=4))
+    result = usage.to_dict()
+    assert result['wall_seconds'] == 2.5
+    assert result['user_seconds'] == 1.5
+    assert result['sys_seconds'] == 0.5
+    assert result['max_rss_bytes'] == (2048 if sys.platform == 'darwin' else 2048 * 1024)
+    assert (result['read_bytes'], result['write_bytes']) == (1024, 2048)
+
+@pytest.mark.skipif(not hasattr(os, 'wait4'), reason='wait4 is not available')
+def test_wait_with_rusage():
+    pid = os.fork()
+    if pid == 0:
+        os._exit(3)
+    waited = wait_with_rusage(pid)
+    assert waited is not None
+    returncode, rusage = waited
+    assert returncode == 3
+    assert rusage.ru_utime >= 0
+
+def test_run_command_records_usage(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(resource_usage_recorder, 'enabled', True)
+    recorded = len(resource_usage_recorder.records)
+    RunCommand([sys.executable, '-c', 'import sys; sys.exit(2)'], success_exit_codes=[2]).run()
+
+    usage = resource_usage_recorder.records[recorded]
+    assert usage.returncode == 2
+    assert usage.end_time_ns >= usage.start_time_ns
+    assert sys.executable in usage.command
+    if hasattr(os, 'wait4'):
+        assert usage.user_seconds is not None
+
+def test_write_summary_creates_directory_and_never_raises(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    monkeypatch.setattr(resource_usage_recorder, 'enabled', True)
+    RunCommand([sys.executable, '-c', 'pass']).run()
+
+    summary = tmp_path / 'traces' / 'resource-usage.json'
+    write_resource_usage_summary(str(summary))
+    content = json.loads(summary.read_text())
+    assert content['commands'] and content['total_wall_seconds'] > 0
+
+    (tmp_path / 'file').write_text('')
+    write_resource_usage_summary(str(tmp_path / 'file' / 'resource-usage.json'))
@@ -0,0 +1,46 @@
+'''
+Because of how pytest finds things, all import modules must start with scripts.
+'''
+
+from typing import Any
+
+from scripts.performance.results import ResultsTable
+
+def _report(test_name: str, results: list[float]) -> dict[str, Any]:
+    return {
+        'build': {'branch': 'main'},
+        'tests': [{
+            'name': test_name,
+            'categories': ['Libraries'],
+            'counters': [
+                {'name': 'Duration of single invocation', 'metricName': 'ns', 'topCounter': True, 'defaultCounter': True, 'higherIsBetter': False, 'results': results},
+                {'name': 'Allocated', 'metricName': 'bytes', 'topCounter': False, 'defaultCounter': False, 'higherIsBetter': False, 'results': [0.0]},
+            ]
+        }]
+    }
+
+def test_columns_and_index():
+    table = ResultsTable.from_reports([_report('A', [1.0, 2.0, 3.0]), _report('B', [10.0])])
+    assert len(table) == 6
+    assert table.test_names() == ['A', 'B']
+    assert list(table.values_for('A', 'Duration of single invocation')) == [1.0, 2.0, 3.0]
+    assert len(table.counters) == 2
+    assert table.reports[1] == {'build': {'branch': 'main'}}
+
+def test_aggregate_and_filters():
+    table = ResultsTable.from_reports([_report('A', [1.0, 3.0]), _report('B', [10.0])])
+    means = table.aggregate(lambda values: sum(values) / len(values), lambda _, counter: counter.top_counter)
+    assert means == {('A', 'Duration of single invocation'): 2.0, ('B', 'Duration of single invocation'): 10.0}
+    test = table.find_tests(name='B', category='Libraries')[0]
+    assert [s.counter.name for s in table.test_series(test)] == ['Duration of single invocation', 'Allocated']
+
+def test_duplicate_counter_names_keep_every_series():
+    report = _report('A', [1.0])
+    report['tests'][0]['counters'].append({'name': 'Allocated', 'metricName': 'bytes', 'results': [2.0]})
+    table = ResultsTable.from_reports([report])
+    assert len(table) == 3
+    allocated = [list(series.values) for series in table.series() if series.counter.name == 'Allocated']
+    assert allocated == [[0.0], [2.0]]
+    test = table.find_tests(name='A')[0]
+    assert [list(series.values) for series in table.test_series(test)] == [[1.0], [0.0], [2.0]]
+    assert list(table.values_for('A', 'Allocated')) == [0.0, 2.0]
@@ -0,0 +1,94 @@
+'''
+Because of how pytest finds things, all import modules must start with scripts.
+'''
+
+import os
+import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from scripts.performance.sdk_cache import SdkCache, get_runtime_identifier
+
+def _populate_sdk(version: str, size: int = 1):
+    def populate(staging_dir: str) -> None:
+        os.makedirs(os.path.join(staging_dir, 'sdk', version))
+        Path(staging_dir, 'sdk', version, 'dotnet.dll').write_bytes(b'x' * size)
+        Path(staging_dir, 'dotnet').write_text(version)
+    return populate
+
+def test_add_lookup_and_materialize(tmp_path: Path):
+    cache = SdkCache(str(tmp_path / 'cache'))
+    key = SdkCache.get_key('8.0.100', 'x64')
+    assert cache.lookup(key) is None
+    cache.add(key, _populate_sdk('8.0.100'))
+    cache.add(SdkCache.get_key('9.0.100', 'x64'), _populate_sdk('9.0.100'))
+    assert cache.lookup(key) is not None
+
+    install_dir = tmp_path / 'dotnet'
+    cache.materialize(SdkCache.get_key('9.0.100', 'x64'), str(install_dir))
+    cache.materialize(key, str(install_dir))
+    assert (install_dir / 'sdk' / '9.0.100' / 'dotnet.dll').exists()
+    assert (install_dir / 'sdk' / '8.0.100' / 'dotnet.dll').exists()
+    # Non-versioned files are replaced by the last materialized SDK, like dotnet-install does
+    assert (install_dir / 'dotnet').read_text() == '8.0.100'
+
+def test_evicts_least_recently_used(tmp_path: Path):
+    SdkCache(str(tmp_path), budget_bytes=10**6).add('old', _populate_sdk('1.0.0', 100))
+    time.sleep(0.01)
+    SdkCache(str(tmp_path), budget_bytes=10**6).add('new', _populate_sdk('2.0.0', 100))
+
+    cache = SdkCache(str(tmp_path), budget_bytes=150)
+    cache.add('newest', _populate_sdk('3.0.0', 100))
+    assert cache.keys() == ['newest']
+
+def test_seed_archive(tmp_path: Path):
+    sdk_dir = tmp_path / 'sdk'
+    _populate_sdk('8.0.100')(str(sdk_dir))
+    seed_dir = tmp_path / 'seed'
+    seed_dir.mkdir()
+    with tarfile.open(seed_dir / f'dotnet-sdk-8.0.100-{get_runtime_identifier("x64")}.tar.gz', 'w:gz') as archive:
+        archive.add(str(sdk_dir), arcname='.')
+
+    cache = SdkCache(str(tmp_path / 'cache'), seed_directory=str(seed_dir))
+    assert cache.find_seed_archive('8.0.100', 'x64') is not None
+    assert cache.find_seed_archive('9.0.100', 'x64') is None
+
+def test_concurrent_install_populates_once(tmp_path: Path):
+    cache = SdkCache(str(tmp_path / 'cache'))
+    populated: list[str] = []
+    def populate(staging_dir: str) -> None:
+        populated.append(staging_dir)
+        time.sleep(0.05)
+        _populate_sdk('8.0.100')(staging_dir)
+
+    def install(install_dir: str) -> bool:
+        return cache.install('8.0.100-x64', install_dir, populate)
+
+    install_dirs = [str(tmp_path / f'dotnet{i}') for i in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        cached = list(executor.map(install, install_dirs))
+    assert len(populated) == 1
+    assert sorted(cached) == [False, True, True, True]
+    assert all(os.path.exists(os.path.join(install_dir, 'sdk', '8.0.100', 'dotnet.dll')) for install_dir in install_dirs)
+
+def test_concurrent_ensure_populates_once_without_materializing(tmp_path: Path):
+    cache = SdkCache(str(tmp_path / 'cache'))
+    populated: list[str] = []
+    def populate(staging_dir: str) -> None:
+        populated.append(staging_dir)
+        time.sleep(0.05)
+        _populate_sdk('8.0.100')(staging_dir)
+
+    def ensure(_: int) -> bool:
+        return cache.ensure('8.0.100-x64', populate)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        cached = list(executor.map(ensure, range(4)))
+    assert len(populated) == 1
+    assert sorted(cached) == [False, True, True, True]
+    assert cache.keys() == ['8.0.100-x64']
+
+    install_dir = tmp_path / 'dotnet'
+    assert cache.install('8.0.100-x64', str(install_dir), populate)
+    assert (install_dir / 'sdk' / '8.0.100' / 'dotnet.dll').exists()
@@ -0,0 +1,205 @@
+'''
+Because of how pytest finds things, all import modules must start with scripts.
+'''
+
+import json
+from pathlib import Path
+from threading import Lock
+from typing import Any, Optional
+
+import pytest
+from azure.core.exceptions import ResourceExistsError
+
+from scripts import upload
+from scripts.upload import (MAX_QUEUE_MESSAGE_BYTES, QUEUE_MESSAGE_VERSION, QUEUE_MODE_BATCH, QUEUE_MODE_MANIFEST, QUEUE_MODE_MESSAGE,
+                            BatchQueueMessage, Uploader, batch_blob_names, get_queue_mode)
+
+class FakeBlobClient:
+    def __init__(self, container: 'FakeContainerClient', name: str):
+        self.container = container
+        self.name = name
+
+    def upload_blob(self, data: Any, **kwargs: Any) -> None:
+        content = data if isinstance(data, str) else data.read().decode('utf-8')
+        if 'fail' in self.name:
+            raise ResourceExistsError('The specified blob already exists.')
+        with self.container.lock:
+            self.container.blobs[self.name] = content
+
+class FakeContainerClient:
+    '''An in-memory stand-in for a blob container, like an Azurite container.'''
+    def __init__(self):
+        self.blobs: dict[str, str] = {}
+        self.lock = Lock()
+
+    def get_blob_client(self, name: str) -> FakeBlobClient:
+        return FakeBlobClient(self, name)
+
+class FakeQueueClient:
+    def __init__(self, fail_on: Optional[str] = None):
+        self.messages: list[dict[str, Any]] = []
+        self.fail_on = fail_on
+        self.lock = Lock()
+
+    def send_message(self, content: str) -> None:
+        if self.fail_on is not None and self.fail_on in content:
+            raise ConnectionError('The queue is unreachable')
+        with self.lock:
+            self.messages.append(json.loads(content))
+
+class FakeBlobServiceClient:
+    def __init__(self, storage: 'FakeStorage'):
+        self.storage = storage
+
+    def get_container_client(self, container: str) -> FakeContainerClient:
+        return self.storage.containers.setdefault(container, FakeContainerClient())
+
+class FakeStorage:
+    '''In-memory containers and queues, with the credentials the clients were created with.'''
+    def __init__(self):
+        self.containers: dict[str, FakeContainerClient] = {}
+        self.queues: dict[str, FakeQueueClient] = {}
+        self.credentials: list[Any] = []
+
+    def new_blob_service_client(self, account_url: str, credential: Any) -> FakeBlobServiceClient:
+        self.credentials.append(credential)
+        return FakeBlobServiceClient(self)
+
+    def new_queue_client(self, account_url: str, queue_name: str, credential: Any, **kwargs: Any) -> FakeQueueClient:
+        self.credentials.append(credential)
+        return self.queues.setdefault(queue_name, FakeQueueClient())
+
+def _no_sleep(seconds: float) -> None:
+    pass
+
+@pytest.fixture
+def storage(monkeypatch: pytest.MonkeyPatch) -> FakeStorage:
+    '''Replaces the Azure storage clients of upload.py with in-memory ones.'''
+    storage = FakeStorage()
+    monkeypatch.setattr(upload, 'BlobServiceClient', storage.new_blob_service_client)
+    monkeypatch.setattr(upload, 'QueueClient', storage.new_queue_client)
+    monkeypatch.setattr(upload, '_cached_credential', None)
+    # retry_on_exception sleeps between attempts
+    monkeypatch.setattr('time.sleep', _no_sleep)
+    monkeypatch.setenv('HELIX_WORKITEM_ID', 'workitem')
+    return storage
+
+def _write_reports(directory: Path, names: list[str]) -> list[str]:
+    paths: list[str] = []
+    for name in names:
+        path = directory / name
+        path.write_text(json.dumps({'name': name}))
+        paths.append(str(path))
+    return paths
+
+def _new_uploader(queue: Optional[FakeQueueClient], queue_mode: str = QUEUE_MODE_MESSAGE) -> tuple[Uploader, FakeContainerClient]:
+    uploader = Uploader('results', 'queue' if queue is not None else None, 'https://account.{}.core.windows.net', 'key', max_workers=4, queue_mode=queue_mode)
+    container = FakeContainerClient()
+    uploader.container_client = container  # pyright: ignore[reportAttributeAccessIssue] -- in-memory stand-in
+    uploader.queue_client = queue  # pyright: ignore[reportAttributeAccessIssue] -- in-memory stand-in
+    return uploader, container
+
+def test_upload_files_reports_failures_per_file(storage: FakeStorage, tmp_path: Path):
+    queue = FakeQueueClient(fail_on='c-unqueued')
+    uploader, container = _new_uploader(queue)
+    files = _write_reports(tmp_path, ['a.json', 'b-fail.json', 'c-unqueued.json', 'd.json'])
+
+    results = uploader.upload_files(files)
+
+    assert [result.file for result in results] == files
+    assert [(result.uploaded, result.queued, result.failed) for result in results] == [
+        (True, True, False),
+        (False, False, True),
+        (True, False, True),
+        (True, True, False),
+    ]
+    assert results[1].error is not None and 'ResourceExistsError' in results[1].error
+    assert sorted(container.blobs) == ['workitem-a.json', 'workitem-c-unqueued.json', 'workitem-d.json']
+    assert json.loads(container.blobs['workitem-a.json']) == {'name': 'a.json'}
+    assert sorted(message['blob_name'] for message in queue.messages) == ['workitem-a.json', 'workitem-d.json']
+    assert all(message == {'container_name': 'results', 'blob_name': message['blob_name']} for message in queue.messages)
+
+def test_upload_return_code(storage: FakeStorage, tmp_path: Path):
+    _write_reports(tmp_path, ['a.json', 'b.json'])
+    assert upload.upload(str(tmp_path / '*.json'), 'results', 'queue', 'https://account.{}.core.windows.net', credential='key') == 0
+    assert len(storage.queues['queue'].messages) == 2
+    assert sorted(storage.containers['results'].blobs) == ['workitem-a.json', 'workitem-b.json']
+
+    _write_reports(tmp_path, ['c-fail.json'])
+    assert upload.upload(str(tmp_path / '*.json'), 'results', None, 'https://account.{}.core.windows.net', credential='key') == 1
+
+def test_upload_reuses_the_credential(storage: FakeStorage, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    credentials: list[object] = []
+    def get_credential() -> object:
+        credentials.append(object())
+        return credentials[-1]
+    monkeypatch.setattr(upload, 'get_credential', get_credential)
+    _write_reports(tmp_path, ['a.json'])
+
+    for _ in range(3):
+        assert upload.upload(str(tmp_path / '*.json'), 'results', 'queue', 'https://account.{}.core.windows.net') == 0
+
+    assert len(credentials) == 1
+    # A blob service client and a queue client per upload, all with the same credential
+    assert storage.credentials == credentials * 6
+
+def test_batch_blob_names_packs_within_the_size_limit():
+    names = [f'workitem-{index:04}-perf-lab-report.json' for index in range(3000)]
+    batches = batch_blob_names('results', names)
+
+    assert len(batches) > 1
+    assert [name for batch in batches for name in batch.blob_names] == names
+    for batch in batches:
+        assert batch.version == QUEUE_MESSAGE_VERSION
+        assert len(json.dumps(batch.__dict__).encode('utf-8')) <= MAX_QUEUE_MESSAGE_BYTES
+    # Greedy packing: every batch but the last is too full for the first name of the next one
+    for batch, next_batch in zip(batches, batches[1:]):
+        fuller = BatchQueueMessage('results', batch.blob_names + next_batch.blob_names[:1])
+        assert len(json.dumps(fuller.__dict__).encode('utf-8')) > MAX_QUEUE_MESSAGE_BYTES
+
+def test_batch_blob_names_exact_limit_and_oversized_names():
+    overhead = len(json.dumps(BatchQueueMessage('results', []).__dict__).encode('utf-8'))
+    # Room for two quoted names and their separators
+    name = 'x' * 10
+    limit = overhead + 2 * (len(json.dumps(name)) + 2)
+    assert [batch.blob_names for batch in batch_blob_names('results', [name] * 3, limit)] == [[name, name], [name]]
+    assert batch_blob_names('results', []) == []
+
+    with pytest.raises(ValueError):
+        batch_blob_names('results', ['y' * 100], overhead + 50)
+
+def test_batch_mode_sends_v2_messages_for_uploaded_blobs(storage: FakeStorage, tmp_path: Path):
+    queue = FakeQueueClient()
+    uploader, _ = _new_uploader(queue, QUEUE_MODE_BATCH)
+    results = uploader.upload_files(_write_reports(tmp_path, ['a.json', 'b-fail.json', 'c.json']))
+
+    assert [(result.uploaded, result.queued) for result in results] == [(True, True), (False, False), (True, True)]
+    assert queue.messages == [{'version': QUEUE_MESSAGE_VERSION, 'container_name': 'results', 'blob_names': ['workitem-a.json', 'workitem-c.json']}]
+
+def test_batch_mode_marks_the_results_of_an_unsent_batch_as_failed(storage: FakeStorage, tmp_path: Path):
+    queue = FakeQueueClient(fail_on='blob_names')
+    uploader, _ = _new_uploader(queue, QUEUE_MODE_BATCH)
+    results = uploader.upload_files(_write_reports(tmp_path, ['a.json', 'b.json']))
+
+    assert all(result.uploaded and not result.queued and result.failed for result in results)
+
+def test_manifest_mode_queues_one_message_pointing_at_the_manifest(storage: FakeStorage, tmp_path: Path):
+    queue = FakeQueueClient()
+    uploader, container = _new_uploader(queue, QUEUE_MODE_MANIFEST)
+    results = uploader.upload_files(_write_reports(tmp_path, ['a.json', 'b.json']))
+
+    assert all(result.queued and not result.failed for result in results)
+    assert len(queue.messages) == 1
+    message = queue.messages[0]
+    assert (message['version'], message['container_name']) == (QUEUE_MESSAGE_VERSION, 'results')
+    manifest = json.loads(container.blobs[message['manifest_blob_name']])
+    assert manifest == {'version': QUEUE_MESSAGE_VERSION, 'container_name': 'results', 'blob_names': ['workitem-a.json', 'workitem-b.json']}
+
+def test_queue_mode_from_environment(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.delenv('PERFLAB_UPLOAD_QUEUE_MODE', raising=False)
+    assert get_queue_mode() == QUEUE_MODE_MESSAGE
+    monkeypatch.setenv('PERFLAB_UPLOAD_QUEUE_MODE', QUEUE_MODE_MANIFEST)
+    assert get_queue_mode() == QUEUE_MODE_MANIFEST
+    monkeypatch.setenv('PERFLAB_UPLOAD_QUEUE_MODE', 'unknown')
+    with pytest.raises(ValueError):
+        get_queue_mode()
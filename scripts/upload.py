@@ -1,7 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
 from random import randint
-from typing import Optional
+from threading import Lock
+from typing import Any, Optional
 import uuid
-from azure.storage.blob import BlobClient, ContentSettings
+from azure.storage.blob import BlobServiceClient, ContentSettings
 from azure.storage.queue import QueueClient, TextBase64EncodePolicy
 from azure.core.exceptions import ResourceExistsError, ClientAuthenticationError
 from azure.identity import DefaultAzureCredential, ClientAssertionCredential, CertificateCredential
@@ -14,6 +16,22 @@ import json
 
 from logging import getLogger
 
+# Queue notification modes. 'message' sends one (unversioned, v1) message per blob and is what existing
+# consumers expect. 'batch' packs the blob names of a run into as few v2 messages as fit in the queue
+# message size limit. 'manifest' writes a single v2 manifest blob listing every blob and queues one
+# v2 message pointing at it.
+QUEUE_MODE_MESSAGE = 'message'
+QUEUE_MODE_BATCH = 'batch'
+QUEUE_MODE_MANIFEST = 'manifest'
+QUEUE_MODES = [QUEUE_MODE_MESSAGE, QUEUE_MODE_BATCH, QUEUE_MODE_MANIFEST]
+
+# Version written to the batched/manifest messages, which have no 'blob_name'. Only enable the batch and manifest
+# modes for a queue once its ingestion consumer handles v2 messages; the default mode keeps sending v1 messages.
+QUEUE_MESSAGE_VERSION = 2
+
+# Queue messages are limited to 64 KiB after base64 encoding, which leaves 48 KiB for the JSON payload.
+MAX_QUEUE_MESSAGE_BYTES = 48 * 1024
+
 class QueueMessage:
     container_name: str
     blob_name: str
@@ -22,6 +40,56 @@ class QueueMessage:
         self.container_name = container
         self.blob_name = name
 
+class BatchQueueMessage:
+    '''A v2 queue message listing several blobs of the same container.'''
+    version: int
+    container_name: str
+    blob_names: list[str]
+
+    def __init__(self, container: str, names: list[str]):
+        self.version = QUEUE_MESSAGE_VERSION
+        self.container_name = container
+        self.blob_names = names
+
+class ManifestQueueMessage:
+    '''A v2 queue message pointing at a manifest blob whose content is a serialized BatchQueueMessage.'''
+    version: int
+    container_name: str
+    manifest_blob_name: str
+
+    def __init__(self, container: str, manifest_name: str):
+        self.version = QUEUE_MESSAGE_VERSION
+        self.container_name = container
+        self.manifest_blob_name = manifest_name
+
+def get_queue_mode() -> str:
+    '''Gets the queue notification mode from PERFLAB_UPLOAD_QUEUE_MODE, defaulting to one message per blob.'''
+    mode = os.getenv('PERFLAB_UPLOAD_QUEUE_MODE') or QUEUE_MODE_MESSAGE
+    if mode not in QUEUE_MODES:
+        raise ValueError("Unknown queue mode '{0}', expected one of {1}".format(mode, QUEUE_MODES))
+    return mode
+
+def batch_blob_names(container: str, names: list[str], max_bytes: int = MAX_QUEUE_MESSAGE_BYTES) -> list[BatchQueueMessage]:
+    '''Greedily packs blob names into as few BatchQueueMessages as possible without exceeding max_bytes each.'''
+    batches: list[BatchQueueMessage] = []
+    overhead = len(json.dumps(BatchQueueMessage(container, []).__dict__).encode('utf-8'))
+    current: list[str] = []
+    current_size = overhead
+    for name in names:
+        # quoted name plus the ', ' separator json.dumps writes between list items
+        name_size = len(json.dumps(name).encode('utf-8')) + 2
+        if overhead + name_size > max_bytes:
+            raise ValueError("Blob name '{0}' does not fit in a queue message".format(name))
+        if current and current_size + name_size > max_bytes:
+            batches.append(BatchQueueMessage(container, current))
+            current = []
+            current_size = overhead
+        current.append(name)
+        current_size += name_size
+    if current:
+        batches.append(BatchQueueMessage(container, current))
+    return batches
+
 def get_unique_name(filename: str, unique_id: str) -> str:
     newname = "{0}-{1}".format(unique_id, os.path.basename(filename))
     if len(newname) > 1024:
@@ -67,49 +135,192 @@ def get_credential():
 
     raise RuntimeError("Authentication failed with managed identity and certificates. No valid authentication method available.")
 
-def upload(globpath: str, container: str, queue: Optional[str], storage_account_uri: str):
+# Number of reports uploaded concurrently. Uploads are network bound so this is not tied to the core count.
+DEFAULT_UPLOAD_WORKERS = 8
+
+_cached_credential: Optional[Any] = None
+_credential_lock = Lock()
+
+def get_cached_credential() -> Any:
+    '''Returns a credential shared by every upload in this process, fetching it on first use.'''
+    global _cached_credential
+    with _credential_lock:
+        if _cached_credential is None:
+            _cached_credential = get_credential()
+        return _cached_credential
+
+class UploadResult:
+    '''Outcome of uploading (and optionally queueing) a single report file.'''
+    file: str
+    blob_name: str
+    uploaded: bool
+    queued: bool
+    error: Optional[str]
+
+    def __init__(self, file: str, blob_name: str):
+        self.file = file
+        self.blob_name = blob_name
+        self.uploaded = False
+        self.queued = False
+        self.error = None
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+class Uploader:
+    '''
+    Uploads report files to a blob container with a bounded pool of workers. The blob container and
+    queue clients (and therefore their connection pools) are created once and shared by all workers.
+    '''
+
+    def __init__(
+            self,
+            container: str,
+            queue: Optional[str],
+            storage_account_uri: str,
+            credential: Any,
+            max_workers: int = DEFAULT_UPLOAD_WORKERS,
+            queue_mode: str = QUEUE_MODE_MESSAGE):
+        if max_workers < 1:
+            raise ValueError('max_workers must be >= 1')
+        if queue_mode not in QUEUE_MODES:
+            raise ValueError("Unknown queue mode '{0}', expected one of {1}".format(queue_mode, QUEUE_MODES))
+        self.container = container
+        self.queue = queue
+        self.max_workers = max_workers
+        self.queue_mode = queue_mode
+        self.container_client = BlobServiceClient(account_url=storage_account_uri.format('blob'), credential=credential).get_container_client(container)
+        self.queue_client = None
+        if queue is not None:
+            self.queue_client = QueueClient(account_url=storage_account_uri.format('queue'), queue_name=queue, credential=credential, message_encode_policy=TextBase64EncodePolicy())
+
+    def upload_file(self, infile: str) -> UploadResult:
+        '''Uploads a single file and, if a queue is configured, sends its queue message.'''
+        blob_name = get_unique_name(infile, os.getenv('HELIX_WORKITEM_ID') or str(uuid.uuid4()))
+        result = UploadResult(infile, blob_name)
+
+        getLogger().info("uploading {}".format(infile))
+        blob_client = self.container_client.get_blob_client(blob_name)
+        with open(infile, "rb") as data:
+            try:
+                def _upload():
+                    data.seek(0)
+                    blob_client.upload_blob( # pyright: ignore[reportUnknownMemberType] -- type stub contains Unknown kwargs
+                        data,
+                        blob_type="BlockBlob",
+                        content_settings=ContentSettings(content_type="application/json"))
+
+                retry_on_exception(_upload, raise_exceptions=[ResourceExistsError])
+                result.uploaded = True
+            except Exception as ex:
+                result.error = '{0}: {1}'.format(type(ex), str(ex))
+                getLogger().error("upload failed: {}".format(infile))
+                getLogger().error(result.error)
+                return result
+
+        if self.queue_client is not None and self.queue_mode == QUEUE_MODE_MESSAGE:
+            queue_client = self.queue_client
+            try:
+                message = QueueMessage(self.container, blob_name)
+                retry_on_exception(lambda: queue_client.send_message(json.dumps(message.__dict__)))
+                result.queued = True
+                getLogger().info("upload and queue complete: {}".format(infile))
+            except Exception as ex:
+                result.error = '{0}: {1}'.format(type(ex), str(ex))
+                getLogger().error("queue failed: {}".format(infile))
+                getLogger().error(result.error)
+        else:
+            getLogger().info("upload complete: {}".format(infile))
+
+        return result
+
+    def send_batched_notifications(self, results: list[UploadResult]) -> None:
+        '''
+        Sends the v2 batch or manifest notifications for every successfully uploaded blob.
+        Results covered by a notification that could not be sent are marked as failed.
+        '''
+        if self.queue_client is None or self.queue_mode == QUEUE_MODE_MESSAGE:
+            return
+        queue_client = self.queue_client
+        uploaded = [result for result in results if result.uploaded]
+        if not uploaded:
+            return
+
+        def _mark(batch: list[UploadResult], error: Optional[str]):
+            for result in batch:
+                if error is None:
+                    result.queued = True
+                else:
+                    result.error = error
+
+        if self.queue_mode == QUEUE_MODE_MANIFEST:
+            manifest = BatchQueueMessage(self.container, [result.blob_name for result in uploaded])
+            manifest_name = get_unique_name("manifest.json", os.getenv('HELIX_WORKITEM_ID') or str(uuid.uuid4()))
+            manifest_client = self.container_client.get_blob_client(manifest_name)
+            try:
+                retry_on_exception(lambda: manifest_client.upload_blob( # pyright: ignore[reportUnknownMemberType] -- type stub contains Unknown kwargs
+                    json.dumps(manifest.__dict__),
+                    blob_type="BlockBlob",
+                    content_settings=ContentSettings(content_type="application/json")), raise_exceptions=[ResourceExistsError])
+                message = ManifestQueueMessage(self.container, manifest_name)
+                retry_on_exception(lambda: queue_client.send_message(json.dumps(message.__dict__)))
+                getLogger().info("queued manifest {0} for {1} blobs".format(manifest_name, len(uploaded)))
+                _mark(uploaded, None)
+            except Exception as ex:
+                getLogger().error("manifest queue failed")
+                _mark(uploaded, '{0}: {1}'.format(type(ex), str(ex)))
+            return
+
+        by_name = {result.blob_name: result for result in uploaded}
+        for batch in batch_blob_names(self.container, list(by_name)):
+            batch_results = [by_name[name] for name in batch.blob_names]
+            try:
+                retry_on_exception(lambda: queue_client.send_message(json.dumps(batch.__dict__)))
+                getLogger().info("queued batch of {0} blobs".format(len(batch.blob_names)))
+                _mark(batch_results, None)
+            except Exception as ex:
+                getLogger().error("batch queue failed")
+                _mark(batch_results, '{0}: {1}'.format(type(ex), str(ex)))
+
+    def upload_files(self, files: list[str]) -> list[UploadResult]:
+        '''Uploads all files concurrently. Results are returned in the same order as the input files.'''
+        if not files:
+            return []
+        workers = min(self.max_workers, len(files))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(self.upload_file, files))
+        self.send_batched_notifications(results)
+        return results
+
+def upload(
+        globpath: str,
+        container: str,
+        queue: Optional[str],
+        storage_account_uri: str,
+        max_workers: int = DEFAULT_UPLOAD_WORKERS,
+        credential: Optional[Any] = None,
+        queue_mode: Optional[str] = None):
+    '''
+    Uploads every file matching globpath to the container and notifies the queue, if one is given.
+    A credential can be passed in (e.g. an account key for a local Azurite emulator); otherwise the
+    process-wide credential is used. When queue_mode is not given it is read from PERFLAB_UPLOAD_QUEUE_MODE.
+    '''
     try:
-        credential = get_credential()
+        if queue_mode is None:
+            queue_mode = get_queue_mode()
+        if credential is None:
+            credential = get_cached_credential()
         files = glob(globpath, recursive=True)
-        any_upload_or_queue_failed = False
-        for infile in files:
-            blob_name = get_unique_name(infile, os.getenv('HELIX_WORKITEM_ID') or str(uuid.uuid4()))
-
-            getLogger().info("uploading {}".format(infile))
-
-            blob_client = BlobClient(account_url=storage_account_uri.format('blob'), container_name=container, blob_name=blob_name, credential=credential)
-            
-            upload_succeded = False
-            with open(infile, "rb") as data:
-                try:
-                    def _upload():
-                        blob_client.upload_blob( # pyright: ignore[reportUnknownMemberType] -- type stub contains Unknown kwargs
-                            data, 
-                            blob_type="BlockBlob", 
-                            content_settings=ContentSettings(content_type="application/json"))
-
-                    retry_on_exception(_upload, raise_exceptions=[ResourceExistsError])
-                    upload_succeded = True
-                except Exception as ex:
-                    any_upload_or_queue_failed = True
-                    getLogger().error("upload failed")
-                    getLogger().error('{0}: {1}'.format(type(ex), str(ex)))
-
-            if upload_succeded:
-                if queue is not None:
-                    try:
-                        queue_client = QueueClient(account_url=storage_account_uri.format('queue'), queue_name=queue, credential=credential, message_encode_policy=TextBase64EncodePolicy())
-                        message = QueueMessage(container, blob_name)
-                        retry_on_exception(lambda: queue_client.send_message(json.dumps(message.__dict__)))
-                        getLogger().info("upload and queue complete")
-                    except Exception as ex:
-                        any_upload_or_queue_failed = True
-                        getLogger().error("queue failed")
-                        getLogger().error('{0}: {1}'.format(type(ex), str(ex)))
-                else:
-                    getLogger().info("upload complete")
+        uploader = Uploader(container, queue, storage_account_uri, credential, max_workers, queue_mode)
+        results = uploader.upload_files(files)
+
+        failures = [result for result in results if result.failed]
+        getLogger().info("Uploaded {0} of {1} files".format(len(results) - len(failures), len(results)))
+        for result in failures:
+            getLogger().error("Failed to upload or queue {0}: {1}".format(result.file, result.error))
 
-        return any_upload_or_queue_failed # 0 (False) if all uploads and queues succeeded, 1 (True) otherwise
+        return len(failures) > 0 # 0 (False) if all uploads and queues succeeded, 1 (True) otherwise
 
     except Exception as ex:
         getLogger().error('{0}: {1}'.format(type(ex), str(ex)))
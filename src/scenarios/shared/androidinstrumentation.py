@@ -5,11 +5,11 @@ import sys
 import os
 import json
 from logging import getLogger
-from shutil import copytree
 from performance.common import runninginlab, RunCommand
 from performance.constants import UPLOAD_CONTAINER, UPLOAD_STORAGE_URI, UPLOAD_QUEUE
 from shared.util import helixuploaddir, xharnesscommand, xharness_adb
 from shared.const import TRACEDIR
+from shared.tracesync import synctraces
 from subprocess import CalledProcessError
 
 class AndroidInstrumentationHelper(object):
@@ -195,7 +195,7 @@ class AndroidInstrumentationHelper(object):
 
         helix_upload_dir = helixuploaddir()
         if runninginlab() and helix_upload_dir is not None:
-            copytree(TRACEDIR, os.path.join(helix_upload_dir, 'traces'))
+            synctraces(TRACEDIR, os.path.join(helix_upload_dir, 'traces'))
             if upload_to_perflab_container:
                 import upload
                 globpath = os.path.join(
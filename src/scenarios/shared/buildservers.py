@@ -0,0 +1,83 @@
+'''
+Tracking of the build server processes (MSBuild nodes and the Roslyn compiler server) across
+the iterations of the SDK scenarios.
+'''
+import json
+import os
+import re
+from logging import getLogger
+from typing import Any, Optional
+from performance.common import RunCommand, iswin
+
+MSBUILD_NODE = 'msbuild node'
+COMPILER_SERVER = 'compiler server'
+
+def getbuildserverkind(commandline: str) -> Optional[str]:
+    '''The kind of build server a process command line belongs to, None for other processes.'''
+    if re.search(r'vbcscompiler\.(dll|exe)\b', commandline, re.IGNORECASE):
+        return COMPILER_SERVER
+    if re.search(r'msbuild\.(dll|exe)\b', commandline, re.IGNORECASE) and re.search(r'[/-]nodemode:\d', commandline, re.IGNORECASE):
+        return MSBUILD_NODE
+    return None
+
+def _getprocesses() -> list[tuple[int, str]]:
+    '''(pid, command line) of the running processes.'''
+    if iswin():
+        command = ['powershell', '-NoProfile', '-Command',
+                   "Get-CimInstance Win32_Process | ForEach-Object { '{0} {1}' -f $_.ProcessId, $_.CommandLine }"]
+    else:
+        command = ['ps', '-A', '-o', 'pid=', '-o', 'args=']
+    output = RunCommand(command, verbose=True, echo=False).run_and_get_stdout()
+    processes: list[tuple[int, str]] = []
+    for line in output.splitlines():
+        pid, _, commandline = line.strip().partition(' ')
+        if pid.isdigit():
+            processes.append((int(pid), commandline))
+    return processes
+
+def getbuildservers() -> dict[int, str]:
+    '''The running build servers, kind by pid.'''
+    servers: dict[int, str] = {}
+    for pid, commandline in _getprocesses():
+        kind = getbuildserverkind(commandline)
+        if kind is not None and pid != os.getpid():
+            servers[pid] = kind
+    return servers
+
+def recordbuildservers(path: str) -> dict[str, Any]:
+    '''
+    Appends the running build servers to the records of path and returns the new record.
+    A build between two records reused the build servers when every server of the first
+    record is still running at the second.
+    '''
+    records: list[dict[str, Any]] = []
+    if os.path.isfile(path):
+        with open(path, encoding='utf-8') as f:
+            records = json.load(f)
+    servers = getbuildservers()
+    record: dict[str, Any] = {'servers': {str(pid): kind for pid, kind in sorted(servers.items())}}
+    if records:
+        previous = records[-1]['servers']
+        record['reused'] = bool(previous) and all(pid in record['servers'] for pid in previous)
+        record['started'] = sorted(int(pid) for pid in record['servers'] if pid not in previous)
+    records.append(record)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, indent=2)
+    getLogger().info("Build servers running: %s" % (', '.join('%s (%s)' % (pid, kind) for pid, kind in record['servers'].items()) or 'none'))
+    return record
+
+def checkbuildserverreuse(path: str) -> bool:
+    '''
+    Logs how many of the builds recorded in path reused the build servers and returns whether
+    all of them did. The first build (the warmup) starts the servers and is not counted.
+    '''
+    with open(path, encoding='utf-8') as f:
+        records: list[dict[str, Any]] = json.load(f)
+    builds = records[2:]
+    reused = [record for record in builds if record.get('reused')]
+    getLogger().info("%d of %d measured builds reused the build servers" % (len(reused), len(builds)))
+    for index, record in enumerate(builds, 1):
+        if not record.get('reused'):
+            getLogger().warning("Build %d did not reuse the build servers, it started %s" % (index, record.get('started') or 'none and the servers exited'))
+    return len(reused) == len(builds)
@@ -45,6 +45,12 @@ CLEAN_BUILD = 'clean_build'
 BUILD_NO_CHANGE = 'build_no_change'
 NEW_CONSOLE = 'new_console'
 
+# State of the build servers (MSBuild nodes, compiler server) at the start of every build iteration
+BUILD_SERVERS_COLD = 'cold'
+BUILD_SERVERS_WARM = 'warm'
+BUILD_SERVER_STATES = [BUILD_SERVERS_COLD, BUILD_SERVERS_WARM]
+BUILD_SERVERS_FILE = os.path.join(TRACEDIR, 'build-servers.json')
+
 CROSSGEN2_SINGLEFILE = 'Single'
 CROSSGEN2_COMPOSITE = 'Composite'
 
@@ -7,7 +7,6 @@ import sys
 import os
 import json
 from logging import getLogger
-from shutil import copytree
 import time
 from performance.common import extension, helixpayload, runninginlab, get_artifacts_directory, get_packages_directory, RunCommand
 from performance.constants import UPLOAD_CONTAINER, UPLOAD_STORAGE_URI, UPLOAD_QUEUE
@@ -17,6 +16,7 @@ from shared.androidhelper import AndroidHelper
 from shared.util import helixworkitempayload, helixuploaddir, getruntimeidentifier, xharness_adb
 from shared.const import *
 from shared.testtraits import TestTraits
+from shared.tracesync import synctraces
 from subprocess import CalledProcessError
 
 class DevicePowerConsumptionHelper(object):
@@ -90,7 +90,7 @@ class DevicePowerConsumptionHelper(object):
 
         helix_upload_dir = helixuploaddir()
         if runninginlab() and helix_upload_dir is not None:
-            copytree(TRACEDIR, os.path.join(helix_upload_dir, 'traces'))
+            synctraces(TRACEDIR, os.path.join(helix_upload_dir, 'traces'))
             if traits.upload_to_perflab_container:
                 import upload
                 upload_code = upload.upload(self.reportjson, upload_container, UPLOAD_QUEUE, UPLOAD_STORAGE_URI)
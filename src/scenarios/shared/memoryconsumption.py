@@ -4,13 +4,13 @@ Wrapper around memoryconsumption tool.
 import sys
 import os
 from logging import getLogger
-from shutil import copytree
 from performance.common import extension, helixpayload, runninginlab, get_artifacts_directory, get_packages_directory, RunCommand
 from performance.constants import UPLOAD_CONTAINER, UPLOAD_STORAGE_URI, UPLOAD_QUEUE
 from dotnet import CSharpProject, CSharpProjFile
 from shared.util import helixworkitempayload, helixuploaddir, getruntimeidentifier
 from shared.const import *
 from shared.testtraits import TestTraits
+from shared.tracesync import synctraces
 from subprocess import CalledProcessError
 class MemoryConsumptionWrapper(object):
     '''
@@ -83,7 +83,7 @@ class MemoryConsumptionWrapper(object):
 
         helix_upload_dir = helixuploaddir()
         if runninginlab() and helix_upload_dir is not None:
-            copytree(TRACEDIR, os.path.join(helix_upload_dir, 'traces'))
+            synctraces(TRACEDIR, os.path.join(helix_upload_dir, 'traces'))
             if traits.upload_to_perflab_container:
                 import upload
                 upload_code = upload.upload(self.reportjson, upload_container, UPLOAD_QUEUE, UPLOAD_STORAGE_URI)
@@ -159,7 +159,7 @@ class MemoryConsumptionWrapper(object):
 
         helix_upload_dir = helixuploaddir()
         if runninginlab() and helix_upload_dir is not None:
-            copytree(TRACEDIR, os.path.join(helix_upload_dir, 'traces'))
+            synctraces(TRACEDIR, os.path.join(helix_upload_dir, 'traces'))
             if traits.upload_to_perflab_container:
                 import upload
                 upload_code = upload.upload(self.reportjson, upload_container, UPLOAD_QUEUE, UPLOAD_STORAGE_URI)
@@ -0,0 +1,93 @@
+'''
+Snapshot and restore of the project directory between SDK iterations.
+'''
+import os
+import shutil
+from logging import getLogger
+from performance.artifact_store import reflink
+
+class ProjectSnapshot(object):
+    '''
+    Keeps a clean copy of a project directory and restores it before every build iteration.
+
+    Files are cloned with reflinks (copy-on-write) where the file system supports them and
+    copied otherwise. Hardlinks are not used, as builds and inner loop edits modify files in
+    place and would modify the snapshot too. A restore only touches what the previous iteration
+    changed: files that differ from the snapshot in size or modification time are cloned again,
+    files and directories that are not in the snapshot are removed, and missing ones are
+    cloned back.
+    '''
+    def __init__(self, snapshotdir: str):
+        self.snapshotdir = snapshotdir
+        self.usereflinks = True
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.snapshotdir)
+
+    def _clone(self, source: str, target: str) -> None:
+        if self.usereflinks:
+            try:
+                reflink(source, target)
+                shutil.copystat(source, target)
+                return
+            except OSError:
+                self.usereflinks = False
+        shutil.copy2(source, target)
+
+    def take(self, projectdir: str):
+        '''Snapshots projectdir.'''
+        shutil.copytree(projectdir, self.snapshotdir, copy_function=self._clone)
+
+    def _getentries(self) -> tuple[dict[str, tuple[int, int]], set[str]]:
+        '''(size, modification time) of every file of the snapshot and its directories, by relative path.'''
+        files: dict[str, tuple[int, int]] = {}
+        directories: set[str] = set()
+        for dirpath, dirnames, filenames in os.walk(self.snapshotdir):
+            for dirname in dirnames:
+                directories.add(os.path.relpath(os.path.join(dirpath, dirname), self.snapshotdir))
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                status = os.stat(path)
+                files[os.path.relpath(path, self.snapshotdir)] = (status.st_size, status.st_mtime_ns)
+        return files, directories
+
+    def restore(self, projectdir: str) -> int:
+        '''Makes projectdir identical to the snapshot again. Returns how many files were restored or removed.'''
+        if not os.path.isdir(projectdir):
+            shutil.copytree(self.snapshotdir, projectdir, copy_function=self._clone)
+            return len(self._getentries()[0])
+
+        files, directories = self._getentries()
+        changed = 0
+        for dirpath, dirnames, filenames in os.walk(projectdir):
+            for dirname in list(dirnames):
+                relpath = os.path.relpath(os.path.join(dirpath, dirname), projectdir)
+                path = os.path.join(dirpath, dirname)
+                # The snapshot has no symlinks, copytree copied what they pointed to
+                if relpath not in directories or os.path.islink(path):
+                    if os.path.islink(path):
+                        os.remove(path)
+                    else:
+                        shutil.rmtree(path)
+                    dirnames.remove(dirname)
+                    changed += 1
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                relpath = os.path.relpath(path, projectdir)
+                status = os.lstat(path)
+                if files.get(relpath) == (status.st_size, status.st_mtime_ns) and not os.path.islink(path):
+                    continue
+                os.remove(path)
+                changed += 1
+                if relpath in files:
+                    self._clone(os.path.join(self.snapshotdir, relpath), path)
+
+        for relpath in directories:
+            os.makedirs(os.path.join(projectdir, relpath), exist_ok=True)
+        for relpath in files:
+            path = os.path.join(projectdir, relpath)
+            if not os.path.lexists(path):
+                self._clone(os.path.join(self.snapshotdir, relpath), path)
+                changed += 1
+        getLogger().info("Restored %d changed files of %s from %s" % (changed, projectdir, self.snapshotdir))
+        return changed
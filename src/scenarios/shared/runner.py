@@ -21,12 +21,15 @@ from shared.androidinstrumentation import AndroidInstrumentationHelper
 from shared.devicepowerconsumption import DevicePowerConsumptionHelper
 from shared.crossgen import CrossgenArguments
 from shared.startup import StartupWrapper
+from shared.buildservers import recordbuildservers, checkbuildserverreuse
+from shared.tracesync import synctraces
 from shared.memoryconsumption import MemoryConsumptionWrapper
-from shared.util import publishedexe, pythoncommand, appfolder, xharnesscommand, xharness_adb, publisheddll
+from shared.util import publishedexe, pythoncommand, appfolder, xharnesscommand, xharness_adb, publisheddll, helixuploaddir
 from shared.sod import SODWrapper
 from shared import const
-from performance.common import RunCommand, iswin, extension, helixworkitemroot, helixuploadroot
+from performance.common import RunCommand, iswin, extension, helixworkitemroot, helixuploadroot, runninginlab
 from performance.logger import setup_loggers
+from performance.resource_usage import is_resource_accounting_enabled, write_resource_usage_summary
 from shared.testtraits import TestTraits, testtypes
 from shared.versionmanager import versions_write_json, versions_read_json_file_save_env, get_sdk_versions
 from subprocess import CalledProcessError
@@ -49,6 +52,7 @@ class Runner:
         self.affinity = None
         self.upload_to_perflab_container = False
         self.binlogpath = None
+        self.buildserverstate: Optional[str] = None
         setup_loggers(True)
 
     def parseargs(self):
@@ -113,12 +117,14 @@ class Runner:
         innerloopparser = subparsers.add_parser(const.INNERLOOP,
                                               description='measure time to main and difference between two runs in a row')
         self.add_affinity_argument(innerloopparser)
+        self.add_build_server_argument(innerloopparser)
         self.add_common_arguments(innerloopparser)
 
         # inner loop msbuild command
         innerloopparser = subparsers.add_parser(const.INNERLOOPMSBUILD,
                                               description='measure time to main and difference between two runs in a row')
         self.add_affinity_argument(innerloopparser)
+        self.add_build_server_argument(innerloopparser)
         self.add_common_arguments(innerloopparser)
 
         # dotnet watch command
@@ -142,6 +148,7 @@ new_console:     measure duration of creating a new console template
 '''
                                )
         self.add_affinity_argument(sdkparser)
+        self.add_build_server_argument(sdkparser)
         self.add_common_arguments(sdkparser)
 
         crossgenparser = subparsers.add_parser(const.CROSSGEN,
@@ -259,6 +266,12 @@ ex: C:\repos\performance;C:\repos\runtime
         if args.scenarioname:
             self.scenarioname = args.scenarioname
 
+        if self.testtype in [const.INNERLOOP, const.INNERLOOPMSBUILD, const.SDK]:
+            self.buildserverstate = args.buildserverstate
+            if self.buildserverstate == const.BUILD_SERVERS_WARM and self.scenarioname:
+                # Warm builds are a different measurement, keep them apart from the cold results
+                self.scenarioname = '%s (warm build servers)' % self.scenarioname
+
         self.upload_to_perflab_container = args.upload_to_perflab_container
 
         if self.testtype in [const.STARTUP, const.INNERLOOP, const.INNERLOOPMSBUILD, const.DOTNETWATCH, const.SDK, const.CROSSGEN, const.CROSSGEN2] and (args.affinity or os.environ.get('PERFLAB_DATA_AFFINITY')): # Set affinity if doing a Startup based test
@@ -276,6 +289,14 @@ ex: C:\repos\performance;C:\repos\runtime
             help="Causes results files to be uploaded to perf container",
             action='store_true')
         
+    def add_build_server_argument(self, parser: ArgumentParser):
+        "Build server arguments to add to the subparsers of the build scenarios"
+        parser.add_argument('--build-server-state',
+                            dest='buildserverstate',
+                            choices=const.BUILD_SERVER_STATES,
+                            type=str.lower,
+                            help='State of the MSBuild nodes and the compiler server at the start of every iteration. cold: shut down before every iteration. warm: left running from the previous iteration (the warmup iteration starts them), their reuse is checked. The results are tagged with the state. By default the servers are shut down before the iterations that set up the project, and build_no_change leaves them running.')
+
     def add_affinity_argument(self, parser: ArgumentParser):
         "Affinity arguments to add to subparsers"
         parser.add_argument('--affinity',
@@ -287,6 +308,40 @@ ex: C:\repos\performance;C:\repos\runtime
         '''
         Runs the specified scenario
         '''
+        try:
+            self.__run()
+        finally:
+            if is_resource_accounting_enabled():
+                write_resource_usage_summary(os.path.join(helixuploadroot() or const.TRACEDIR, 'resource-usage.json'))
+
+    def buildserverargs(self) -> str:
+        '''Arguments passing the requested build server state to the iteration setup.'''
+        return ' --build-server-state %s' % self.buildserverstate if self.buildserverstate else ''
+
+    def runbuildtests(self, startup: StartupWrapper):
+        '''
+        Runs a build scenario. When a build server state is requested, the results are tagged
+        with it, and in the warm state the build servers running before every iteration are
+        recorded to check that every measured build reused the servers of the previous one.
+        '''
+        if self.buildserverstate:
+            # Reporter adds PERFLAB_DATA_* variables to the additional data of the build
+            os.environ['PERFLAB_DATA_BUILDSERVERSTATE'] = self.buildserverstate
+        if self.buildserverstate == const.BUILD_SERVERS_WARM and os.path.exists(const.BUILD_SERVERS_FILE):
+            os.remove(const.BUILD_SERVERS_FILE)
+
+        startup.runtests(self.traits)
+
+        if self.buildserverstate == const.BUILD_SERVERS_WARM:
+            # The servers left by the last measured build
+            recordbuildservers(const.BUILD_SERVERS_FILE)
+            if not checkbuildserverreuse(const.BUILD_SERVERS_FILE):
+                getLogger().warning("Not every measured build reused the build servers, see %s" % const.BUILD_SERVERS_FILE)
+            helix_upload_dir = helixuploaddir()
+            if runninginlab() and helix_upload_dir is not None:
+                synctraces(const.TRACEDIR, os.path.join(helix_upload_dir, 'traces'))
+
+    def __run(self):
         self.parseargs()
 
         python_command = pythoncommand().split(' ')
@@ -301,11 +356,11 @@ ex: C:\repos\performance;C:\repos\runtime
             apptorun='dotnet', appargs='run --project %s' % appfolder(self.traits.exename, self.traits.projext),
             innerloopcommand=python_exe,
             iterationsetup=python_exe,
-            setupargs='%s %s setup_build' % (python_args, const.ITERATION_SETUP_FILE),
+            setupargs='%s %s setup_build%s' % (python_args, const.ITERATION_SETUP_FILE, self.buildserverargs()),
             iterationcleanup=python_exe,
             cleanupargs='%s %s cleanup' % (python_args, const.ITERATION_SETUP_FILE),
             affinity=self.affinity)
-            startup.runtests(self.traits)
+            self.runbuildtests(startup)
 
         if self.testtype == const.INNERLOOPMSBUILD:
             startup = StartupWrapper()
@@ -314,11 +369,11 @@ ex: C:\repos\performance;C:\repos\runtime
             apptorun='dotnet', appargs='run --project %s' % appfolder(self.traits.exename, self.traits.projext),
             innerloopcommand=python_exe,
             iterationsetup=python_exe,
-            setupargs='%s %s setup_build' % (python_args, const.ITERATION_SETUP_FILE),
+            setupargs='%s %s setup_build%s' % (python_args, const.ITERATION_SETUP_FILE, self.buildserverargs()),
             iterationcleanup=python_exe,
             cleanupargs='%s %s cleanup' % (python_args, const.ITERATION_SETUP_FILE),
             affinity=self.affinity)
-            startup.runtests(self.traits)
+            self.runbuildtests(startup)
             
         if self.testtype == const.DOTNETWATCH:
             startup = StartupWrapper()
@@ -353,6 +408,10 @@ ex: C:\repos\performance;C:\repos\runtime
             startup = StartupWrapper()
             envlistbuild = 'DOTNET_MULTILEVEL_LOOKUP=0'
             envlistcleanbuild = ';'.join(['MSBUILDDISABLENODEREUSE=1', envlistbuild])
+            if self.buildserverstate == const.BUILD_SERVERS_WARM:
+                envlistcleanbuild = envlistbuild
+            elif self.buildserverstate == const.BUILD_SERVERS_COLD:
+                envlistbuild = envlistcleanbuild
             # clean build
             if self.sdktype == const.CLEAN_BUILD:
                 self.traits.add_traits(
@@ -362,14 +421,14 @@ ex: C:\repos\performance;C:\repos\runtime
                     apptorun=const.DOTNET,
                     appargs='build',
                     iterationsetup=python_exe,
-                    setupargs='%s %s setup_build' % (python_args, const.ITERATION_SETUP_FILE),
+                    setupargs='%s %s setup_build%s' % (python_args, const.ITERATION_SETUP_FILE, self.buildserverargs()),
                     iterationcleanup=python_exe,
                     cleanupargs='%s %s cleanup' % (python_args, const.ITERATION_SETUP_FILE),
                     workingdir=const.APPDIR,
                     environmentvariables=envlistcleanbuild,
                 )
                 self.traits.add_traits(overwrite=True, startupmetric=const.STARTUP_PROCESSTIME)
-                startup.runtests(self.traits)
+                self.runbuildtests(startup)
 
             # build(no changes)
             if self.sdktype == const.BUILD_NO_CHANGE:
@@ -382,8 +441,14 @@ ex: C:\repos\performance;C:\repos\runtime
                     workingdir=const.APPDIR,
                     environmentvariables=envlistbuild
                 )
+                if self.buildserverstate:
+                    self.traits.add_traits(
+                        overwrite=False,
+                        iterationsetup=python_exe,
+                        setupargs='%s %s build_servers%s' % (python_args, const.ITERATION_SETUP_FILE, self.buildserverargs()),
+                    )
                 self.traits.add_traits(overwrite=True, startupmetric=const.STARTUP_PROCESSTIME)
-                startup.runtests(self.traits)
+                self.runbuildtests(startup)
 
             # new console
             if self.sdktype == const.NEW_CONSOLE:
@@ -1022,7 +1087,6 @@ ex: C:\repos\performance;C:\repos\runtime
         elif self.testtype == const.ANDROIDINNERLOOP:
             import hashlib
             import subprocess
-            from shutil import copytree
             from performance.common import runninginlab
             from performance.constants import UPLOAD_CONTAINER, UPLOAD_STORAGE_URI, UPLOAD_QUEUE
             from shared.util import helixuploaddir
@@ -1056,15 +1120,15 @@ ex: C:\repos\performance;C:\repos\runtime
                 getLogger().info("Merged report written to: %s" % final_report_path)
 
             def run_incremental_iteration(iteration, num_iterations, base_cmd, edit_pairs,
-                                          packagename, activityname,
-                                          scenarioprefix, startup, traits, measure_startup_fn,
+                                          packagename, activityname, measure_startup_fn,
                                           pre_launch_fn=None):
                 """Run one incremental build+deploy+startup iteration.
 
                 edit_pairs is a list of (dest_path, original_content, modified_content) tuples.
                 pre_launch_fn, if provided, is called before each dotnet run (e.g. to clear
                 the logcat buffer so stale 'Displayed' lines don't pollute the measurement).
-                Returns (startup_ms, counters_list, binlog_path, test_metadata).
+                The binlog is parsed later, together with the binlogs of the other iterations.
+                Returns (startup_ms, binlog_path).
                 """
                 import subprocess
 
@@ -1097,35 +1161,7 @@ ex: C:\repos\performance;C:\repos\runtime
                 ms = measure_startup_fn(packagename, activityname)
                 getLogger().info("Incremental iteration %d/%d: build+deploy done, startup: %d ms" % (iteration, num_iterations, ms))
 
-                # Parse this iteration's binlog → temp build report
-                iter_report_name = 'incremental-build-report-%d.json' % iteration
-                iter_report = os.path.join(const.TRACEDIR, iter_report_name)
-                startup.reportjson = iter_report
-                traits.add_traits(overwrite=True, apptorun="app", startupmetric=const.ANDROIDINNERLOOP,
-                                  tracename=iter_binlog_name,
-                                  scenarioname=scenarioprefix + " - Incremental Build and Deploy",
-                                  upload_to_perflab_container=False)
-                startup.parsetraces(traits, copy_traces=False)
-
-                # Extract build counters and test metadata from temp report
-                with open(iter_report, 'r') as f:
-                    iter_data = json.load(f)
-                test_obj = iter_data["tests"][0]
-                counters = test_obj["counters"]
-                # Capture top-level metadata (build, os, run, inLab) so the
-                # final aggregated report has the same shape as the first
-                # report — PerfLab needs these to classify the upload.
-                test_metadata = {
-                    "test": {**test_obj, "counters": []},
-                    "top_level": {k: v for k, v in iter_data.items() if k != "tests"},
-                }
-
-                # Clean up temp report (leave binlog for later cleanup)
-                if os.path.exists(iter_report):
-                    os.remove(iter_report)
-                    getLogger().info("Removed temp report: %s" % iter_report)
-
-                return ms, counters, iter_binlog, test_metadata
+                return ms, iter_binlog
 
             scenarioprefix = self.scenarioname or "MAUI Android Build and Deploy"
 
@@ -1237,16 +1273,36 @@ ex: C:\repos\performance;C:\repos\runtime
                     androidHelper.clear_logcat()
 
                 for iteration in range(1, num_iterations + 1):
-                    ms, counters, iter_binlog, test_metadata = run_incremental_iteration(
+                    ms, iter_binlog = run_incremental_iteration(
                         iteration, num_iterations, base_cmd,
                         edit_pairs,
-                        self.packagename, activityname, scenarioprefix, startup, self.traits,
+                        self.packagename, activityname,
                         androidHelper.measure_startup_from_logcat,
                         pre_launch_fn=pre_iteration)
 
                     incremental_startup_results.append(ms)
                     intermediate_files.append(iter_binlog)
 
+                # Parse the binlogs of every iteration in a single Startup invocation
+                startup.reportjson = os.path.join(const.TRACEDIR, 'incremental-build-reports.json')
+                self.traits.add_traits(overwrite=True, apptorun="app", startupmetric=const.ANDROIDINNERLOOP,
+                                       scenarioname=scenarioprefix + " - Incremental Build and Deploy",
+                                       upload_to_perflab_container=False)
+                iteration_reports = startup.parsetracebatch(self.traits, [os.path.basename(binlog) for binlog in intermediate_files]) if intermediate_files else {}
+
+                for iter_binlog in intermediate_files:
+                    # Extract build counters and test metadata from the iteration report
+                    iter_data = iteration_reports[os.path.basename(iter_binlog)]
+                    test_obj = iter_data["tests"][0]
+                    counters = test_obj["counters"]
+                    # Capture top-level metadata (build, os, run, inLab) so the
+                    # final aggregated report has the same shape as the first
+                    # report — PerfLab needs these to classify the upload.
+                    test_metadata = {
+                        "test": {**test_obj, "counters": []},
+                        "top_level": {k: v for k, v in iter_data.items() if k != "tests"},
+                    }
+
                     if report_template is None:
                         report_template = test_metadata
 
@@ -1294,7 +1350,7 @@ ex: C:\repos\performance;C:\repos\runtime
                         os.remove(f_path)
                         getLogger().info("Removed intermediate: %s" % f_path)
 
-                # Wipe helix upload traces dir so copytree below repopulates it cleanly.
+                # Wipe helix upload traces dir so the sync below repopulates it cleanly.
                 helix_upload_dir = helixuploaddir()
                 if runninginlab() and helix_upload_dir is not None:
                     traces_upload = os.path.join(helix_upload_dir, 'traces')
@@ -1304,7 +1360,7 @@ ex: C:\repos\performance;C:\repos\runtime
                 self.traits.add_traits(overwrite=True, upload_to_perflab_container=saved_upload)
                 helix_upload_dir = helixuploaddir()
                 if runninginlab() and helix_upload_dir is not None:
-                    copytree(const.TRACEDIR, os.path.join(helix_upload_dir, 'traces'), dirs_exist_ok=True)
+                    synctraces(const.TRACEDIR, os.path.join(helix_upload_dir, 'traces'))
                     if self.traits.upload_to_perflab_container:
                         for report_path in [first_e2e_report, incremental_e2e_report]:
                             upload_code = upload.upload(report_path, UPLOAD_CONTAINER, UPLOAD_QUEUE, UPLOAD_STORAGE_URI)
@@ -1,6 +1,8 @@
 import os
 import shutil
 from shared import const, util
+from shared.projectsnapshot import ProjectSnapshot
+from shared.buildservers import recordbuildservers
 from dotnet import shutdown_server
 from performance.common import iswin
 from performance.logger import setup_loggers
@@ -11,27 +13,34 @@ from argparse import ArgumentParser
 SETUP_BUILD = 'setup_build'
 SETUP_NEW = 'setup_new'
 CLEANUP = 'cleanup'
-operations = (SETUP_BUILD, SETUP_NEW, CLEANUP)
+BUILD_SERVERS = 'build_servers'
+operations = (SETUP_BUILD, SETUP_NEW, CLEANUP, BUILD_SERVERS)
 
 def main():
     parser = ArgumentParser()
     parser.add_argument('operation', choices=operations)
+    parser.add_argument('--build-server-state', dest='buildserverstate', choices=const.BUILD_SERVER_STATES, default=const.BUILD_SERVERS_COLD,
+                        help='warm: keep the build servers of the previous iteration alive and record them, cold: shut them down')
     args = parser.parse_args()
 
     setup_loggers(True)
 
+    if args.operation in (SETUP_BUILD, BUILD_SERVERS):
+        if args.buildserverstate == const.BUILD_SERVERS_WARM:
+            recordbuildservers(const.BUILD_SERVERS_FILE)
+        else:
+            shutdown_dotnet_servers()
+
     if args.operation == SETUP_BUILD:
-        shutdown_dotnet_servers()
-        if not os.path.isdir(const.TMPDIR):
+        snapshot = ProjectSnapshot(const.TMPDIR)
+        if not snapshot.exists():
             if not os.path.isdir(const.APPDIR):
                 raise Exception("\'app\' folder should exist. Please run pre.py.")
             getLogger().info("Backing up project directory...")
-            shutil.copytree(const.APPDIR, const.TMPDIR) # backup from app to tmp
+            snapshot.take(const.APPDIR) # backup from app to tmp
         else:
-            if os.path.isdir(const.APPDIR):
-                shutil.rmtree(const.APPDIR)
-            getLogger().info("Copying clean project directory...")
-            shutil.copytree(const.TMPDIR, const.APPDIR) # use the copy
+            getLogger().info("Restoring clean project directory...")
+            snapshot.restore(const.APPDIR) # undo the changes of the previous iteration
 
     if args.operation == SETUP_NEW:
         if not os.path.isdir(const.APPDIR):
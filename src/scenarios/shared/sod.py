@@ -4,14 +4,15 @@ Wrapper around startup tool.
 from logging import getLogger
 import sys
 import os
-import json
-from shutil import copytree, copy
+from shutil import copy
 from typing import Optional
 from performance.common import helixpayload, extension, runninginlab, get_artifacts_directory, get_packages_directory, RunCommand
+from performance.results import ResultsTable
 from performance.constants import UPLOAD_CONTAINER, UPLOAD_STORAGE_URI, UPLOAD_QUEUE
 from dotnet import CSharpProject, CSharpProjFile
 from shared.util import helixworkitempayload, helixuploaddir, getruntimeidentifier
 from shared.const import *
+from shared.tracesync import synctraces
 class SODWrapper(object):
     '''
     Wraps sod.exe, building it if necessary.
@@ -79,22 +80,18 @@ class SODWrapper(object):
 
         helix_upload_dir = helixuploaddir()
         if runninginlab() and helix_upload_dir is not None:
-            copytree(TRACEDIR, os.path.join(helix_upload_dir, 'traces'))
+            synctraces(TRACEDIR, os.path.join(helix_upload_dir, 'traces'))
+
+            results = ResultsTable.from_files([reportjson])
+            # Check all SOD tests for files being found
+            for test in results.find_tests(category='SizeOnDisk'):
+                # Check for any files being counted
+                results_found = any(
+                    series.counter.metric_name == 'count' and 0 not in series.values
+                    for series in results.test_series(test))
+                if not results_found:
+                    raise ValueError(f'No files found for sizing in scenario {test.name}')
 
-            with open(reportjson, 'r') as json_file:
-                json_result = json.load(json_file)
-                # Check all SOD tests for files being found
-                for test in json_result['tests']:
-                    results_found = False
-                    if 'SizeOnDisk' in test['categories']:
-                        for counter in test['counters']:
-                            # Check for any files being counted
-                            if counter['metricName'] == 'count' and 0 not in counter['results']:
-                                results_found = True
-                                break
-                        if not results_found:
-                            raise ValueError(f'No files found for sizing in scenario {test["name"]}')
-                
             if upload_to_perflab_container:
                 import upload
                 upload_code = upload.upload(reportjson, UPLOAD_CONTAINER, UPLOAD_QUEUE, UPLOAD_STORAGE_URI)
@@ -3,14 +3,16 @@ Wrapper around startup tool.
 '''
 import sys
 import os
+import json
 from logging import getLogger
-from shutil import copytree
+from typing import Any
 from performance.common import extension, helixpayload, runninginlab, get_artifacts_directory, get_packages_directory, RunCommand
 from performance.constants import UPLOAD_CONTAINER, UPLOAD_STORAGE_URI, UPLOAD_QUEUE
 from dotnet import CSharpProject, CSharpProjFile
 from shared.util import helixworkitempayload, helixuploaddir, getruntimeidentifier
 from shared.const import *
 from shared.testtraits import TestTraits
+from shared.tracesync import synctraces
 from subprocess import CalledProcessError
 class StartupWrapper(object):
     '''
@@ -92,7 +94,7 @@ class StartupWrapper(object):
 
         helix_upload_dir = helixuploaddir()
         if runninginlab() and helix_upload_dir is not None:
-            copytree(TRACEDIR, os.path.join(helix_upload_dir, 'traces'), dirs_exist_ok=True)
+            synctraces(TRACEDIR, os.path.join(helix_upload_dir, 'traces'))
             if traits.upload_to_perflab_container:
                 import upload
                 upload_code = upload.upload(self.reportjson, upload_container, UPLOAD_QUEUE, UPLOAD_STORAGE_URI)
@@ -100,6 +102,43 @@ class StartupWrapper(object):
                 if upload_code != 0:
                     sys.exit(upload_code)
 
+    def parsetracebatch(self, traits: TestTraits, tracenames: list[str]) -> dict[str, Any]:
+        '''
+        Parses several traces of the trace directory in a single Startup invocation, so its
+        startup and JIT cost is paid once rather than once per trace. Returns the report of
+        every trace keyed by trace name. Unlike parsetraces, traces are not copied to the
+        Helix upload directory nor uploaded.
+        '''
+        directory = TRACEDIR
+        if traits.tracefolder:
+            directory = TRACEDIR + '/' + traits.tracefolder
+            getLogger().info("Parse Directory: " + directory)
+
+        startup_args = [
+            self.startuppath,
+            '--app-exe', traits.apptorun,
+            '--parse-only',
+            '--metric-type', traits.startupmetric,
+            '--trace-name', tracenames[0],
+            '--trace-names', ';'.join(tracenames),
+            '--report-json-path', self.reportjson,
+            '--trace-directory', directory
+        ]
+        if traits.scenarioname:
+            startup_args.extend(['--scenario-name', traits.scenarioname])
+
+        try:
+            RunCommand(startup_args, verbose=True).run()
+        except CalledProcessError:
+            getLogger().info("Run failure registered")
+            # rethrow the original exception
+            raise
+
+        with open(self.reportjson, 'r') as report_file:
+            reports: dict[str, Any] = json.load(report_file)
+        os.remove(self.reportjson)
+        return reports
+
     def runtests(self, traits: TestTraits):
         '''
         Runs tests through startup
@@ -170,7 +209,7 @@ class StartupWrapper(object):
 
         helix_upload_dir = helixuploaddir()
         if runninginlab() and helix_upload_dir is not None:
-            copytree(TRACEDIR, os.path.join(helix_upload_dir, 'traces'), dirs_exist_ok=True)
+            synctraces(TRACEDIR, os.path.join(helix_upload_dir, 'traces'))
             if traits.upload_to_perflab_container:
                 import upload
                 upload_code = upload.upload(self.reportjson, upload_container, UPLOAD_QUEUE, UPLOAD_STORAGE_URI)
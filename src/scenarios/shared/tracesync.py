@@ -0,0 +1,95 @@
+'''
+Incremental sync of the trace directory to the Helix upload directory.
+'''
+import hashlib
+import os
+import shutil
+from logging import getLogger
+from typing import Optional
+from shared.const import TRACEDIR
+from shared.util import helixuploaddir
+
+class TraceSync(object):
+    '''
+    Copies the files of a trace directory that are new or changed since the last sync.
+
+    A file is up to date when its copy has the same size and modification time, or, when only
+    its modification time changed, the same SHA-256 as recorded when it was transferred. Files
+    are hardlinked when the destination is on the same file system, so a large trace is
+    never copied, and copied with their hash recorded otherwise.
+    '''
+    def __init__(self, source: str, destination: str):
+        self.source = source
+        self.destination = destination
+        # relative path -> SHA-256 of the transferred content, None for hardlinks
+        self.transferred: dict[str, Optional[str]] = {}
+
+    def _isuptodate(self, relpath: str, source: os.stat_result, target: Optional[os.stat_result], sourcepath: str) -> bool:
+        if target is None or target.st_size != source.st_size:
+            return False
+        if target.st_mtime_ns == source.st_mtime_ns:
+            return True
+        recorded = self.transferred.get(relpath)
+        return recorded is not None and recorded == _filehash(sourcepath)
+
+    def sync(self) -> int:
+        '''
+        Transfers the new or changed files and returns how many were transferred.
+        '''
+        transferred = 0
+        samefilesystem: Optional[bool] = None
+        for dirpath, _, filenames in os.walk(self.source):
+            targetdir = os.path.join(self.destination, os.path.relpath(dirpath, self.source))
+            os.makedirs(targetdir, exist_ok=True)
+            if samefilesystem is None:
+                samefilesystem = os.stat(self.source).st_dev == os.stat(self.destination).st_dev
+            for filename in filenames:
+                sourcepath = os.path.join(dirpath, filename)
+                targetpath = os.path.join(targetdir, filename)
+                relpath = os.path.relpath(sourcepath, self.source)
+                source = os.stat(sourcepath)
+                target = os.stat(targetpath) if os.path.exists(targetpath) else None
+                if self._isuptodate(relpath, source, target, sourcepath):
+                    if target is not None and target.st_mtime_ns != source.st_mtime_ns:
+                        shutil.copystat(sourcepath, targetpath)
+                    continue
+
+                if target is not None:
+                    os.remove(targetpath)
+                try:
+                    if not samefilesystem:
+                        raise OSError('Not on the same file system')
+                    os.link(sourcepath, targetpath)
+                    self.transferred[relpath] = None
+                except OSError:
+                    shutil.copy2(sourcepath, targetpath)
+                    self.transferred[relpath] = _filehash(sourcepath)
+                transferred += 1
+        getLogger().info("Synced %d new or changed trace files from %s to %s" % (transferred, self.source, self.destination))
+        return transferred
+
+def _filehash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# One TraceSync per (source, destination), so the transfers of earlier syncs of this process are known
+_tracesyncs: dict[tuple[str, str], TraceSync] = {}
+
+def synctraces(source: str = TRACEDIR, destination: Optional[str] = None) -> int:
+    '''
+    Syncs the trace directory to the traces directory of the Helix upload directory (by
+    default), transferring only the files that are new or changed since the last sync.
+    '''
+    if destination is None:
+        uploaddir = helixuploaddir()
+        if uploaddir is None:
+            raise Exception('HELIX_WORKITEM_UPLOAD_ROOT is not set')
+        destination = os.path.join(uploaddir, 'traces')
+    os.makedirs(destination, exist_ok=True)
+    key = (os.path.abspath(source), os.path.abspath(destination))
+    if key not in _tracesyncs:
+        _tracesyncs[key] = TraceSync(*key)
+    return _tracesyncs[key].sync()
@@ -7,6 +7,8 @@ using System.IO;
 using System.Linq;
 using System.Runtime.CompilerServices;
 using System.Text;
+using System.Text.Json;
+using System.Text.Json.Nodes;
 using System.Threading;
 
 namespace ScenarioMeasurement;
@@ -71,6 +73,7 @@ public class Startup
     /// <param name="hotReloadIters">Number of times to change files for hot reload</param>
     /// <param name="skipMeasurementIteration">Don't run measurement collection</param>
     /// <param name="parseOnly">Parse trace(s) without running app</param>
+    /// <param name="traceNames">With parseOnly, semicolon separated names of traces in traceDirectory to parse in this invocation instead of traceName. The report is then a JSON object keyed by trace name.</param>
     /// <param name="runWithDotnet">Run the app with dotnet, but don't include dotnet startup time</param>
     /// <param name="affinity">Processor affinity mask to set for the process</param>
     /// <returns></returns>
@@ -103,7 +106,8 @@ public class Startup
                     bool skipMeasurementIteration = false,
                     bool parseOnly = false,
                     bool runWithDotnet = false,
-                    long affinity = 0
+                    long affinity = 0,
+                    string traceNames = null
                     )
     {
         var logger = new Logger(string.IsNullOrEmpty(logFileName) ? $"{appExe}.startup.log" : logFileName);
@@ -115,14 +119,17 @@ public class Startup
         checkArg(appExe, nameof(appExe));
         checkArg(traceName, nameof(traceName));
 
-        var traceFilePath = "";
+        // (name, path) of the traces to parse
+        var traces = new List<(string Name, string Path)>();
+        var batchParse = parseOnly && !string.IsNullOrEmpty(traceNames);
 
 
         if (parseOnly == true)
         {
             skipMeasurementIteration = true;
             skipProfileIteration = true;
-            traceFilePath = Path.Join(traceDirectory, traceName);
+            var names = batchParse ? traceNames.Split(';', StringSplitOptions.RemoveEmptyEntries) : new[] { traceName };
+            traces.AddRange(names.Select(name => (name, Path.Join(traceDirectory, name))));
         }
 
         if (string.IsNullOrEmpty(traceDirectory))
@@ -319,15 +326,16 @@ public class Startup
                     }
                     pids.AddRange(iterationResult.Pids);
                 }
-                traceFilePath = traceSession.TraceFilePath;
+                if (!string.IsNullOrEmpty(traceSession.TraceFilePath))
+                {
+                    traces.Add((traceName, traceSession.TraceFilePath));
+                }
             }
 
         }
         // Parse trace files
-        if (!failed && !string.IsNullOrEmpty(traceFilePath))
+        if (!failed && traces.Count > 0)
         {
-            logger.Log($"Parsing {traceFilePath}");
-
             if (guiApp)
             {
                 appExe = Path.Join(workingDir, appExe);
@@ -339,33 +347,45 @@ public class Startup
             }
 
             var processName = Path.GetFileNameWithoutExtension(appExe);
-            try
+            // Parsing several traces in one invocation pays for the process startup and JIT once
+            var batchReports = new JsonObject();
+            foreach (var (name, traceFilePath) in traces)
             {
-                var counters = parser.Parse(traceFilePath, processName, pids, commandLine);
-                if (!counters.Any() || counters.All(c => c.Results == null || c.Results.Count == 0))
+                logger.Log($"Parsing {traceFilePath}");
+                try
+                {
+                    var counters = parser.Parse(traceFilePath, processName, pids, commandLine);
+                    if (!counters.Any() || counters.All(c => c.Results == null || c.Results.Count == 0))
+                    {
+                        logger.Log("ERROR: Parser returned no results. The ETL trace may not contain the expected events.");
+                        logger.Log($"{nameof(parser)} = {parser.GetType().FullName}");
+                        logger.Log($"{nameof(processName)} = {processName}");
+                        logger.Log($"{nameof(pids)} = {string.Join(", ", pids)}");
+                        logger.Log($"{nameof(commandLine)} = {commandLine}");
+                        failed = true;
+                        break;
+                    }
+                    var reportJson = CreateTestReport(scenarioName, counters, batchParse ? "" : reportJsonPath, logger);
+                    if (batchParse && reportJson != null)
+                    {
+                        batchReports[name] = JsonNode.Parse(reportJson);
+                    }
+                }
+                catch
                 {
-                    logger.Log("ERROR: Parser returned no results. The ETL trace may not contain the expected events.");
                     logger.Log($"{nameof(parser)} = {parser.GetType().FullName}");
                     logger.Log($"{nameof(processName)} = {processName}");
                     logger.Log($"{nameof(pids)} = {string.Join(", ", pids)}");
                     logger.Log($"{nameof(commandLine)} = {commandLine}");
-                    failed = true;
-                }
-                if (!failed)
-                {
-                    CreateTestReport(scenarioName, counters, reportJsonPath, logger);
+                    var destFileName = Path.Join(Environment.GetEnvironmentVariable("HELIX_WORKITEM_UPLOAD_ROOT"), Path.GetFileName(traceFilePath));
+                    File.Copy(traceFilePath, destFileName, true);
+                    logger.Log($"Copied {traceFilePath} to {destFileName}");
+                    throw;
                 }
             }
-            catch
+            if (!failed && batchParse && batchReports.Count > 0 && !string.IsNullOrEmpty(reportJsonPath))
             {
-                logger.Log($"{nameof(parser)} = {parser.GetType().FullName}");
-                logger.Log($"{nameof(processName)} = {processName}");
-                logger.Log($"{nameof(pids)} = {string.Join(", ", pids)}");
-                logger.Log($"{nameof(commandLine)} = {commandLine}");
-                var destFileName = Path.Join(Environment.GetEnvironmentVariable("HELIX_WORKITEM_UPLOAD_ROOT"), Path.GetFileName(traceFilePath));
-                File.Copy(traceFilePath, destFileName, true);
-                logger.Log($"Copied {traceFilePath} to {destFileName}");
-                throw;
+                File.WriteAllText(reportJsonPath, batchReports.ToJsonString(new JsonSerializerOptions { WriteIndented = true }));
             }
         }
 
@@ -550,7 +570,8 @@ public class Startup
         return dict;
     }
 
-    private static void CreateTestReport(string scenarioName, IEnumerable<Counter> counters, string reportJsonPath, Logger logger)
+    /// <returns>The report json, null when not running in the lab</returns>
+    private static string CreateTestReport(string scenarioName, IEnumerable<Counter> counters, string reportJsonPath, Logger logger)
     {
         var reporter = new Reporter();
         var test = new Test();
@@ -558,11 +579,13 @@ public class Startup
         test.Name = scenarioName;
         test.AddCounters(counters);
         reporter.AddTest(test);
+        var json = reporter.GetJson();
         if (reporter.InLab && !string.IsNullOrEmpty(reportJsonPath))
         {
-            File.WriteAllText(reportJsonPath, reporter.GetJson());
+            File.WriteAllText(reportJsonPath, json);
         }
         logger.Log(reporter.WriteResultTable());
+        return json;
     }
 
     public static void AddTestProcessEnvironmentVariable(string name, string value)